@@ -1,8 +1,9 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+import figures
+from downsample import CHART_WIDTH_PX
 
 # -----------------------------------------------------------------------------------
 # Configuration & Setup
@@ -18,29 +19,54 @@ st.set_page_config(
 # Data Loading (Cached)
 # -----------------------------------------------------------------------------------
 @st.cache_data
-def load_data():
-    """Load historical and forecast data."""
+def load_data(hist_version=None, forecast_version=None):
+    """Load historical and forecast data at the given snapshot versions."""
     # Historical Data
     try:
-        df_hist = pd.read_csv("data/raw/ethiopia_fi_unified_data.csv")
-        # Ensure observation_date is datetime
-        df_hist['observation_date'] = pd.to_datetime(df_hist['observation_date'], errors='coerce')
-        df_hist['Year'] = df_hist['observation_date'].dt.year
+        df_hist = figures.read_history(version=hist_version)
     except FileNotFoundError:
-        st.error("Historical data file not found: data/raw/ethiopia_fi_unified_data.csv")
+        st.error(f"Historical data file not found: {figures.HIST_PATH}")
         df_hist = pd.DataFrame()
 
     # Forecast Data
     try:
-        df_forecast = pd.read_csv("data/forecasts_2025_2027.csv")
+        df_forecast = figures.read_forecasts(version=forecast_version)
     except FileNotFoundError:
-        st.error("Forecast data file not found: data/forecasts_2025_2027.csv")
+        st.error(f"Forecast data file not found: {figures.FORECAST_PATH}")
         df_forecast = pd.DataFrame()
         
     return df_hist, df_forecast
 
+@st.cache_resource
+def load_panel(hist_version=None):
+    """Memory-mapped indicator x month panel; one mapping shared by all sessions."""
+    try:
+        return figures.read_panel(version=hist_version)
+    except (FileNotFoundError, ValueError):
+        return None
+
+@st.cache_data
+def load_profile(hist_version=None):
+    panel = load_panel(hist_version)
+    return figures.read_profile(panel) if panel is not None else None
+
+@st.cache_data
+def downsampled_series(_df, hist_version, indicator_codes, start_date, end_date, width_px=CHART_WIDTH_PX):
+    """Downsample the selected indicators to the chart width, cached per (data version, indicator set, date range)."""
+    return figures.select_series(_df, indicator_codes, start_date, end_date, width_px)
+
+# Pin each session to the data versions current when it started, so a pipeline publishing
+# new outputs mid-session never mixes old and new files in one view.
+if 'data_versions' not in st.session_state:
+    st.session_state['data_versions'] = figures.data_versions()
+
 try:
-    df_hist, df_forecast = load_data()
+    try:
+        df_hist, df_forecast = load_data(*st.session_state['data_versions'])
+    except FileNotFoundError:
+        # pinned version was pruned: move the session to the current one
+        st.session_state['data_versions'] = figures.data_versions()
+        df_hist, df_forecast = load_data(*st.session_state['data_versions'])
 except Exception as e:
     st.error(f"Error loading data: {e}")
     st.stop()
@@ -49,7 +75,7 @@ except Exception as e:
 # Sidebar Navigation
 # -----------------------------------------------------------------------------------
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ["Overview", "Trends", "Forecasts", "Inclusion Projections"])
+page = st.sidebar.radio("Go to", figures.PAGES)
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### About")
@@ -66,24 +92,10 @@ if page == "Overview":
     st.markdown("Key metrics and current status of financial inclusion in Ethiopia.")
 
     # -- Calculate Key Metrics --
-    # Account Ownership (ACC_OWNERSHIP)
-    acc_data = df_hist[df_hist['indicator_code'] == 'ACC_OWNERSHIP'].sort_values('observation_date')
-    latest_acc_val = acc_data['value_numeric'].iloc[-1] if not acc_data.empty else 0
-    latest_acc_year = acc_data['Year'].iloc[-1] if not acc_data.empty else "N/A"
-    
-    # Digital Payment Adoption (Using USG_DIGITAL_PAY or proxy)
-    dig_data = df_hist[df_hist['indicator_code'] == 'USG_DIGITAL_PAY'].sort_values('observation_date')
-    latest_dig_val = dig_data['value_numeric'].iloc[-1] if not dig_data.empty else 0
-    
-    # P2P / ATM Crossover
-    cross_data = df_hist[df_hist['indicator_code'] == 'USG_CROSSOVER'].sort_values('observation_date')
-    latest_cross_val = cross_data['value_numeric'].iloc[-1] if not cross_data.empty else 0
-
     # Display Metrics
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Account Ownership Ratio", f"{latest_acc_val}%", f"Latest ({latest_acc_year})")
-    col2.metric("Digital Payment Adoption", f"{latest_dig_val}%", "Latest Estimate")
-    col3.metric("P2P/ATM Crossover Ratio", f"{latest_cross_val:.2f}", "Ratio > 1 indicates Digital Dominance")
+    panel = load_panel(st.session_state['data_versions'][0])
+    for col, (label, value, delta) in zip(st.columns(3), figures.overview_metrics(df_hist, panel)):
+        col.metric(label, value, delta)
 
     st.markdown("---")
     
@@ -91,15 +103,21 @@ if page == "Overview":
     st.subheader("Historical Trajectory")
     
     # Filter for key indicators
-    key_indicators = ['ACC_OWNERSHIP', 'ACC_MOBILE_PEN', 'USG_DIGITAL_PAY']
-    summary_df = df_hist[df_hist['indicator_code'].isin(key_indicators)].copy()
+    summary_df = downsampled_series(df_hist, st.session_state['data_versions'][0], tuple(figures.KEY_INDICATORS),
+                                    df_hist['observation_date'].min(), df_hist['observation_date'].max())
     
-    if not summary_df.empty:
-        fig = px.line(summary_df, x='observation_date', y='value_numeric', color='indicator',
-                      title="Key Indicators Over Time",
-                      labels={'value_numeric': 'Value (%)', 'observation_date': 'Date'})
+    fig = figures.overview_figure(summary_df)
+    if fig is not None:
         st.plotly_chart(fig, use_container_width=True)
 
+    profile = load_profile(st.session_state['data_versions'][0])
+    if profile is not None:
+        with st.expander("Data Coverage"):
+            fig = figures.coverage_figure(profile)
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True)
+            st.markdown(f"**Years without any observation:** {profile['years_without_data'] or 'none'}")
+
 # -----------------------------------------------------------------------------------
 # Page: Trends
 # -----------------------------------------------------------------------------------
@@ -108,7 +126,7 @@ elif page == "Trends":
     st.markdown("Deep dive into Access and Usage metrics.")
     
     # Filters
-    pillars = df_hist['pillar'].unique() if 'pillar' in df_hist.columns else []
+    pillars = figures.pillar_options(df_hist)
     selected_pillar = st.selectbox("Select Pillar", pillars, index=0 if len(pillars) > 0 else 0)
     
     # Date Range
@@ -117,29 +135,21 @@ elif page == "Trends":
     date_range = st.slider("Select Date Range", min_date, max_date, (min_date, max_date))
     
     # Filter Data
-    mask = (df_hist['pillar'] == selected_pillar) & \
-           (df_hist['observation_date'].dt.date >= date_range[0]) & \
-           (df_hist['observation_date'].dt.date <= date_range[1])
-    filtered_df = df_hist[mask]
+    filtered_df = figures.filter_trends(df_hist, selected_pillar, date_range)
     
     if not filtered_df.empty:
         # P2P vs ATM Special View
         if selected_pillar == 'USAGE':
             st.subheader("Comparison: P2P vs ATM Transactions")
-            p2p_atm_codes = ['USG_P2P_COUNT', 'USG_ATM_COUNT']
-            p2p_atm_df = filtered_df[filtered_df['indicator_code'].isin(p2p_atm_codes)]
-            
-            if not p2p_atm_df.empty:
-                fig_comp = px.bar(p2p_atm_df, x='Year', y='value_numeric', color='indicator', barmode='group',
-                                  title="Transaction Counts: P2P vs ATM",
-                                  labels={'value_numeric': 'Count'})
+            fig_comp = figures.p2p_atm_figure(filtered_df)
+            if fig_comp is not None:
                 st.plotly_chart(fig_comp, use_container_width=True)
         
         # General Time Series
         st.subheader(f"{selected_pillar} Indicators Time Series")
-        fig_trend = px.line(filtered_df, x='observation_date', y='value_numeric', color='indicator',
-                            markers=True,
-                            title=f"{selected_pillar} Metrics over Time")
+        trend_df = downsampled_series(df_hist, st.session_state['data_versions'][0],
+                                      figures.pillar_codes(filtered_df), date_range[0], date_range[1])
+        fig_trend = figures.trend_figure(trend_df, selected_pillar)
         st.plotly_chart(fig_trend, use_container_width=True)
         
         with st.expander("View Raw Data"):
@@ -160,29 +170,15 @@ elif page == "Forecasts":
         indicators = df_forecast['Indicator'].unique()
         selected_indicator = st.selectbox("Select Indicator to Forecast", indicators)
         
-        # Filter Logic
-        # Note: Mapping Indicator codes if necessary. Forecast file uses ACC_OWNERSHIP, USG_DIGITAL_PAYMENT
-        subset = df_forecast[df_forecast['Indicator'] == selected_indicator]
-        
         st.markdown(f"### Forecast for: {selected_indicator}")
         
         # Visualization
-        # Use plot to show Scenarios
-        fig_cast = px.line(subset, x='Year', y='Value', color='Scenario',
-                           markers=True,
-                           line_shape='spline',
-                           color_discrete_map={'Base': 'blue', 'Optimistic': 'green', 'Pessimistic': 'red'},
-                           title=f"Projected {selected_indicator} (2025-2027)")
+        fig_cast = figures.forecast_figure(df_forecast, selected_indicator)
         
         # Emphasize confidence implicitly via scenarios
         st.plotly_chart(fig_cast, use_container_width=True)
         
-        st.markdown("""
-        **Scenarios:**
-        - **Base**: Assumes current growth trends and implemented policies continue.
-        - **Optimistic**: Assumes accelerated policy reforms (e.g. telecom liberalization) and higher adoption.
-        - **Pessimistic**: Assumes economic headwinds or slower infrastructure rollout.
-        """)
+        st.markdown(figures.SCENARIO_NOTES)
 
 # -----------------------------------------------------------------------------------
 # Page: Inclusion Projections
@@ -191,10 +187,8 @@ elif page == "Inclusion Projections":
     st.title("🎯 Progress to Targets")
     st.markdown("Tracking progress towards the **60% Financial Inclusion** target.")
     
-    target_val = 60.0
-    
     # Filter for Account Ownership Forecasts
-    acc_forecasts = df_forecast[df_forecast['Indicator'] == 'ACC_OWNERSHIP']
+    acc_forecasts = df_forecast[figures.code_mask(df_forecast['Indicator'], 'ACC_OWNERSHIP')] if not df_forecast.empty else df_forecast
     
     if acc_forecasts.empty:
         st.warning("Account Ownership forecasts missing.")
@@ -203,55 +197,21 @@ elif page == "Inclusion Projections":
         scenarios = acc_forecasts['Scenario'].unique()
         selected_scenario = st.radio("Select Scenario", scenarios, horizontal=True)
         
-        scenario_data = acc_forecasts[acc_forecasts['Scenario'] == selected_scenario].sort_values('Year')
-        
         # Combine with historical if available
-        # Find latest historical
-        acc_hist = df_hist[df_hist['indicator_code'] == 'ACC_OWNERSHIP'].sort_values('Year')
+        scenario_data, acc_hist = figures.projection_data(df_forecast, df_hist, selected_scenario)
         
         # Plot
-        fig_proj = go.Figure()
-        
-        # Historical Trace
-        if not acc_hist.empty:
-            fig_proj.add_trace(go.Scatter(x=acc_hist['Year'], y=acc_hist['value_numeric'],
-                                          mode='lines+markers', name='Historical',
-                                          line=dict(color='gray', dash='dot')))
-            
-        # Forecast Trace
-        fig_proj.add_trace(go.Scatter(x=scenario_data['Year'], y=scenario_data['Value'],
-                                      mode='lines+markers', name=f'Forecast ({selected_scenario})',
-                                      line=dict(width=3)))
-        
-        # Target Line
-        last_year = scenario_data['Year'].max() if not scenario_data.empty else 2027
-        first_year = acc_hist['Year'].min() if not acc_hist.empty else 2014
-        
-        fig_proj.add_shape(type="line",
-                           x0=first_year, y0=target_val, x1=last_year, y1=target_val,
-                           line=dict(color="gold", width=2, dash="dash"),
-                           name="60% Target")
-        
-        fig_proj.add_annotation(x=last_year, y=target_val, text="60% Target", showarrow=False, yshift=10)
-        
-        fig_proj.update_layout(title="Financial Inclusion Trajectory vs Target",
-                               xaxis_title="Year", yaxis_title="Account Ownership (%)")
-        
+        fig_proj = figures.projection_figure(scenario_data, acc_hist, selected_scenario)
         st.plotly_chart(fig_proj, use_container_width=True)
         
         # Analysis Text
-        # Simple logic to find crossing point
-        crossing_year = None
-        for _, row in scenario_data.iterrows():
-            if row['Value'] >= target_val:
-                crossing_year = row['Year']
-                break
+        reached, message = figures.crossing_message(selected_scenario, figures.crossing_year(scenario_data))
         
         result_box = st.container()
-        if crossing_year:
-            result_box.success(f"✅ Under the **{selected_scenario}** scenario, the 60% target is projected to be reached in **{int(crossing_year)}**.")
+        if reached:
+            result_box.success(message)
         else:
-            result_box.warning(f"⚠️ Under the **{selected_scenario}** scenario, the 60% target may NOT be reached by 2027.")
+            result_box.warning(message)
 
 # -----------------------------------------------------------------------------------
 # Footer & Download
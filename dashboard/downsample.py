@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# One plotted point per horizontal pixel is the most a line chart can show.
+CHART_WIDTH_PX = 1200
+# Above this many points Plotly's SVG renderer struggles; switch to WebGL (Scattergl).
+WEBGL_THRESHOLD = 5000
+
+
+def points_for_width(width_px=CHART_WIDTH_PX, method='lttb'):
+    """Number of points to keep for a chart of the given pixel width."""
+    if method == 'minmax':
+        # min and max per pixel column
+        return 2 * int(width_px)
+    return int(width_px)
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of the n_out points that best preserve the shape."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) -
+                      (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def minmax_indices(y, n_buckets):
+    """Indices of the min and max point in each of n_buckets equal-count buckets."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    bucket = (np.arange(n) * n_buckets) // n
+    # sort by (bucket, y): first element per bucket is its min, last its max
+    order = np.lexsort((y, bucket))
+    bounds = np.flatnonzero(np.diff(bucket[order])) + 1
+    firsts = order[np.concatenate(([0], bounds))]
+    lasts = order[np.concatenate((bounds - 1, [n - 1]))]
+    return np.unique(np.concatenate((firsts, lasts, [0, n - 1])))
+
+
+def downsample_series(x, y, n_out, method='lttb'):
+    """Indices to keep for a single (x sorted) series."""
+    if method == 'minmax':
+        return minmax_indices(y, max(1, n_out // 2))
+    return lttb_indices(x, y, n_out)
+
+
+def downsample_frame(df, x='observation_date', y='value_numeric', group='indicator',
+                     width_px=CHART_WIDTH_PX, method='lttb'):
+    """Downsample every series in df (one per `group` value) to the chart's pixel width."""
+    if df.empty:
+        return df
+
+    n_out = points_for_width(width_px, method)
+    df = df.dropna(subset=[x, y]).sort_values([group, x])
+    if len(df) <= n_out:
+        return df
+
+    # datetimes are reduced to int64 nanoseconds for the triangle-area maths
+    x_vals = df[x].to_numpy()
+    if np.issubdtype(x_vals.dtype, np.datetime64):
+        x_vals = x_vals.astype('datetime64[ns]').astype(np.int64)
+    y_vals = df[y].to_numpy(dtype=np.float64)
+
+    keep = []
+    codes, uniques = pd.factorize(df[group], sort=False)
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(df)]))
+    for s, e in zip(starts, ends):
+        if e - s <= n_out:
+            keep.append(np.arange(s, e))
+        else:
+            keep.append(s + downsample_series(x_vals[s:e], y_vals[s:e], n_out, method))
+
+    return df.iloc[np.concatenate(keep)]
+
+
+def render_mode_for(n_points):
+    """Plotly Express render mode: WebGL (Scattergl) for large point counts."""
+    return 'webgl' if n_points > WEBGL_THRESHOLD else 'svg'
@@ -0,0 +1,306 @@
+"""
+Static export of the dashboard.
+
+Renders every page / filter combination of app.py into plain HTML with the Plotly
+figure JSON embedded as shared, content-addressed scripts, so the site can be served
+from any static file server with no Python at request time.
+
+    python dashboard/export_static.py --out site
+"""
+import argparse
+import hashlib
+import html
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import figures
+
+PAGE_SLUGS = {
+    "Overview": "overview",
+    "Trends": "trends",
+    "Forecasts": "forecasts",
+    "Inclusion Projections": "projections",
+}
+
+RENDER_JS = """
+window.FIGURES = window.FIGURES || {};
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('[data-figure]').forEach(function (el) {
+    var fig = window.FIGURES[el.getAttribute('data-figure')];
+    if (fig) { Plotly.newPlot(el, fig.data, fig.layout, {responsive: true}); }
+  });
+});
+"""
+
+STYLE_CSS = """
+body { font-family: sans-serif; margin: 0; display: flex; }
+nav { width: 220px; padding: 1rem; background: #f0f2f6; min-height: 100vh; }
+nav a { display: block; margin: .3rem 0; }
+main { flex: 1; padding: 1rem 2rem; }
+.metrics { display: flex; gap: 2rem; }
+.metric .value { font-size: 2rem; }
+.figure { width: 100%; min-height: 450px; }
+.success { background: #e6f4ea; padding: .8rem; }
+.warning { background: #fff4e5; padding: .8rem; }
+"""
+
+# Written into every exported site; an existing --out directory without it is never replaced.
+MARKER = ".static-export"
+
+# Populated once per worker by _init_worker so tasks only carry their filter values.
+_DATA = {}
+
+
+def _init_worker(df_hist, df_forecast, hist_path):
+    _DATA['hist'] = df_hist
+    _DATA['forecast'] = df_forecast
+    # the panel is memory-mapped, so every worker shares the same pages
+    _DATA['panel'] = figures.read_panel(hist_path) if not df_hist.empty else None
+
+
+def _slug(value):
+    return "".join(c if c.isalnum() else "_" for c in str(value)).strip("_").lower() or "all"
+
+
+def page_combinations(df_hist, df_forecast, year_windows=False):
+    """Every (page, filters, output path) to render."""
+    combos = [("Overview", {}, "overview/index.html")]
+
+    if not df_hist.empty:
+        min_date = df_hist['observation_date'].min().date()
+        max_date = df_hist['observation_date'].max().date()
+        ranges = [(min_date, max_date)]
+        if year_windows:
+            # every whole-year window the slider can select
+            years = range(min_date.year, max_date.year + 1)
+            ranges += [(max(min_date, pd.Timestamp(f"{a}-01-01").date()),
+                        min(max_date, pd.Timestamp(f"{b}-12-31").date()))
+                       for a in years for b in years if a <= b]
+            ranges = list(dict.fromkeys(ranges))
+        for pillar in figures.pillar_options(df_hist):
+            if pd.isna(pillar):
+                continue
+            for start, end in ranges:
+                combos.append(("Trends", {'pillar': pillar, 'date_range': (start, end)},
+                               f"trends/{_slug(pillar)}/{start}_{end}.html"))
+
+    if not df_forecast.empty:
+        for ind in df_forecast['Indicator'].unique():
+            combos.append(("Forecasts", {'indicator': ind}, f"forecasts/{_slug(ind)}.html"))
+        acc = df_forecast[df_forecast['Indicator'] == 'ACC_OWNERSHIP']
+        for scenario in acc['Scenario'].unique():
+            combos.append(("Inclusion Projections", {'scenario': scenario},
+                           f"projections/{_slug(scenario)}.html"))
+    return combos
+
+
+def build_page(combo):
+    """Render one page: returns (path, body blocks, {figure hash: figure json})."""
+    page, params, path = combo
+    df_hist, df_forecast = _DATA['hist'], _DATA['forecast']
+    blocks, figs = [], {}
+
+    def add_fig(fig):
+        if fig is None:
+            return
+        fig_json = fig.to_json()
+        key = hashlib.sha1(fig_json.encode('utf-8')).hexdigest()[:16]
+        figs[key] = fig_json
+        blocks.append(('figure', key))
+
+    if page == "Overview":
+        blocks.append(('h1', "📊 Financial Inclusion Overview"))
+        blocks.append(('metrics', figures.overview_metrics(df_hist, _DATA['panel'])))
+        blocks.append(('h2', "Historical Trajectory"))
+        summary_df = figures.select_series(df_hist, tuple(figures.KEY_INDICATORS),
+                                           df_hist['observation_date'].min(),
+                                           df_hist['observation_date'].max())
+        add_fig(figures.overview_figure(summary_df))
+        if _DATA['panel'] is not None:
+            blocks.append(('h2', "Data Coverage"))
+            add_fig(figures.coverage_figure(figures.read_profile(_DATA['panel'])))
+
+    elif page == "Trends":
+        pillar, date_range = params['pillar'], params['date_range']
+        blocks.append(('h1', f"📈 Historical Trends: {pillar} ({date_range[0]} to {date_range[1]})"))
+        filtered_df = figures.filter_trends(df_hist, pillar, date_range)
+        if filtered_df.empty:
+            blocks.append(('p', "No data available for selected filters."))
+        else:
+            if pillar == 'USAGE':
+                add_fig(figures.p2p_atm_figure(filtered_df))
+            trend_df = figures.select_series(df_hist, figures.pillar_codes(filtered_df), *date_range)
+            add_fig(figures.trend_figure(trend_df, pillar))
+
+    elif page == "Forecasts":
+        indicator = params['indicator']
+        blocks.append(('h1', f"🔮 Forecast for: {indicator}"))
+        add_fig(figures.forecast_figure(df_forecast, indicator))
+        blocks.append(('md', figures.SCENARIO_NOTES))
+
+    elif page == "Inclusion Projections":
+        scenario = params['scenario']
+        blocks.append(('h1', f"🎯 Progress to Targets: {scenario}"))
+        scenario_data, acc_hist = figures.projection_data(df_forecast, df_hist, scenario)
+        add_fig(figures.projection_figure(scenario_data, acc_hist, scenario))
+        reached, message = figures.crossing_message(scenario, figures.crossing_year(scenario_data))
+        blocks.append(('success' if reached else 'warning', message))
+
+    return path, blocks, figs
+
+
+def _render_block(kind, value):
+    if kind == 'figure':
+        return f'<div class="figure" data-figure="{value}"></div>'
+    if kind == 'metrics':
+        items = "".join(f'<div class="metric"><div>{html.escape(label)}</div>'
+                        f'<div class="value">{html.escape(v)}</div><div>{html.escape(delta)}</div></div>'
+                        for label, v, delta in value)
+        return f'<div class="metrics">{items}</div>'
+    if kind == 'html':
+        return value
+    if kind == 'md':
+        return "<pre>" + html.escape(value.strip()) + "</pre>"
+    text = html.escape(value).replace("**", "")
+    if kind in ('success', 'warning'):
+        return f'<div class="{kind}">{text}</div>'
+    return f"<{kind}>{text}</{kind}>"
+
+
+def render_html(path, blocks, nav):
+    root = "../" * path.count("/")
+    fig_keys = [value for kind, value in blocks if kind == 'figure']
+    scripts = "".join(f'<script src="{root}figures/{k}.js"></script>' for k in fig_keys)
+    links = "".join(f'<a href="{root}{href}">{html.escape(label)}</a>' for label, href in nav)
+    body = "\n".join(_render_block(kind, value) for kind, value in blocks)
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Ethiopia Financial Inclusion Dashboard</title>
+<link rel="stylesheet" href="{root}assets/style.css">
+<script src="{root}assets/plotly.min.js"></script>
+<script src="{root}assets/render.js"></script>
+{scripts}
+</head><body><nav><h3>Navigation</h3>{links}</nav><main>{body}</main></body></html>
+"""
+
+
+def write_assets(out_dir):
+    from plotly.offline import get_plotlyjs
+
+    assets = os.path.join(out_dir, "assets")
+    os.makedirs(assets, exist_ok=True)
+    with open(os.path.join(assets, "plotly.min.js"), "w", encoding="utf-8") as f:
+        f.write(get_plotlyjs())
+    with open(os.path.join(assets, "render.js"), "w", encoding="utf-8") as f:
+        f.write(RENDER_JS)
+    with open(os.path.join(assets, "style.css"), "w", encoding="utf-8") as f:
+        f.write(STYLE_CSS)
+
+
+def export_site(out_dir, hist_path=figures.HIST_PATH, forecast_path=figures.FORECAST_PATH,
+                workers=None, year_windows=False):
+    df_hist = figures.read_history(hist_path) if os.path.exists(hist_path) else pd.DataFrame()
+    df_forecast = figures.read_forecasts(forecast_path) if os.path.exists(forecast_path) else pd.DataFrame()
+    if df_hist.empty:
+        print(f"Historical data file not found: {hist_path}")
+        return
+
+    out_dir = os.path.abspath(out_dir)
+    if os.path.isdir(out_dir) and os.listdir(out_dir) and not os.path.exists(os.path.join(out_dir, MARKER)):
+        raise FileExistsError(f"{out_dir} is not empty and is not a previous export; refusing to replace it")
+
+    figures.read_panel(hist_path)  # build once here rather than racing in every worker
+    combos = page_combinations(df_hist, df_forecast, year_windows=year_windows)
+    print(f"Rendering {len(combos)} pages...")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(df_hist, df_forecast, hist_path)) as pool:
+        results = list(pool.map(build_page, combos, chunksize=max(1, len(combos) // 32)))
+
+    # built next to out_dir and swapped in at the end, so readers never see a half-written site
+    parent, name = os.path.split(out_dir)
+    build_dir = os.path.join(parent, f".{name}.tmp-{os.getpid()}")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    try:
+        n_figs = write_site(build_dir, combos, results)
+        _swap_in(build_dir, out_dir)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    print(f"Wrote {len(combos)} pages and {n_figs} unique figures to {out_dir}")
+
+
+def _swap_in(build_dir, out_dir):
+    """Replace out_dir by build_dir (rename the old export aside first: a non-empty directory can't be replaced)."""
+    old_dir = None
+    if os.path.exists(out_dir):
+        parent, name = os.path.split(out_dir)
+        old_dir = os.path.join(parent, f".{name}.old-{os.getpid()}")
+        os.replace(out_dir, old_dir)
+    os.replace(build_dir, out_dir)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def write_site(out_dir, combos, results):
+    """Write assets, the deduplicated figures and every page's HTML; returns the number of figures."""
+    write_assets(out_dir)
+    with open(os.path.join(out_dir, MARKER), "w", encoding="utf-8") as f:
+        f.write("Generated by dashboard/export_static.py; replaced on every export.\n")
+
+    # Deduplicate figures across pages: each distinct figure is written once.
+    all_figs = {}
+    for _, _, figs in results:
+        all_figs.update(figs)
+    fig_dir = os.path.join(out_dir, "figures")
+    os.makedirs(fig_dir, exist_ok=True)
+    for key, fig_json in all_figs.items():
+        with open(os.path.join(fig_dir, f"{key}.js"), "w", encoding="utf-8") as f:
+            f.write(f'window.FIGURES = window.FIGURES || {{}};\nwindow.FIGURES["{key}"] = {fig_json};\n')
+
+    nav = [(page, f"{PAGE_SLUGS[page]}/index.html") for page in figures.PAGES]
+    by_page = {}
+    for (page, _, path), (_, blocks, _) in zip(combos, results):
+        with_dir = os.path.join(out_dir, path)
+        os.makedirs(os.path.dirname(with_dir), exist_ok=True)
+        with open(with_dir, "w", encoding="utf-8") as f:
+            f.write(render_html(path, blocks, nav))
+        by_page.setdefault(page, []).append(path)
+
+    # Per-page index listing its filter combinations, plus the site root.
+    for page, slug in PAGE_SLUGS.items():
+        index_path = f"{slug}/index.html"
+        if index_path in by_page.get(page, []):
+            continue
+        entries = [('h1', page)]
+        for p in by_page.get(page, []):
+            rel = p.split("/", 1)[1]
+            entries.append(('html', f'<p><a href="{html.escape(rel)}">{html.escape(rel)}</a></p>'))
+        html_text = render_html(index_path, entries, nav)
+        os.makedirs(os.path.join(out_dir, slug), exist_ok=True)
+        with open(os.path.join(out_dir, index_path), "w", encoding="utf-8") as f:
+            f.write(html_text)
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write('<!DOCTYPE html><meta http-equiv="refresh" content="0; url=overview/index.html">')
+    return len(all_figs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the dashboard as a static site.")
+    parser.add_argument("--out", default="site",
+                        help="Output directory (replaced on each build; must be empty or a previous export).")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel render processes.")
+    parser.add_argument("--year-windows", action="store_true",
+                        help="Also render every whole-year Trends date range, not just the full range.")
+    args = parser.parse_args()
+    try:
+        export_site(args.out, workers=args.workers, year_windows=args.year_windows)
+    except FileExistsError as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import os
+import sys
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from downsample import downsample_frame, render_mode_for, CHART_WIDTH_PX
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.schema import code_mask, codes_mask, load_unified
+from src import panel as panel_store
+from src.profiling import load_profile
+from src import delta_store, snapshots
+
+# Page-building logic shared by the Streamlit app (app.py) and the static export (export_static.py).
+# Nothing in here may import streamlit.
+
+# FI_DATA_DIR points the dashboard at another data/ tree (e.g. synthetic data for load tests).
+DATA_DIR = os.environ.get("FI_DATA_DIR", "data")
+HIST_PATH = os.path.join(DATA_DIR, "raw", "ethiopia_fi_unified_data.csv")
+REF_PATH = os.path.join(DATA_DIR, "raw", "reference_codes.csv")
+FORECAST_PATH = os.path.join(DATA_DIR, "forecasts_2025_2027.csv")
+PANEL_DIR = os.path.join(DATA_DIR, "processed", "panel")
+
+PAGES = ["Overview", "Trends", "Forecasts", "Inclusion Projections"]
+KEY_INDICATORS = ['ACC_OWNERSHIP', 'ACC_MOBILE_PEN', 'USG_DIGITAL_PAYMENT']
+# Only dated, valued records are charted; events and impact links are never loaded.
+HISTORY_RECORD_TYPES = ('observation', 'target')
+SCENARIO_COLORS = {'Base': 'blue', 'Optimistic': 'green', 'Pessimistic': 'red'}
+TARGET_VALUE = 60.0
+
+SCENARIO_NOTES = """
+**Scenarios:**
+- **Base**: Assumes current growth trends and implemented policies continue.
+- **Optimistic**: Assumes accelerated policy reforms (e.g. telecom liberalization) and higher adoption.
+- **Pessimistic**: Assumes economic headwinds or slower infrastructure rollout.
+"""
+
+
+def data_versions():
+    """Current (history, forecast) versions; the history version covers its delta segments too."""
+    return delta_store.current_version(HIST_PATH), snapshots.current_version(FORECAST_PATH)
+
+
+def read_history(path=HIST_PATH, version=None):
+    """Read the unified dataset (schema applied, dates parsed) with a Year column."""
+    df_hist = load_unified(path, REF_PATH, version, record_types=HISTORY_RECORD_TYPES)
+    df_hist['Year'] = df_hist['observation_date'].dt.year
+    return df_hist
+
+
+def read_forecasts(path=FORECAST_PATH, version=None):
+    return snapshots.read_csv(path, version)
+
+
+def read_panel(path=HIST_PATH, version=None):
+    """Memory-mapped indicator x month panel of `path` at a data version (rebuilt if needed), shared across processes."""
+    return panel_store.ensure_panel(path, REF_PATH, PANEL_DIR, version=version)
+
+
+def read_profile(panel):
+    """Coverage / gap / correlation profile of the panel (cached per panel version)."""
+    return load_profile(panel, PANEL_DIR)
+
+
+def select_series(df_hist, indicator_codes, start_date, end_date, width_px=CHART_WIDTH_PX):
+    """Rows for the given indicators inside [start_date, end_date], downsampled to the chart width."""
+    mask = codes_mask(df_hist['indicator_code'], indicator_codes) & \
+           (df_hist['observation_date'] >= pd.Timestamp(start_date)) & \
+           (df_hist['observation_date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1))
+    return downsample_frame(df_hist[mask], width_px=width_px)
+
+
+def latest_value(df_hist, code):
+    data = df_hist[code_mask(df_hist['indicator_code'], code)].sort_values('observation_date')
+    if data.empty:
+        return 0, "N/A"
+    return data['value_numeric'].iloc[-1], data['Year'].iloc[-1]
+
+
+def panel_latest_value(panel, code):
+    """Latest national observation of an indicator from the panel."""
+    data = panel_store.series(panel, code)
+    if data.empty:
+        return 0, "N/A"
+    return round(float(data.iloc[-1]), 2), data.index[-1].year
+
+
+# -----------------------------------------------------------------------------------
+# Overview
+# -----------------------------------------------------------------------------------
+def overview_metrics(df_hist, panel=None):
+    """(label, value, delta) triples for the Overview metric row (from the panel when given)."""
+    latest = (lambda code: panel_latest_value(panel, code)) if panel is not None \
+        else (lambda code: latest_value(df_hist, code))
+    latest_acc_val, latest_acc_year = latest('ACC_OWNERSHIP')
+    # Digital Payment Adoption (USG_DIGITAL_PAY is resolved to USG_DIGITAL_PAYMENT at load time)
+    latest_dig_val, _ = latest('USG_DIGITAL_PAYMENT')
+    # P2P / ATM Crossover
+    latest_cross_val, _ = latest('USG_CROSSOVER')
+    return [
+        ("Account Ownership Ratio", f"{latest_acc_val}%", f"Latest ({latest_acc_year})"),
+        ("Digital Payment Adoption", f"{latest_dig_val}%", "Latest Estimate"),
+        ("P2P/ATM Crossover Ratio", f"{latest_cross_val:.2f}", "Ratio > 1 indicates Digital Dominance"),
+    ]
+
+
+def overview_figure(summary_df):
+    if summary_df.empty:
+        return None
+    return px.line(summary_df, x='observation_date', y='value_numeric', color='indicator',
+                   title="Key Indicators Over Time",
+                   labels={'value_numeric': 'Value (%)', 'observation_date': 'Date'},
+                   render_mode=render_mode_for(len(summary_df)))
+
+
+def coverage_figure(profile):
+    """Observed months per year for each national series."""
+    coverage = profile['coverage']
+    coverage = coverage[~coverage.index.str.contains('[', regex=False)]
+    if coverage.empty:
+        return None
+    fig = px.imshow(coverage, aspect='auto', color_continuous_scale='Blues',
+                    labels={'x': 'Year', 'y': 'Indicator', 'color': 'Months observed'},
+                    title="Data Availability by Indicator and Year")
+    fig.update_layout(height=max(300, 22 * len(coverage)))
+    return fig
+
+
+# -----------------------------------------------------------------------------------
+# Trends
+# -----------------------------------------------------------------------------------
+def pillar_options(df_hist):
+    return df_hist['pillar'].unique() if 'pillar' in df_hist.columns else []
+
+
+def filter_trends(df_hist, selected_pillar, date_range):
+    mask = code_mask(df_hist['pillar'], selected_pillar) & \
+           (df_hist['observation_date'].dt.date >= date_range[0]) & \
+           (df_hist['observation_date'].dt.date <= date_range[1])
+    return df_hist[mask]
+
+
+def p2p_atm_figure(filtered_df):
+    """P2P vs ATM comparison bars, or None when neither series is present."""
+    p2p_atm_codes = ['USG_P2P_COUNT', 'USG_ATM_COUNT']
+    p2p_atm_df = filtered_df[codes_mask(filtered_df['indicator_code'], p2p_atm_codes)]
+    if p2p_atm_df.empty:
+        return None
+    return px.bar(p2p_atm_df, x='Year', y='value_numeric', color='indicator', barmode='group',
+                  title="Transaction Counts: P2P vs ATM",
+                  labels={'value_numeric': 'Count'})
+
+
+def trend_figure(trend_df, selected_pillar):
+    trend_df = trend_df[code_mask(trend_df['pillar'], selected_pillar)]
+    render_mode = render_mode_for(len(trend_df))
+    return px.line(trend_df, x='observation_date', y='value_numeric', color='indicator',
+                   markers=render_mode == 'svg',
+                   title=f"{selected_pillar} Metrics over Time",
+                   render_mode=render_mode)
+
+
+def pillar_codes(filtered_df):
+    return tuple(sorted(filtered_df['indicator_code'].dropna().unique()))
+
+
+# -----------------------------------------------------------------------------------
+# Forecasts
+# -----------------------------------------------------------------------------------
+def forecast_figure(df_forecast, selected_indicator):
+    # Note: Mapping Indicator codes if necessary. Forecast file uses ACC_OWNERSHIP, USG_DIGITAL_PAYMENT
+    subset = df_forecast[df_forecast['Indicator'] == selected_indicator]
+    # Use plot to show Scenarios
+    return px.line(subset, x='Year', y='Value', color='Scenario',
+                   markers=True,
+                   line_shape='spline',
+                   color_discrete_map=SCENARIO_COLORS,
+                   title=f"Projected {selected_indicator} (2025-2027)")
+
+
+# -----------------------------------------------------------------------------------
+# Inclusion Projections
+# -----------------------------------------------------------------------------------
+def projection_data(df_forecast, df_hist, selected_scenario):
+    """Forecast rows for the scenario and the ACC_OWNERSHIP history to draw behind them."""
+    acc_forecasts = df_forecast[code_mask(df_forecast['Indicator'], 'ACC_OWNERSHIP')]
+    scenario_data = acc_forecasts[acc_forecasts['Scenario'] == selected_scenario].sort_values('Year')
+    acc_hist = df_hist[code_mask(df_hist['indicator_code'], 'ACC_OWNERSHIP')].sort_values('Year')
+    return scenario_data, acc_hist
+
+
+def projection_figure(scenario_data, acc_hist, selected_scenario, target_val=TARGET_VALUE):
+    fig_proj = go.Figure()
+
+    # Historical Trace
+    if not acc_hist.empty:
+        fig_proj.add_trace(go.Scatter(x=acc_hist['Year'], y=acc_hist['value_numeric'],
+                                      mode='lines+markers', name='Historical',
+                                      line=dict(color='gray', dash='dot')))
+
+    # Forecast Trace
+    fig_proj.add_trace(go.Scatter(x=scenario_data['Year'], y=scenario_data['Value'],
+                                  mode='lines+markers', name=f'Forecast ({selected_scenario})',
+                                  line=dict(width=3)))
+
+    # Target Line
+    last_year = scenario_data['Year'].max() if not scenario_data.empty else 2027
+    first_year = acc_hist['Year'].min() if not acc_hist.empty else 2014
+
+    fig_proj.add_shape(type="line",
+                       x0=first_year, y0=target_val, x1=last_year, y1=target_val,
+                       line=dict(color="gold", width=2, dash="dash"),
+                       name="60% Target")
+
+    fig_proj.add_annotation(x=last_year, y=target_val, text="60% Target", showarrow=False, yshift=10)
+
+    fig_proj.update_layout(title="Financial Inclusion Trajectory vs Target",
+                           xaxis_title="Year", yaxis_title="Account Ownership (%)")
+    return fig_proj
+
+
+def crossing_year(scenario_data, target_val=TARGET_VALUE):
+    """First forecast year at or above the target, or None."""
+    reached = scenario_data[scenario_data['Value'] >= target_val]
+    return reached['Year'].iloc[0] if not reached.empty else None
+
+
+def crossing_message(selected_scenario, year):
+    """(is_success, text) describing whether the target is reached."""
+    if year:
+        return True, f"✅ Under the **{selected_scenario}** scenario, the 60% target is projected to be reached in **{int(year)}**."
+    return False, f"⚠️ Under the **{selected_scenario}** scenario, the 60% target may NOT be reached by 2027."
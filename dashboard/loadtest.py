@@ -0,0 +1,247 @@
+"""
+Concurrent-session load test for the Streamlit dashboard.
+
+Drives N headless sessions of app.py through Streamlit's AppTest against a synthetic
+data/ tree, so it runs fully offline:
+
+    python dashboard/loadtest.py --sessions 20 --records 200000
+
+Each session opens the app, visits every page, drags the Trends date slider and
+flips the Inclusion Projections scenario radio. Sessions run concurrently in worker
+processes. Reports p50/p95 rerun latency, memory per session and the cache hit rates
+of the app's st.cache_data / st.cache_resource functions, counted by the harness.
+"""
+import argparse
+import functools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT_DIR, 'dashboard', 'app.py')
+
+
+def _by_label(widgets, label):
+    return next((w for w in widgets if w.label == label), None)
+
+
+def run_session(session_id, slider_moves=3, timeout=120):
+    """Run one simulated user; returns (list of (action, seconds), AppTest)."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_id)
+    timings = []
+
+    def timed(action, fn):
+        start = time.perf_counter()
+        fn()
+        timings.append((action, time.perf_counter() - start))
+        if at.exception:
+            raise RuntimeError(f"session {session_id} raised on {action}: {at.exception[0].message}")
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed('open', at.run)
+
+    for page in ["Trends", "Forecasts", "Inclusion Projections", "Overview"]:
+        timed(f'page:{page}', at.sidebar.radio[0].set_value(page).run)
+
+        if page == "Trends" and at.slider:
+            # the slider opens on the full (min_date, max_date) range
+            lo, hi = at.slider[0].value
+            span = (hi - lo).days
+            for _ in range(slider_moves):
+                a, b = sorted(rng.sample(range(span + 1), 2))
+                new_range = (lo + timedelta(days=a), lo + timedelta(days=b))
+                timed('trends:slider', at.slider[0].set_value(new_range).run)
+
+        if page == "Inclusion Projections" and _by_label(at.radio, "Select Scenario"):
+            for option in _by_label(at.radio, "Select Scenario").options:
+                timed('projections:scenario', _by_label(at.radio, "Select Scenario").set_value(option).run)
+
+    return timings, at
+
+
+class CacheCounter:
+    """
+    Call and miss counts of the app's st.cache_data / st.cache_resource functions.
+
+    While installed, the two decorators wrap every function they cache: a call is counted
+    on the way in, a miss when the cache runs the function body. The app itself carries
+    no instrumentation.
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+        self._saved = None
+
+    def _count(self, counter, name):
+        with self._lock:
+            counter[name] += 1
+
+    def _decorator(self, original):
+        def decorator(func=None, **kwargs):
+            if func is None:  # used as @st.cache_data(ttl=...)
+                return lambda f: decorator(f, **kwargs)
+
+            @functools.wraps(func)
+            def body(*args, **kw):
+                self._count(self.misses, func.__name__)
+                return func(*args, **kw)
+
+            cached_func = original(body, **kwargs)
+
+            @functools.wraps(func)
+            def call(*args, **kw):
+                self._count(self.calls, func.__name__)
+                return cached_func(*args, **kw)
+            call.clear = cached_func.clear
+            return call
+        return decorator
+
+    def install(self):
+        import streamlit
+
+        self._saved = (streamlit.cache_data, streamlit.cache_resource)
+        streamlit.cache_data = self._decorator(streamlit.cache_data)
+        streamlit.cache_resource = self._decorator(streamlit.cache_resource)
+
+    def uninstall(self):
+        import streamlit
+
+        if self._saved is not None:
+            streamlit.cache_data, streamlit.cache_resource = self._saved
+            self._saved = None
+
+
+
+def cache_table(calls, misses):
+    """Calls, misses and hit rate per cached function."""
+    return pd.DataFrame([{'cache': name, 'calls': n, 'misses': misses.get(name, 0),
+                          'hit_rate': 1 - misses.get(name, 0) / n if n else np.nan}
+                         for name, n in calls.items()])
+
+
+def _run_sessions(session_ids, slider_moves):
+    """
+    Run sessions one after another in this worker process, sharing its Streamlit caches as
+    sessions on one server process do. Returns timings, cache counts and memory.
+    """
+    sys.path.insert(0, ROOT_DIR)
+    counter = CacheCounter()
+    counter.install()
+    tracemalloc.start()
+    mem_before, _ = tracemalloc.get_traced_memory()
+    try:
+        results = [(i, run_session(i, slider_moves)) for i in session_ids]
+        # the AppTest objects (and their session state) are still referenced here
+        mem_after, mem_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        counter.uninstall()
+    return {
+        'timings': [(i, action, secs) for i, (t, _) in results for action, secs in t],
+        'calls': dict(counter.calls),
+        'misses': dict(counter.misses),
+        'retained': mem_after - mem_before,
+        'peak': mem_peak - mem_before,
+    }
+
+
+def run_load_test(n_sessions=10, concurrency=None, records=50_000, data_dir=None, slider_moves=3):
+    """
+    Run n_sessions simulated users, `concurrency` at a time (default: one per CPU).
+
+    AppTest keeps per-run state in process globals (the Runtime instance, the appTest
+    config flag), so concurrent sessions run in separate worker processes; each worker
+    runs its share of the sessions back to back.
+    """
+    from src.synthetic import write_dataset
+
+    tmp = None
+    if data_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix='fi_loadtest_')
+        data_dir = os.path.join(tmp.name, 'data')
+        write_dataset(data_dir, records)
+    # figures.py reads FI_DATA_DIR at import, which happens inside the first AppTest run
+    # of each worker (workers inherit the environment).
+    os.environ['FI_DATA_DIR'] = data_dir
+
+    workers = max(1, min(concurrency or os.cpu_count() or 1, n_sessions))
+    shares = [list(range(w, n_sessions, workers)) for w in range(workers)]
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_run_sessions, shares, [slider_moves] * workers))
+    wall = time.perf_counter() - wall_start
+
+    timings = pd.DataFrame([row for r in results for row in r['timings']],
+                           columns=['session', 'action', 'seconds'])
+    calls, misses = Counter(), Counter()
+    for r in results:
+        calls.update(r['calls'])
+        misses.update(r['misses'])
+
+    if tmp is not None:
+        tmp.cleanup()
+
+    return {
+        'sessions': n_sessions,
+        'records': records,
+        'workers': workers,
+        'wall_seconds': wall,
+        'reruns': len(timings),
+        'latency': timings,
+        'memory_per_session_mb': sum(r['retained'] for r in results) / n_sessions / 1e6,
+        'peak_memory_mb': sum(r['peak'] for r in results) / 1e6,
+        'cache': cache_table(calls, misses),
+    }
+
+
+def summarize(result):
+    lat = result['latency']
+    by_action = lat.groupby(lat['action'].str.split(':').str[0])['seconds']
+    table = pd.DataFrame({
+        'reruns': by_action.size(),
+        'p50_ms': by_action.quantile(0.5) * 1000,
+        'p95_ms': by_action.quantile(0.95) * 1000,
+    }).round(1)
+
+    print(f"\nSessions: {result['sessions']} ({result['workers']} at a time)  Records: {result['records']}  "
+          f"Reruns: {result['reruns']}  Wall: {result['wall_seconds']:.1f}s")
+    print(f"Rerun latency overall: p50={lat['seconds'].quantile(0.5) * 1000:.1f} ms, "
+          f"p95={lat['seconds'].quantile(0.95) * 1000:.1f} ms")
+    print(table.to_string())
+    print(f"\nMemory per session (retained): {result['memory_per_session_mb']:.2f} MB  "
+          f"Peak (all workers): {result['peak_memory_mb']:.1f} MB")
+    if not result['cache'].empty:
+        print("\nCache hit rates:")
+        print(result['cache'].to_string(index=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for dashboard/app.py")
+    parser.add_argument('--sessions', type=int, default=10, help="Number of simulated users.")
+    parser.add_argument('--concurrency', type=int, default=None, help="Sessions running at once, each in its own process (default: one per CPU).")
+    parser.add_argument('--records', type=int, default=50_000, help="Synthetic unified records to generate.")
+    parser.add_argument('--data-dir', default=None, help="Use an existing data/ tree instead of synthetic data.")
+    parser.add_argument('--slider-moves', type=int, default=3, help="Trends slider moves per session.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    result = run_load_test(args.sessions, args.concurrency, args.records, args.data_dir, args.slider_moves)
+    summarize(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import json
 import os
 
-NOTEBOOK_PATH = r'C:\Users\yoga\code\10_Academy\week_10\notebooks\02_exploratory_data_analysis.ipynb'
+NOTEBOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'notebooks', '02_exploratory_data_analysis.ipynb')
 
 # CELL 8: Updated to include 'target_indicator' definition
 CODE_CELL_8 = [
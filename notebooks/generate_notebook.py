@@ -355,7 +355,9 @@ notebook_content = {
  "nbformat_minor": 4
 }
 
-with open(r'c:\Users\yoga\code\10_Academy\week_10\notebooks\02_exploratory_data_analysis.ipynb', 'w', encoding='utf-8') as f:
+NOTEBOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '02_exploratory_data_analysis.ipynb')
+
+with open(NOTEBOOK_PATH, 'w', encoding='utf-8') as f:
     json.dump(notebook_content, f, indent=1)
 
 print("Notebook generated successfully.")
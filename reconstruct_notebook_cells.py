@@ -1,8 +1,8 @@
 import json
 import os
 
-# Using absolute path for robustness as requested
-NOTEBOOK_PATH = r'C:\Users\yoga\code\10_Academy\week_10\notebooks\02_exploratory_data_analysis.ipynb'
+# Resolved from this script's location, so it works from any working directory
+NOTEBOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'notebooks', '02_exploratory_data_analysis.ipynb')
 
 # ---------------------------------------------------------
 # New Code Definitions
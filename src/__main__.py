@@ -0,0 +1,66 @@
+"""
+Single command-line entry point for the pipeline scripts.
+
+    python -m src validate [--fail-on never] [--coverage]
+    python -m src enrich
+    python -m src impacts [--no-plot]
+    python -m src forecast [--no-plot]
+    python -m src backtest [--horizon 3]
+    python -m src changepoints [--national-only]
+    python -m src kernels
+    python -m src render [--workers 4]
+    python -m src export [--out site]
+    python -m src pipeline [stage ...] [--dry-run]
+    python -m src notebooks [--force]
+
+Each command runs the matching script's main() with the remaining arguments
+(`python -m src forecast --help` shows them). Only the standard library is imported
+up front: pandas, the plotting libraries and optional engines are loaded by the command
+that needs them, so short scheduled jobs don't pay for what they don't use.
+"""
+import argparse
+import importlib
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# command -> (module, entry function, help)
+COMMANDS = {
+    'validate': ('src.validate_data', 'main', "Validate the unified dataset against reference codes."),
+    'enrich': ('src.enrich_data', 'enrich_data', "Append the curated enrichment records as a delta."),
+    'impacts': ('src.generate_impact_matrix', 'main', "Build the event x indicator impact matrix."),
+    'forecast': ('src.run_forecast', 'main', "Forecast 2025-2027 under the three scenarios."),
+    'backtest': ('src.backtest', 'main', "Rolling-origin backtest of the forecast model."),
+    'changepoints': ('src.changepoints', 'main', "Change points in the panel series, with candidate events."),
+    'kernels': ('src.kernels', 'main', "Check the compiled kernels against NumPy and time both."),
+    'render': ('src.render', 'main', "Render the impact and forecast figures."),
+    'export': ('export_static', 'main', "Export the dashboard as a static site."),
+    'notebooks': ('src.run_notebooks', 'main', "Execute the notebooks headless, re-running only stale cells."),
+    'pipeline': ('src.pipeline', 'main', "Run the out-of-date stages, enrich through report."),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands = '\n'.join(f"  {name:<14}{text}" for name, (_, _, text) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog='python -m src', formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=f"Ethiopia financial inclusion pipeline.\n\ncommands:\n{commands}",
+        epilog="Run 'python -m src <command> --help' for a command's options.")
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command')
+    # only the command is parsed here, everything after it belongs to the command
+    args = parser.parse_args(argv[:1])
+
+    module_name, entry, _ = COMMANDS[args.command]
+    if args.command == 'export':
+        # the static export lives with the dashboard modules, which import each other directly
+        sys.path.insert(0, os.path.join(ROOT_DIR, 'dashboard'))
+    module = importlib.import_module(module_name)
+    # the scripts parse sys.argv themselves
+    sys.argv = [f'python -m src {args.command}'] + argv[1:]
+    return getattr(module, entry)()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
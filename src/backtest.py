@@ -0,0 +1,100 @@
+"""
+Rolling-origin backtest of the forecast model on observed history.
+
+For every indicator and every year end with at least MIN_TRAIN observations before it,
+the baseline trend (run_forecast.train_baseline_model) is fitted on the observations up
+to that cutoff and, with the event add-ons, predicts the observations of the following
+HORIZON_YEARS years, exactly as the Base scenario of run_forecast would have.
+
+    python -m src.backtest
+    python -m src.backtest --indicators ACC_OWNERSHIP ACC_MOBILE_PEN --horizon 2
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.panel import ensure_panel
+from src.run_forecast import calculate_event_add_ons, generate_forecast, panel_history, train_baseline_model
+from src.schema import REFERENCE_PATH, UNIFIED_PATH, canonical_code, load_unified
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'backtest_predictions.csv')
+DEFAULT_INDICATORS = ['ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT']
+HORIZON_YEARS = 3
+MIN_TRAIN = 2
+
+
+def backtest(df, panel, indicators=DEFAULT_INDICATORS, horizon_years=HORIZON_YEARS, min_train=MIN_TRAIN):
+    """One row per held-out observation: indicator, cutoff, date, actual, predicted, error."""
+    rows = []
+    for code in indicators:
+        code = canonical_code(code)
+        history = panel_history(panel, code)
+        if len(history) <= min_train:
+            continue
+        dates = history['observation_date']
+        # event add-ons for the whole observed span, evaluated once and looked up per cutoff
+        add_ons = calculate_event_add_ons(df, dates.min(), dates.max(), code)
+
+        for year in sorted(dates.dt.year.unique())[:-1]:
+            cutoff = pd.Timestamp(year=year, month=12, day=31)
+            train = history[dates <= cutoff]
+            test = history[(dates > cutoff) & (dates <= cutoff + pd.DateOffset(years=horizon_years))]
+            if len(train) < min_train or test.empty:
+                continue
+            slope, intercept = train_baseline_model(train)
+            impacts = add_ons.reindex(pd.DatetimeIndex(test['observation_date']), fill_value=0.0)
+            predicted = generate_forecast(slope, intercept, impacts, 'Base')['Value'].to_numpy()
+            rows.append(pd.DataFrame({
+                'indicator': code,
+                'cutoff': cutoff,
+                'date': test['observation_date'].to_numpy(),
+                'horizon_months': ((test['observation_date'] - cutoff).dt.days / 30.44).round().astype(int).to_numpy(),
+                'actual': test['value_numeric'].to_numpy(),
+                'predicted': predicted,
+            }))
+    if not rows:
+        return pd.DataFrame(columns=['indicator', 'cutoff', 'date', 'horizon_months', 'actual', 'predicted', 'error'])
+    predictions = pd.concat(rows, ignore_index=True)
+    predictions['error'] = predictions['predicted'] - predictions['actual']
+    return predictions
+
+
+def score(predictions, by='indicator'):
+    """MAE, RMSE, bias and count of the backtest errors per group."""
+    errors = predictions.groupby(by)['error']
+    return pd.DataFrame({
+        'n': errors.size(),
+        'mae': errors.apply(lambda e: e.abs().mean()),
+        'rmse': errors.apply(lambda e: np.sqrt((e ** 2).mean())),
+        'bias': errors.mean(),
+    }).round(3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecast model.")
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--indicators', nargs='+', default=DEFAULT_INDICATORS)
+    parser.add_argument('--horizon', type=int, default=HORIZON_YEARS, help="Years predicted after each cutoff.")
+    parser.add_argument('--out', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    df = load_unified(args.data, args.ref)
+    predictions = backtest(df, ensure_panel(args.data, args.ref, df=df), args.indicators, args.horizon)
+    if predictions.empty:
+        print("Not enough history to backtest any indicator.")
+        return
+    print(f"Backtested {predictions['cutoff'].nunique()} cutoffs, {len(predictions)} held-out observations:")
+    print(score(predictions).to_string())
+
+    from src.snapshots import publish
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    version = publish(predictions, args.out, index=False)
+    print(f"Saved predictions to {args.out} (version {version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmarks of the hot paths on synthetic unified datasets (src/synthetic.py), fully offline.
+
+For every dataset size each case is timed (median / min of --repeat runs) and then run once
+more under tracemalloc for its peak allocation. Results are appended to a JSON history so
+runs from different commits can be compared; cases slower than the previous run of the
+same size by more than --threshold are reported as regressions.
+
+    python -m src.benchmark                        # 1k and 100k records
+    python -m src.benchmark --sizes 1k 100k 10m    # 10M records needs a few GB of RAM
+    python -m src.benchmark --cases csv_load resolve_links --repeat 5
+
+Generated datasets are kept in --cache-dir, keyed by size, seed and a hash of the generator
+(src/synthetic.py), so later runs only pay for the benchmarks.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src import synthetic
+from src.impacts import event_table, impact_matrix, resolve_links
+from src.schema import code_mask, load_unified
+from src.snapshots import git_commit
+from src.synthetic import write_dataset
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_PATH = os.path.join(BASE_DIR, 'reports', 'benchmark_history.json')
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'fi_benchmark_data')
+SIZES = {'1k': 1_000, '100k': 100_000, '10m': 10_000_000}
+DEFAULT_SIZES = ['1k', '100k']
+CASES = ['csv_load', 'resolve_links', 'event_add_ons', 'train_baseline', 'generate_forecast',
+         'matrix_pivot', 'dashboard_filters']
+# A case this much slower than the previous run of the same size is flagged.
+REGRESSION_THRESHOLD = 1.25
+INDICATOR = 'ACC_OWNERSHIP'
+START, END = '2020-01-01', '2027-12-31'
+
+
+def generator_hash():
+    """Short hash of src/synthetic.py: a changed generator must not reuse old cached datasets."""
+    with open(synthetic.__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def dataset(size, cache_dir=CACHE_DIR, seed=0):
+    """(unified csv path, reference codes path) of a cached synthetic data/ tree."""
+    data_dir = os.path.join(cache_dir, f'{size}_seed{seed}_{generator_hash()}')
+    unified = os.path.join(data_dir, 'raw', 'ethiopia_fi_unified_data.csv')
+    if not os.path.exists(unified):
+        print(f"Generating {SIZES[size]} synthetic records in {data_dir}...", flush=True)
+        write_dataset(data_dir, SIZES[size], seed=seed)
+    return unified, os.path.join(data_dir, 'raw', 'reference_codes.csv')
+
+
+def build_cases(unified, ref):
+    """
+    {name: zero-argument callable} for every benchmarked path.
+
+    Inputs each case needs (loaded table, resolved links, ...) are prepared here once,
+    so a case only measures its own step.
+    """
+    # the dashboard helpers pull in plotly, import them (and the forecast script) only here
+    from src import run_forecast
+    sys.path.insert(0, os.path.join(BASE_DIR, 'dashboard'))
+    import figures
+
+    df = load_unified(unified, ref)
+    events = event_table(df)
+    links = df[df['record_type'] == 'impact_link']
+    resolved, _, _ = resolve_links(links, events)
+
+    obs = df[code_mask(df['record_type'], 'observation')]
+    history = obs.loc[code_mask(obs['indicator_code'], INDICATOR), ['observation_date', 'value_numeric']]
+    slope, intercept = run_forecast.train_baseline_model(history)
+    add_ons = run_forecast.calculate_event_add_ons(df, START, END, INDICATOR)
+
+    df_hist = df.assign(Year=df['observation_date'].dt.year)
+    pillar = df_hist['pillar'].dropna().iloc[0]
+    dates = df_hist['observation_date'].dropna()
+    date_range = (dates.min().date(), dates.max().date())
+
+    def dashboard_filters():
+        filtered = figures.filter_trends(df_hist, pillar, date_range)
+        figures.select_series(filtered, list(figures.pillar_codes(filtered))[:5], *date_range)
+
+    return {
+        'csv_load': lambda: load_unified(unified, ref),
+        'resolve_links': lambda: resolve_links(links, event_table(df)),
+        'event_add_ons': lambda: run_forecast.calculate_event_add_ons(df, START, END, INDICATOR),
+        'train_baseline': lambda: run_forecast.train_baseline_model(history),
+        'generate_forecast': lambda: [run_forecast.generate_forecast(slope, intercept, add_ons, s)
+                                      for s in ['Base', 'Optimistic', 'Pessimistic']],
+        'matrix_pivot': lambda: impact_matrix(resolved),
+        'dashboard_filters': dashboard_filters,
+    }
+
+
+def measure(fn, repeat=3):
+    """(median seconds, min seconds, peak traced MB) of fn."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    # separate run: tracemalloc slows allocation-heavy code down, so it is not timed
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return float(np.median(times)), float(min(times)), peak / 1e6
+
+
+def run(sizes=DEFAULT_SIZES, cases=None, repeat=3, cache_dir=CACHE_DIR):
+    """Run the suite; returns one history entry (run metadata plus a result row per size and case)."""
+    results = []
+    for size in sizes:
+        unified, ref = dataset(size, cache_dir)
+        available = build_cases(unified, ref)
+        for name in cases or CASES:
+            median, fastest, peak_mb = measure(available[name], repeat)
+            results.append({'size': size, 'records': SIZES[size], 'case': name, 'seconds': round(median, 6),
+                            'min_seconds': round(fastest, 6), 'peak_mb': round(peak_mb, 3)})
+            print(f"  {size:>5} {name:<18} {median * 1000:10.1f} ms  peak {peak_mb:9.1f} MB", flush=True)
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(history, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+
+def compare(entry, history, threshold=REGRESSION_THRESHOLD):
+    """
+    Each result next to the latest earlier run of the same size and case, with the ratio of
+    their fastest runs (less noisy than the median for millisecond cases).
+    """
+    previous = {}
+    for old in history:
+        for r in old['results']:
+            previous[(r['size'], r['case'])] = (old.get('commit'), r['min_seconds'])
+    rows = []
+    for r in entry['results']:
+        commit, fastest = previous.get((r['size'], r['case']), (None, np.nan))
+        rows.append({'size': r['size'], 'case': r['case'], 'min_seconds': r['min_seconds'],
+                     'previous': fastest, 'previous_commit': commit, 'ratio': r['min_seconds'] / fastest})
+    table = pd.DataFrame(rows)
+    table['regression'] = table['ratio'] > threshold
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths on synthetic data.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=DEFAULT_SIZES)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=None, help="Subset of cases (default: all).")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Where generated datasets are kept.")
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--no-save', action='store_true', help="Don't append this run to the history.")
+    args = parser.parse_args()
+
+    entry = run(args.sizes, args.cases, args.repeat, args.cache_dir)
+    history = load_history(args.history)
+    table = compare(entry, history, args.threshold)
+    print("\nCompared with the previous run:")
+    print(table.round(4).to_string(index=False))
+    regressions = table[table['regression']]
+    if not regressions.empty:
+        print(f"\n{len(regressions)} case(s) slower than {args.threshold:.2f}x the previous run: "
+              f"{', '.join(regressions['size'] + '/' + regressions['case'])}")
+
+    if not args.no_save:
+        save_history(history + [entry], args.history)
+        print(f"\nAppended run to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
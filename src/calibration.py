@@ -0,0 +1,187 @@
+"""
+Calibrate impact-link effect sizes against observed indicator histories.
+
+For every national indicator series targeted by event links the model is
+
+    y_s(t) = a_s + b_s * t + sum over links l -> s of  effect_l * response_l(t)
+
+where response_l is the link's response shape from event date + lag (as used by the forecasts).
+All series are fitted in one ridge solve over the sparse observations x (trends + effects)
+design matrix, shrinking each effect towards its prior rather than towards zero:
+
+    minimize ||y - X theta||^2 + lam * ||effect - prior||^2
+
+Priors are impact_estimate where given, else the qualitative impact_magnitude label
+(impacts.MAGNITUDE_PRIORS), signed by impact_direction. mode='link' fits one effect per
+link; mode='class' fits one magnitude per label (high / medium / ...) shared by all links
+with that label, keeping links with an explicit impact_estimate fixed.
+
+    python -m src.calibration --mode class
+    python -m src.calibration --mode link --apply     # write fitted estimates back as deltas
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+from src import response_shapes
+from src.impacts import DIRECTION_SIGN, MAGNITUDE_PRIORS
+from src.panel import ensure_panel, row_index
+from src.propagation import split_links
+from src.schema import REFERENCE_PATH, UNIFIED_PATH, canonical_code, code_mask, load_unified
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'calibrated_impacts.csv')
+# Small ridge on the per-series trend terms, only to keep series with one observation solvable.
+TREND_RIDGE = 1e-6
+UNLABELED = 'unlabeled'
+
+
+def link_table(df):
+    """Dated event links with their target, prior effect, sign, magnitude class and fixed flag."""
+    event_links, _ = split_links(df)
+    is_link = code_mask(df['record_type'], 'impact_link')
+    meta = df.loc[is_link, ['record_id', 'impact_direction', 'impact_magnitude', 'impact_estimate']]
+    meta = meta.drop_duplicates('record_id', keep='last')
+    links = event_links.merge(meta, on='record_id', how='left')
+    links['target_indicator'] = links['target_indicator'].astype(str).map(canonical_code)
+    links['sign'] = links['impact_direction'].astype(object).map(DIRECTION_SIGN).fillna(1).to_numpy(dtype=float)
+    labels = links['impact_magnitude'].astype(object).fillna(UNLABELED).astype(str).str.lower()
+    links['magnitude_class'] = labels.where(labels.isin(list(MAGNITUDE_PRIORS)), UNLABELED)
+    links['fixed'] = pd.to_numeric(links['impact_estimate'], errors='coerce').notna().to_numpy()
+    return links.rename(columns={'net_impact': 'prior'})
+
+
+def _gram(rows, cols, vals, y, n_cols):
+    """Sparse X^T X and X^T y for X given as COO triplets."""
+    X = sparse.csr_matrix((vals, (rows, cols)), shape=(len(y), n_cols))
+    return (X.T @ X).tocsc(), X.T @ y
+
+
+def calibrate(df, panel=None, mode='class', lam=1.0):
+    """
+    Fit effect sizes; returns (per-link table with prior / calibrated, parameter table).
+
+    In 'class' mode the parameter table has one row per magnitude class, in 'link' mode
+    one row per link.
+    """
+    if mode not in ('link', 'class'):
+        raise ValueError(f"Unknown calibration mode '{mode}' (expected 'link' or 'class')")
+    panel = ensure_panel(df=df) if panel is None else panel
+    links = link_table(df)
+    links['series'] = [row_index(panel, code) for code in links['target_indicator']]
+    links = links[links['series'].notna()].reset_index(drop=True)
+    links['series'] = links['series'].astype(int)
+    if links.empty:
+        return links.assign(calibrated=pd.Series(dtype=float)), pd.DataFrame()
+
+    # observations of the targeted series, grouped by series
+    series_ids = np.unique(links['series'].to_numpy())
+    mask = np.asarray(panel['mask'])[series_ids]
+    local_series, obs_month = np.nonzero(mask)
+    y = np.asarray(panel['values'])[series_ids][local_series, obs_month].astype(np.float64)
+    n_obs = np.bincount(local_series, minlength=len(series_ids))
+    obs_start = np.cumsum(n_obs) - n_obs
+    months = panel['months']
+    t_years = ((months - months[0]) / pd.Timedelta(days=365.25)).to_numpy()[obs_month]
+
+    # link x observation entries: every link touches every observation of its series
+    link_local = np.searchsorted(series_ids, links['series'].to_numpy())
+    counts = n_obs[link_local]
+    rep = np.repeat(np.arange(len(links)), counts)
+    offsets = np.arange(len(rep)) - np.repeat(np.cumsum(counts) - counts, counts)
+    obs_rows = obs_start[link_local][rep] + offsets
+    response = response_shapes.response(links, months)[rep, obs_month[obs_rows]]
+
+    n_trend = 2 * len(series_ids)
+    rows = [np.arange(len(y)), np.arange(len(y))]
+    cols = [2 * local_series, 2 * local_series + 1]
+    vals = [np.ones(len(y)), t_years]
+
+    if mode == 'link':
+        params = links[['record_id', 'event_name', 'target_indicator', 'magnitude_class']].copy()
+        params['prior'] = links['prior'].to_numpy()
+        rows.append(obs_rows)
+        cols.append(n_trend + rep)
+        vals.append(response)
+    else:
+        classes = list(MAGNITUDE_PRIORS) + [UNLABELED]
+        class_idx = pd.Index(classes).get_indexer(links['magnitude_class'])
+        fixed = links['fixed'].to_numpy()
+        # links with an explicit estimate are an offset, not a parameter
+        y = y - np.bincount(obs_rows, weights=(links['prior'].to_numpy()[rep] * response) * fixed[rep],
+                            minlength=len(y))
+        free = ~fixed[rep]
+        rows.append(obs_rows[free])
+        cols.append(n_trend + class_idx[rep][free])
+        vals.append((links['sign'].to_numpy()[rep] * response)[free])
+        params = pd.DataFrame({'magnitude_class': classes,
+                               'prior': [MAGNITUDE_PRIORS.get(c, 0.0) for c in classes],
+                               'n_links': np.bincount(class_idx[~fixed], minlength=len(classes))})
+
+    rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+    keep = vals != 0
+    n_cols = n_trend + len(params)
+    gram, rhs = _gram(rows[keep], cols[keep], vals[keep], y, n_cols)
+
+    penalty = np.r_[np.full(n_trend, TREND_RIDGE), np.full(len(params), lam)]
+    target = np.r_[np.zeros(n_trend), params['prior'].to_numpy(dtype=float)]
+    # trends and link effects only couple within their series, so the system stays sparse
+    theta = spsolve((gram + sparse.diags(penalty)).tocsc(), rhs + penalty * target)
+    params['calibrated'] = theta[n_trend:]
+
+    if mode == 'link':
+        links['calibrated'] = params['calibrated'].to_numpy()
+    else:
+        fitted = params.set_index('magnitude_class')['calibrated']
+        links['calibrated'] = np.where(links['fixed'], links['prior'],
+                                       links['sign'] * fitted.reindex(links['magnitude_class']).to_numpy())
+    return links, params
+
+
+def apply_calibration(df, links):
+    """impact_link rows of df with impact_estimate set so that direction x estimate = calibrated."""
+    calibrated = links.set_index('record_id')['calibrated']
+    sign = links.set_index('record_id')['sign']
+    is_link = code_mask(df['record_type'], 'impact_link')
+    rows = df[is_link & df['record_id'].isin(calibrated.index).to_numpy()].copy()
+    # a link with no direction (stabilize / mixed) has no effect to scale
+    s = sign.reindex(rows['record_id']).to_numpy()
+    rows = rows[s != 0]
+    rows['impact_estimate'] = (calibrated.reindex(rows['record_id']).to_numpy() / s[s != 0]).round(6)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit impact-link effect sizes to observed history.")
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--mode', choices=['class', 'link'], default='class')
+    parser.add_argument('--lam', type=float, default=1.0, help="Ridge strength towards the priors.")
+    parser.add_argument('--out', default=OUTPUT_PATH)
+    parser.add_argument('--apply', action='store_true',
+                        help="Append the calibrated impact_estimates to the store as a delta segment.")
+    args = parser.parse_args()
+
+    df = load_unified(args.data, args.ref)
+    links, params = calibrate(df, ensure_panel(args.data, args.ref, df=df), args.mode, args.lam)
+    print(f"Calibrated {len(links)} links ({args.mode} mode, lam={args.lam}):")
+    print(params.round(4).to_string(index=False))
+
+    from src.snapshots import publish
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    version = publish(links.drop(columns=['series']), args.out, index=False)
+    print(f"Saved per-link calibration to {args.out} (version {version})")
+
+    if args.apply:
+        from src.delta_store import append_records, read_merged
+        raw = read_merged(args.data)
+        written = append_records(apply_calibration(raw, links), args.data)
+        print(f"Wrote {written} updated impact links to the delta store")
+
+
+if __name__ == "__main__":
+    main()
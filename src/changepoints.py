@@ -0,0 +1,257 @@
+"""
+Change points in every panel series, next to the recorded events that could explain them.
+
+Each series (indicator x gender x location row of the panel) is modeled as piecewise
+linear in time. Binary segmentation splits a segment where two separate trend lines fit
+its observations better than one: the gain in residual sum of squares, in units of the
+series' noise variance, must exceed PENALTY x log(observations). The noise scale is the
+robust spread (MAD) of the series' second differences. All series are scanned together:
+observations are packed into a [series x observation] array, segment fits come from
+prefix sums, and every candidate split of every open segment is scored in one pass per
+round.
+
+Each break is reported with the nearest recorded event and, among the impact links that
+target the indicator, the event whose date + lag lands closest to the break.
+
+    python -m src.changepoints
+    python -m src.changepoints --indicators ACC_OWNERSHIP --national-only
+"""
+import argparse
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.impacts import event_table, resolve_links
+from src.schema import canonical_code, code_mask
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'processed', 'changepoints.csv')
+# Split threshold: gain in noise variances per log(observations), about BIC for 3 extra parameters.
+PENALTY = 3.0
+MAX_BREAKS = 3
+# Observations each side of a break needs (two fit a line).
+MIN_SIZE = 2
+# Noise scale floor, relative to the series' own spread, so exact straight lines don't split on rounding.
+MIN_NOISE = 0.01
+DAYS_PER_MONTH = 30.44
+
+
+def pack(panel, rows=None):
+    """
+    Observed points of each panel row, left-aligned: dates [R, L] (datetime64, NaT padded),
+    values [R, L] (NaN padded) and counts [R].
+    """
+    mask = np.asarray(panel['mask']) if rows is None else np.asarray(panel['mask'])[rows]
+    values = np.asarray(panel['values']) if rows is None else np.asarray(panel['values'])[rows]
+    counts = mask.sum(axis=1)
+    width = int(counts.max()) if len(counts) else 0
+    # observed columns first, in month order
+    cols = np.argsort(~mask, axis=1, kind='stable')[:, :width]
+    valid = np.arange(width)[None, :] < counts[:, None]
+    months = panel['months'].to_numpy()
+    dates = np.where(valid, months[cols], np.datetime64('NaT'))
+    vals = np.where(valid, np.take_along_axis(values, cols, axis=1).astype(float), np.nan)
+    return dates, vals, counts
+
+
+def _prefix(v):
+    return np.concatenate([np.zeros((v.shape[0], 1)), np.cumsum(v, axis=1)], axis=1)
+
+
+def _segment_fit(P, rows, a, b):
+    """Least-squares line (intercept, slope) and residual sum of squares of points [a, b) of each row."""
+    n, Sx, Sy, Sxx, Sxy, Syy = (p[rows, b] - p[rows, a] for p in P)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = Sxx - Sx * Sx / n
+        sxy = Sxy - Sx * Sy / n
+        syy = Syy - Sy * Sy / n
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        sse = np.maximum(syy - slope * sxy, 0.0)
+        intercept = (Sy - slope * Sx) / n
+    return intercept, slope, np.where(n > 0, sse, 0.0)
+
+
+def detect(panel, rows=None, penalty=PENALTY, max_breaks=MAX_BREAKS, min_size=MIN_SIZE):
+    """
+    Breaks in the panel series (all rows, or the given row positions): one row per break
+    with the series keys, the last observation before and first after the break, the
+    score (RSS gain in noise variances), level shift at the break and slopes per year
+    on either side (in the series' units).
+    """
+    row_ids = np.arange(len(panel['rows'])) if rows is None else np.asarray(rows)
+    dates, y, counts = pack(panel, row_ids)
+    R, L = y.shape
+    valid = np.isfinite(y)
+    x = np.where(valid, (dates - np.datetime64('2000-01-01')).astype('timedelta64[D]').astype(float) / 365.25, 0.0)
+
+    # per-series centre and noise scale, so scores are comparable across units
+    centre = np.nanmean(np.where(valid, y, np.nan), axis=1) if L else np.zeros(R)
+    d2 = np.diff(np.where(valid, y, np.nan), n=2, axis=1)
+    with warnings.catch_warnings():
+        # series with fewer than three observations have no second differences
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mad = np.nanmedian(np.abs(d2 - np.nanmedian(d2, axis=1, keepdims=True)), axis=1) if L > 2 else np.full(R, np.nan)
+        spread = np.nanstd(np.where(valid, y, np.nan), axis=1) if L else np.zeros(R)
+    noise = 1.4826 * mad / np.sqrt(6.0)
+    noise = np.fmax(np.nan_to_num(noise), MIN_NOISE * np.nan_to_num(spread))
+    noise = np.where(noise > 0, noise, 1.0)
+    x_mid = np.where(counts > 0, x.sum(axis=1) / np.maximum(counts, 1), 0.0)
+    xs = np.where(valid, x - x_mid[:, None], 0.0)
+    ys = np.where(valid, (y - np.nan_to_num(centre)[:, None]) / noise[:, None], 0.0)
+    w = valid.astype(float)
+    P = [_prefix(v) for v in (w, xs, ys, xs * xs, xs * ys, ys * ys)]
+    threshold = penalty * np.log(np.maximum(counts, 2))
+
+    # open segments: (series, start, end) over packed positions
+    seg_row = np.flatnonzero(counts >= 2 * min_size)
+    seg_a = np.zeros(len(seg_row), dtype=np.int64)
+    seg_b = counts[seg_row].astype(np.int64)
+    found = []
+    for _ in range(max_breaks):
+        if not len(seg_row):
+            break
+        # candidate split k = a + offset for every open segment, scored at once
+        offsets = np.arange(min_size, max(int((seg_b - seg_a).max()) - min_size + 1, min_size + 1))
+        k = seg_a[:, None] + offsets[None, :]
+        ok = k <= (seg_b - min_size)[:, None]
+        k = np.where(ok, k, seg_a[:, None] + min_size)
+        rr = np.broadcast_to(seg_row[:, None], k.shape)
+        _, _, whole = _segment_fit(P, seg_row, seg_a, seg_b)
+        _, _, left = _segment_fit(P, rr, np.broadcast_to(seg_a[:, None], k.shape), k)
+        _, _, right = _segment_fit(P, rr, k, np.broadcast_to(seg_b[:, None], k.shape))
+        gain = np.where(ok, whole[:, None] - left - right, -np.inf)
+        best = np.argmax(gain, axis=1)
+        best_gain = gain[np.arange(len(seg_row)), best]
+        split = best_gain > threshold[seg_row]
+        if not split.any():
+            break
+        ks = k[np.arange(len(seg_row)), best][split]
+        s_row, s_a, s_b = seg_row[split], seg_a[split], seg_b[split]
+        found.append((s_row, s_a, ks, s_b, best_gain[split]))
+        # both halves stay open if they are long enough to split again
+        seg_row = np.concatenate([s_row, s_row])
+        seg_a = np.concatenate([s_a, ks])
+        seg_b = np.concatenate([ks, s_b])
+        keep = (seg_b - seg_a) >= 2 * min_size
+        seg_row, seg_a, seg_b = seg_row[keep], seg_a[keep], seg_b[keep]
+
+    columns = list(panel['rows'].columns) + ['before', 'after', 'n_obs', 'score', 'level_shift',
+                                             'slope_before', 'slope_after']
+    if not found:
+        return pd.DataFrame(columns=columns)
+    s_row, s_a, ks, s_b, score = (np.concatenate(parts) for parts in zip(*found))
+    a_l, b_l, _ = _segment_fit(P, s_row, s_a, ks)
+    a_r, b_r, _ = _segment_fit(P, s_row, ks, s_b)
+    # fitted jump where the right segment starts, back in the series' units
+    xk = xs[s_row, ks]
+    scale = noise[s_row]
+    breaks = panel['rows'].iloc[row_ids[s_row]].reset_index(drop=True)
+    breaks['before'] = dates[s_row, ks - 1]
+    breaks['after'] = dates[s_row, ks]
+    breaks['n_obs'] = counts[s_row]
+    breaks['score'] = np.round(score, 2)
+    breaks['level_shift'] = ((a_r + b_r * xk) - (a_l + b_l * xk)) * scale
+    breaks['slope_before'] = b_l * scale
+    breaks['slope_after'] = b_r * scale
+    return breaks.sort_values(['indicator_code', 'gender', 'location', 'after'], ignore_index=True)
+
+
+def _months(delta):
+    return np.round(delta / np.timedelta64(1, 'D') / DAYS_PER_MONTH, 1)
+
+
+def attach_events(breaks, df):
+    """
+    Nearest recorded event to each break (by distance to the [before, after] window),
+    and the linked event (an impact link targeting the indicator) whose date + lag is
+    closest, with the link's lag and the months from that event to the break.
+    """
+    out = breaks.copy()
+    for col in ['nearest_event', 'event_date', 'event_to_break_months',
+                'linked_event', 'link_lag_months', 'linked_to_break_months']:
+        out[col] = pd.Series([None] * len(out), dtype=object)
+    if out.empty:
+        return out
+    before = out['before'].to_numpy(dtype='datetime64[ns]')
+    after = out['after'].to_numpy(dtype='datetime64[ns]')
+
+    def window_distance(when):
+        """[break, candidate] distance of each candidate date to each break's window (0 inside)."""
+        early = before[:, None] - when[None, :]
+        late = when[None, :] - after[:, None]
+        zero = np.timedelta64(0, 'ns')
+        return np.maximum(np.maximum(early, zero), np.maximum(late, zero)).astype('float64')
+
+    events = event_table(df)
+    event_dates = pd.to_datetime(events['observation_date'], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    dated = ~np.isnat(event_dates)
+    if dated.any():
+        names, when = events['indicator'].to_numpy()[dated], event_dates[dated]
+        best = np.argmin(window_distance(when), axis=1)
+        out['nearest_event'] = names[best]
+        out['event_date'] = when[best]
+        out['event_to_break_months'] = _months(after - when[best])
+
+    is_link = code_mask(df['record_type'], 'impact_link')
+    if is_link.any():
+        links, _, _ = resolve_links(df[is_link], events)
+        if not links.empty:
+            targets = links['target_indicator'].astype(str).map(canonical_code).to_numpy()
+            lag = pd.to_numeric(links['lag_months'], errors='coerce').fillna(0).to_numpy()
+            effect = (links['event_date'].to_numpy(dtype='datetime64[ns]') +
+                      np.round(lag * DAYS_PER_MONTH).astype('timedelta64[D]'))
+            dist = window_distance(effect)
+            dist[out['indicator_code'].map(canonical_code).to_numpy()[:, None] != targets[None, :]] = np.inf
+            best = np.argmin(dist, axis=1)
+            has = np.isfinite(dist[np.arange(len(out)), best])
+            out.loc[has, 'linked_event'] = links['event_name'].to_numpy()[best[has]]
+            out.loc[has, 'link_lag_months'] = lag[best[has]]
+            out.loc[has, 'linked_to_break_months'] = _months(
+                after[has] - links['event_date'].to_numpy(dtype='datetime64[ns]')[best[has]])
+    return out
+
+
+def main():
+    from src.panel import ensure_panel
+    from src.schema import REFERENCE_PATH, UNIFIED_PATH, load_unified
+    from src.snapshots import publish
+
+    parser = argparse.ArgumentParser(description="Change points in the panel series, with candidate events.")
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--indicators', nargs='+', default=None, help="Only these indicator codes.")
+    parser.add_argument('--national-only', action='store_true', help="Skip gender / location disaggregations.")
+    parser.add_argument('--penalty', type=float, default=PENALTY)
+    parser.add_argument('--max-breaks', type=int, default=MAX_BREAKS, help="Rounds of binary segmentation.")
+    parser.add_argument('--out', default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    df = load_unified(args.data, args.ref)
+    panel = ensure_panel(args.data, args.ref, df=df)
+    keys = panel['rows']
+    select = np.ones(len(keys), dtype=bool)
+    if args.indicators:
+        select &= keys['indicator_code'].isin([canonical_code(c) for c in args.indicators]).to_numpy()
+    if args.national_only:
+        select &= ((keys['gender'] == 'all') & (keys['location'] == 'national')).to_numpy()
+
+    breaks = attach_events(detect(panel, np.flatnonzero(select), args.penalty, args.max_breaks), df)
+    print(f"Scanned {int(select.sum())} series: {len(breaks)} breaks in "
+          f"{breaks[['indicator_code', 'gender', 'location']].drop_duplicates().shape[0] if len(breaks) else 0} series")
+    if breaks.empty:
+        return
+    shown = ['indicator_code', 'gender', 'location', 'before', 'after', 'score', 'level_shift',
+             'nearest_event', 'event_to_break_months', 'linked_event', 'link_lag_months', 'linked_to_break_months']
+    top = breaks.sort_values('score', ascending=False).head(20)
+    print(top[shown].assign(before=top['before'].dt.date, after=top['after'].dt.date,
+                            level_shift=top['level_shift'].round(2)).to_string(index=False))
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    version = publish(breaks, args.out, index=False)
+    print(f"Saved breaks to {args.out} (version {version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Append-only store on top of the unified CSV.
+
+New records go to small delta segments next to the base snapshot:
+
+    data/raw/ethiopia_fi_unified_data.csv                    base snapshot
+    data/raw/deltas/ethiopia_fi_unified_data/delta_*.csv     append-only segments
+    data/raw/deltas/ethiopia_fi_unified_data/_index.csv      record_id -> content hash
+
+A record is only written if its record_id is new or its content hash changed, so
+re-running an ingest is a no-op. Readers get base + deltas with the latest version of
+each record_id winning; `compact` folds the deltas back into the base.
+
+A version of the merged view (`current_version`) names the base snapshot and the last
+delta segment, "<base version>+<segment stamp>", so a pinned reader sees neither later
+appends nor a later compaction.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src import snapshots
+from src.snapshots import publish, resolve
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNIFIED_PATH = os.path.join(BASE_DIR, 'data', 'raw', 'ethiopia_fi_unified_data.csv')
+
+# Fields that change on every run without changing the record itself.
+HASH_EXCLUDE = ('collection_date',)
+INDEX_FILE = '_index.csv'
+INDEX_COLUMNS = ['record_id', 'content_hash']
+
+# index path -> (file identity, bytes read, {record_id: content_hash}); appends since
+# the last read are read from the stored offset instead of re-reading the whole index
+_INDEX_CACHE = {}
+
+
+def delta_dir(base_path=UNIFIED_PATH):
+    stem = os.path.splitext(os.path.basename(base_path))[0]
+    return os.path.join(os.path.dirname(base_path), 'deltas', stem)
+
+
+def delta_files(base_path=UNIFIED_PATH):
+    # names sort chronologically
+    return sorted(glob.glob(os.path.join(delta_dir(base_path), 'delta_*.csv')))
+
+
+def _stamp(segment):
+    return os.path.basename(segment)[len('delta_'):-len('.csv')]
+
+
+def current_version(base_path=UNIFIED_PATH):
+    """Version of the merged view: the base snapshot version, plus the newest delta segment if any."""
+    base = snapshots.current_version(base_path)
+    segments = delta_files(base_path)
+    if not segments:
+        return base
+    return f"{base or ''}+{_stamp(segments[-1])}"
+
+
+def _version_files(base_path, version=None):
+    """(base file, delta segments) making up `version` of the merged view (default: current)."""
+    segments = delta_files(base_path)
+    if version is None:
+        return resolve(base_path), segments
+    base_version, _, upto = version.partition('+')
+    base_version = base_version or None
+    if upto and base_version != snapshots.current_version(base_path):
+        # the deltas on top of the pinned base now live in a newer base
+        raise FileNotFoundError(f"Delta segments of version {version} of {base_path} were compacted")
+    return resolve(base_path, base_version), [p for p in segments if upto and _stamp(p) <= upto]
+
+
+def source_signature(base_path=UNIFIED_PATH, version=None):
+    """Fingerprint (path, size, mtime) of the base snapshot and the delta segments of `version`."""
+    sig = []
+    base_file, segments = _version_files(base_path, version)
+    for path in [base_file] + segments:
+        if os.path.exists(path):
+            st = os.stat(path)
+            sig.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return json.dumps(sig)
+
+
+def _normalize(col):
+    """String form of a column that survives a CSV round trip (12 and 12.0 hash alike)."""
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        return col.astype('float64').astype(str)
+    return col.astype(str).str.strip()
+
+
+def content_hash(df):
+    """uint64 hash per row over its non-null fields, independent of column order."""
+    cols = sorted(c for c in df.columns if c not in HASH_EXCLUDE)
+    joined = pd.Series('', index=df.index, dtype=object)
+    for col in cols:
+        values = df[col]
+        # null fields contribute nothing, so extra all-null columns don't change the hash
+        joined = joined + ('\x1f' + col + '=' + _normalize(values)).where(values.notna(), '')
+    return pd.util.hash_pandas_object(joined, index=False).to_numpy()
+
+
+def _index_path(base_path):
+    return os.path.join(delta_dir(base_path), INDEX_FILE)
+
+
+def _read_index(base_path):
+    """{record_id: content_hash} of the merged view; latest entry per record_id wins."""
+    path = _index_path(base_path)
+    if not os.path.exists(path):
+        if not os.path.exists(base_path) and not delta_files(base_path):
+            return {}
+        build_index(base_path)
+    st = os.stat(path)
+    identity = (st.st_dev, st.st_ino)
+    cached = _INDEX_CACHE.get(path)
+    if cached is not None and cached[0] == identity and cached[1] <= st.st_size:
+        _, offset, index = cached
+    else:
+        # first read, or the index was rebuilt (build_index replaces the file)
+        offset, index = 0, {}
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        tail = f.read(st.st_size - offset)
+    # only complete lines; a concurrent append may be half written
+    tail = tail[:tail.rfind(b'\n') + 1]
+    if tail:
+        rows = pd.read_csv(io.BytesIO(tail), header=0 if offset == 0 else None, names=INDEX_COLUMNS,
+                           dtype={'record_id': str, 'content_hash': np.uint64})
+        index.update(zip(rows['record_id'], rows['content_hash']))
+        offset += len(tail)
+    _INDEX_CACHE[path] = (identity, offset, index)
+    return index
+
+
+def build_index(base_path=UNIFIED_PATH):
+    """(Re)build the record_id -> hash index from the merged view. One full pass."""
+    merged = read_merged(base_path)
+    index = pd.DataFrame({'record_id': merged['record_id'].astype(str),
+                          'content_hash': content_hash(merged)})
+    os.makedirs(delta_dir(base_path), exist_ok=True)
+    path = _index_path(base_path)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    index.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    _INDEX_CACHE.pop(path, None)
+    # a base with duplicate record_ids (invalid, but possible) must not break lookups
+    return index.drop_duplicates('record_id', keep='last')
+
+
+def append_records(records, base_path=UNIFIED_PATH):
+    """
+    Append new or changed records as one delta segment.
+
+    Cost is proportional to the batch (plus reading index rows appended since the last
+    call), not to the base file. Returns the number of records written.
+    """
+    new_df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+    if new_df.empty:
+        return 0
+    new_df = new_df.drop_duplicates('record_id', keep='last').reset_index(drop=True)
+
+    index = _read_index(base_path)
+    hashes = content_hash(new_df)
+    changed = np.array([index.get(rid) != h for rid, h in zip(new_df['record_id'].astype(str), hashes)],
+                       dtype=bool)
+
+    new_df, hashes = new_df[changed], hashes[changed]
+    if new_df.empty:
+        return 0
+
+    out_dir = delta_dir(base_path)
+    os.makedirs(out_dir, exist_ok=True)
+    # the pid keeps processes appending in the same microsecond apart
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f') + f'-{os.getpid()}'
+    seg_path = os.path.join(out_dir, f'delta_{stamp}.csv')
+    if os.path.exists(seg_path):
+        raise FileExistsError(f"Delta segment {seg_path} already exists")
+    tmp_path = seg_path + '.tmp'
+    new_df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, seg_path)
+
+    index_path = _index_path(base_path)
+    pd.DataFrame({'record_id': new_df['record_id'].astype(str), 'content_hash': hashes}).to_csv(
+        index_path, mode='a', header=not os.path.exists(index_path), index=False)
+    return len(new_df)
+
+
+def read_merged(base_path=UNIFIED_PATH, version=None, **read_kwargs):
+    """
+    Base snapshot plus all deltas, latest version of each record_id wins.
+
+    `version` (from current_version) pins the base snapshot and the delta segments; it
+    raises FileNotFoundError once a compaction has folded those segments away. Unpinned,
+    a compaction mid-read is retried against the new base, which contains the segments.
+    """
+    read_kwargs.setdefault('low_memory', False)
+    for attempt in range(3):
+        base_file, segments = _version_files(base_path, version)
+        try:
+            frames = [pd.read_csv(base_file, **read_kwargs)] if os.path.exists(base_file) else []
+            frames += [pd.read_csv(p, **read_kwargs) for p in segments]
+            break
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+    if not frames:
+        raise FileNotFoundError(base_path)
+    if len(frames) == 1:
+        return frames[0]
+
+    # Keep the base's column order, new columns go at the end.
+    columns = list(dict.fromkeys(c for f in frames for c in f.columns))
+    merged = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+    has_id = merged['record_id'].notna()
+    latest = ~merged['record_id'].duplicated(keep='last') | ~has_id
+    return merged[latest].reset_index(drop=True)
+
+
+def compact(base_path=UNIFIED_PATH):
+    """Fold all delta segments into a new base snapshot and drop them."""
+    segments = delta_files(base_path)
+    if not segments:
+        return 0
+    merged = read_merged(base_path)
+    # new immutable base version; readers pinned to the old one keep working
+    publish(merged, base_path, index=False)
+    for seg in segments:
+        os.remove(seg)
+    build_index(base_path)
+    return len(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta segments for the unified dataset.")
+    parser.add_argument('command', choices=['status', 'compact', 'reindex'])
+    parser.add_argument('--base', default=UNIFIED_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        segments = delta_files(args.base)
+        rows = sum(len(pd.read_csv(p, usecols=['record_id'])) for p in segments)
+        print(f"{len(segments)} delta segments, {rows} records pending compaction")
+    elif args.command == 'compact':
+        n = compact(args.base)
+        print(f"Compacted {n} delta segments into {args.base}")
+    else:
+        build_index(args.base)
+        print(f"Rebuilt index for {args.base}")
+
+
+if __name__ == "__main__":
+    main()
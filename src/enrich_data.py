@@ -1,9 +1,10 @@
-import pandas as pd
 import datetime
 
+from src.delta_store import UNIFIED_PATH, append_records
+
 def enrich_data():
-    file_path = 'data/raw/ethiopia_fi_unified_data.csv'
-    df = pd.read_csv(file_path)
+    # resolved from the repo root, so it works from any working directory
+    file_path = UNIFIED_PATH
     
     new_records = [
         # --- Observations ---
@@ -157,24 +158,10 @@ def enrich_data():
         }
     ]
 
-    new_df = pd.DataFrame(new_records)
-    
-    # Add columns to df if they are in new_df but not in df
-    for col in new_df.columns:
-        if col not in df.columns:
-            df[col] = None
-
-    # Ensure all columns from original df are present in new_df
-    for col in df.columns:
-        if col not in new_df.columns:
-            new_df[col] = None
-            
-    # Reorder columns to match (now expanded) df
-    new_df = new_df[df.columns]
-    
-    updated_df = pd.concat([df, new_df], ignore_index=True)
-    updated_df.to_csv(file_path, index=False)
-    print(f"Added {len(new_records)} new records to {file_path}")
+    # Written as an append-only delta segment; records already present and unchanged are skipped,
+    # so re-running is a no-op. `python -m src.delta_store compact` folds deltas into the base file.
+    added = append_records(new_records, file_path)
+    print(f"Added {added} new records to {file_path} ({len(new_records) - added} already present)")
 
 if __name__ == "__main__":
     enrich_data()
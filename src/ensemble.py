@@ -0,0 +1,229 @@
+"""
+Ensemble of baseline models weighted by their rolling-origin backtest error.
+
+Members, all fitted on the observations up to an origin:
+
+    linear      least-squares trend (the run_forecast baseline)
+    saturating  trend in logit space, so the curve levels off below CAP (100%)
+    damped      linear trend continued from the last fitted level with its slope
+                decaying by DAMPING per year
+    proxy       last observation carried forward with the slope of PROXY_INDICATOR
+                (the fallback run_forecast uses for series with a single point)
+
+Every member's least-squares fit is read off prefix sums of the history, so all members at
+every backtest origin are evaluated as one [member x origin x date] array. Members are
+weighted by inverse mean squared backtest error (origins as in src.backtest, event add-ons
+included); the interval is Z times the combined error's spread, growing with the square
+root of the years since the last observation.
+
+    python -m src.ensemble
+    python -m src.run_forecast --ensemble     # ensemble baselines in the scenario forecasts
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import HORIZON_YEARS, MIN_TRAIN
+from src.run_forecast import apply_scenario, calculate_event_add_ons, panel_history
+
+MEMBERS = ['linear', 'saturating', 'damped', 'proxy']
+PROXY_INDICATOR = 'ACC_OWNERSHIP'
+CAP = 100.0
+# Share of the trend kept after each further year for the damped member.
+DAMPING = 0.8
+# Two-sided 90% interval.
+Z = 1.645
+# Shortest horizon (years) the error spread is scaled by, so near-origin errors don't dominate.
+MIN_HORIZON = 0.25
+EPOCH = np.datetime64('2000-01-01', 'D')
+
+
+def years(dates):
+    """Dates as float years since EPOCH."""
+    return (np.asarray(dates, dtype='datetime64[D]') - EPOCH).astype(float) / 365.25
+
+
+def linear_fits(x, y, n):
+    """Least-squares (intercept, slope) on the first n[k] points of (x, y), for every k at once."""
+    n = np.asarray(n)
+    S1, Sx, Sy, Sxx, Sxy = (np.concatenate([[0.0], np.cumsum(v)])[n] for v in (np.ones_like(x), x, y, x * x, x * y))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (S1 * Sxy - Sx * Sy) / (S1 * Sxx - Sx * Sx)
+        intercept = (Sy - slope * Sx) / S1
+    slope[n < 2] = np.nan
+    intercept[n < 2] = np.nan
+    return intercept, slope
+
+
+def member_baselines(x, y, n, xq, proxy_slope=None):
+    """
+    Baselines [member, fit, query] of the fits on the first n[k] observations (x in years,
+    sorted), evaluated at xq[k]. proxy_slope[k] is the proxy's slope at the same origin;
+    None uses the series' own slope (the series is its own proxy).
+    """
+    a, b = linear_fits(x, y, n)
+    last = np.maximum(np.asarray(n) - 1, 0)
+    x_last = x[last][:, None]
+    y_last = np.where(np.asarray(n) >= 1, y[last], np.nan)[:, None]
+    h = xq - x_last
+
+    linear = a[:, None] + b[:, None] * xq
+    p = np.clip(y / CAP, 1e-3, 1 - 1e-3)
+    za, zb = linear_fits(x, np.log(p / (1 - p)), n)
+    saturating = CAP / (1 + np.exp(-(za[:, None] + zb[:, None] * xq)))
+    # sum of the decaying yearly slope over h years; plain trend inside the fitted range
+    damp = np.where(h > 0, (1 - DAMPING ** np.maximum(h, 0)) / -np.log(DAMPING), h)
+    damped = (a[:, None] + b[:, None] * x_last) + b[:, None] * damp
+    slope = b if proxy_slope is None else np.asarray(proxy_slope, dtype=float)
+    proxy = y_last + slope[:, None] * h
+    return np.stack([linear, saturating, damped, proxy])
+
+
+def _proxy_slopes(proxy, origins):
+    """Slope of the proxy series fitted on its observations up to each origin."""
+    if proxy is None:
+        return None
+    xp, yp = proxy
+    return linear_fits(xp, yp, np.searchsorted(xp, origins, side='right'))[1]
+
+
+def backtest_errors(dates, y, add_ons, proxy=None, horizon_years=HORIZON_YEARS, min_train=MIN_TRAIN):
+    """
+    Base-scenario errors [member, pair] and horizons (years) of every member for every
+    (year-end origin, held-out observation) pair, with origins as in src.backtest.
+    """
+    dates = pd.DatetimeIndex(dates)
+    x = years(dates)
+    cutoffs = np.unique(dates.year)[:-1]
+    origins = years(pd.to_datetime([f'{year}-12-31' for year in cutoffs]))
+    ends = years(pd.to_datetime([f'{year + horizon_years}-12-31' for year in cutoffs]))
+    n = np.searchsorted(x, origins, side='right')
+    origins, ends, n = origins[n >= min_train], ends[n >= min_train], n[n >= min_train]
+    k, j = np.nonzero((x[None, :] > origins[:, None]) & (x[None, :] <= ends[:, None]))
+    if not len(k):
+        return np.empty((len(MEMBERS), 0)), np.empty(0)
+    xq = np.broadcast_to(x, (len(origins), len(x)))
+    baselines = member_baselines(x, y, n, xq, _proxy_slopes(proxy, origins))[:, k, j]
+    predicted = apply_scenario(baselines, add_ons[j], 'Base')
+    return predicted - y[j], x[j] - origins[k]
+
+
+def member_weights(errors):
+    """Inverse-MSE weights per member (0 for members without errors); None if no member has any."""
+    finite = np.isfinite(errors)
+    counts = finite.sum(axis=1)
+    if not counts.any():
+        return None
+    mse = (np.where(finite, errors, 0.0) ** 2).sum(axis=1) / np.maximum(counts, 1)
+    inv = np.where(counts > 0, 1.0 / np.maximum(mse, 1e-12), 0.0)
+    return inv / inv.sum()
+
+
+def ensemble_forecast(df, panel, code, timeline, impacts=None, scenarios=('Base',), proxy_code=PROXY_INDICATOR,
+                      horizon_years=HORIZON_YEARS, fallback_sigma=None):
+    """
+    Combined forecast of one indicator over `timeline` (month ends) for each scenario:
+    rows of Date, Value, Lower, Upper, Scenario, plus a member table (weight, backtest
+    RMSE, pairs) and the error spread sigma.
+
+    impacts: event add-ons on the timeline (default: calculate_event_add_ons); the backtest
+    uses the direct add-ons at the observation dates. fallback_sigma sets the interval of a
+    series too short to backtest (default: the spread of the members).
+    """
+    history = panel_history(panel, code)
+    if history.empty:
+        return None, None, None
+    x, y = years(history['observation_date']), history['value_numeric'].to_numpy(dtype=float)
+    proxy = None
+    if proxy_code and proxy_code != code:
+        ph = panel_history(panel, proxy_code)
+        proxy = (years(ph['observation_date']), ph['value_numeric'].to_numpy(dtype=float)) if len(ph) else None
+
+    direct = calculate_event_add_ons(df, history['observation_date'].min(), history['observation_date'].max(), code)
+    hist_add_ons = direct.reindex(pd.DatetimeIndex(history['observation_date']), fill_value=0.0).to_numpy()
+    errors, horizons = backtest_errors(history['observation_date'], y, hist_add_ons, proxy, horizon_years)
+
+    # final fits on the whole history; the proxy slope from all of the proxy's observations
+    xq = years(timeline)[None, :]
+    proxy_slope = None
+    if proxy_code and proxy_code != code:
+        proxy_slope = np.array([np.nan]) if proxy is None else linear_fits(*proxy, [len(proxy[0])])[1]
+    baselines = member_baselines(x, y, np.array([len(x)]), xq, proxy_slope)[:, 0, :]
+    available = np.isfinite(baselines).all(axis=1)
+    if not available.any():
+        return None, None, None
+
+    weights = member_weights(errors)
+    weights = np.where(available, 1.0 if weights is None else weights, 0.0)
+    if weights.sum() == 0:
+        weights = available.astype(float)
+    weights = weights / weights.sum()
+    used = weights > 0
+    baseline = weights[used] @ baselines[used]
+
+    # spread of the combined backtest error per sqrt(year) of horizon, over the pairs every
+    # weighted member predicted
+    valid = np.isfinite(errors[used]).all(axis=0)
+    ahead = np.sqrt(np.maximum(xq[0] - x[-1], 0))
+    if valid.any():
+        combined = weights[used] @ errors[used][:, valid]
+        sigma = float(np.sqrt(np.mean(combined ** 2 / np.maximum(horizons[valid], MIN_HORIZON))))
+        half = Z * sigma * ahead
+    elif fallback_sigma is not None:
+        sigma = fallback_sigma
+        half = Z * sigma * ahead
+    else:
+        sigma = None
+        half = (baselines[available].max(axis=0) - baselines[available].min(axis=0)) / 2
+
+    if impacts is None:
+        impacts = calculate_event_add_ons(df, timeline[0], timeline[-1], code)
+    impacts = impacts.reindex(timeline, fill_value=0.0).to_numpy()
+    rows = [pd.DataFrame({
+        'Date': timeline,
+        'Value': apply_scenario(baseline, impacts, s),
+        'Lower': apply_scenario(baseline - half, impacts, s),
+        'Upper': apply_scenario(baseline + half, impacts, s),
+        'Scenario': s,
+    }) for s in scenarios]
+
+    finite = np.isfinite(errors)
+    members = pd.DataFrame({
+        'member': MEMBERS,
+        'weight': weights.round(3),
+        'rmse': [np.sqrt(np.mean(e[f] ** 2)) if f.any() else np.nan for e, f in zip(errors, finite)],
+        'pairs': finite.sum(axis=1),
+    }).round(3)
+    return pd.concat(rows, ignore_index=True), members, sigma
+
+
+def main():
+    from src.panel import ensure_panel
+    from src.schema import REFERENCE_PATH, UNIFIED_PATH, load_unified
+
+    parser = argparse.ArgumentParser(description="Backtest-weighted ensemble of the baseline models.")
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--indicators', nargs='+', default=['ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT'])
+    parser.add_argument('--horizon', type=int, default=HORIZON_YEARS, help="Years predicted after each origin.")
+    args = parser.parse_args()
+
+    df = load_unified(args.data, args.ref)
+    panel = ensure_panel(args.data, args.ref, df=df)
+    timeline = pd.date_range('2025-01-01', '2027-12-31', freq='ME')
+    sigmas = {}
+    for code in args.indicators:
+        rows, members, sigma = ensemble_forecast(df, panel, code, timeline, horizon_years=args.horizon,
+                                                 fallback_sigma=sigmas.get(PROXY_INDICATOR))
+        if rows is None:
+            print(f"{code}: no history.")
+            continue
+        sigmas[code] = sigma
+        print(f"\n{code} (error spread {'n/a' if sigma is None else f'{sigma:.3f}'} per sqrt(year))")
+        print(members.to_string(index=False))
+        print(rows.groupby(rows['Date'].dt.year)[['Value', 'Lower', 'Upper']].last().round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,11 @@ import pandas as pd
 import numpy as np
 import os
 
+from src.delta_store import read_merged
+from src.panel import ensure_panel
+from src.profiling import load_profile
+from src.validate_data import validate, summarize
+
 def explore_data():
     raw_path = 'data/raw/ethiopia_fi_unified_data.csv'
     ref_path = 'data/raw/reference_codes.csv'
@@ -10,7 +15,7 @@ def explore_data():
         print("Data files not found.")
         return
 
-    df = pd.read_csv(raw_path)
+    df = read_merged(raw_path)
     ref = pd.read_csv(ref_path)
 
     print("--- Step 1: Understand the Schema ---")
@@ -41,24 +46,23 @@ def explore_data():
     summary = df.groupby(['record_type', 'pillar', 'source_type', 'confidence'], dropna=False).size().reset_index(name='count')
     print(summary.to_string(index=False))
 
-    # Temporal coverage
-    obs_df = df[df['record_type'] == 'observation'].copy()
-    if not obs_df.empty:
-        obs_df['observation_date'] = pd.to_datetime(obs_df['observation_date'])
-        print(f"\nObservation range: {obs_df['observation_date'].min().date()} to {obs_df['observation_date'].max().date()}")
-        
-        # Missing years/gaps
-        obs_df['year'] = obs_df['observation_date'].dt.year
-        unique_years = sorted(obs_df['year'].unique())
-        print(f"Unique years covered: {unique_years}")
-        full_range = list(range(int(min(unique_years)), int(max(unique_years)) + 1))
-        gaps = [y for y in full_range if y not in unique_years]
-        print(f"Gaps in time series: {gaps}")
+    # Temporal coverage, gaps and indicator coverage come from the cached panel profile
+    profile = load_profile(ensure_panel(raw_path, ref_path))
+    series = profile['series']
+    if not series.empty:
+        print(f"\nObservation range: {series['first_observation'].min().date()} to {series['last_observation'].max().date()}")
+        print(f"Unique years covered: {profile['coverage'].columns[profile['coverage'].sum() > 0].tolist()}")
+        print(f"Gaps in time series: {profile['years_without_data']}")
+
+        gaps = profile['gaps']
+        if not gaps.empty:
+            print("\nGaps inside individual series (years without observations):")
+            print(gaps.to_string(index=False))
 
     # Indicator coverage
     print("\nIndicator coverage (Observations):")
-    indicator_counts = df[df['record_type'] == 'observation'].groupby('indicator_code').size().reset_index(name='count')
-    print(indicator_counts.to_string(index=False))
+    print(series[['series', 'n_observations', 'years_covered', 'first_observation', 'last_observation']]
+          .to_string(index=False))
 
     # Events
     print("\nEvents:")
@@ -74,18 +78,11 @@ def explore_data():
 
     # Validation against reference codes
     print("\n--- Validation ---")
-    valid_record_types = ref[ref['field'] == 'record_type']['code'].tolist()
-    invalid_record_types = df[~df['record_type'].isin(valid_record_types)]['record_type'].unique()
-    print(f"Invalid record types: {invalid_record_types}")
-
-    valid_pillars = ref[ref['field'] == 'pillar']['code'].tolist()
-    # Events should NOT have pillars
-    events_with_pillar = df[(df['record_type'] == 'event') & (df['pillar'].notnull())]
-    print(f"Events with pillars (should be 0): {len(events_with_pillar)}")
-    
-    # Observations should have pillars
-    obs_without_pillar = df[(df['record_type'] == 'observation') & (df['pillar'].isnull())]
-    print(f"Observations without pillars (should be 0): {len(obs_without_pillar)}")
+    report = validate(df, ref)
+    if report.empty:
+        print("No violations found.")
+    else:
+        print(summarize(report).to_string(index=False))
 
 if __name__ == "__main__":
     explore_data()
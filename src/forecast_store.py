@@ -0,0 +1,263 @@
+"""
+Versioned store of every forecast run, partitioned by run, indicator and scenario.
+
+    data/processed/forecast_store/parts/run=<run>/_run.csv   created, data version, commit
+    data/processed/forecast_store/parts/run=<run>/indicator=<code>/scenario=<s>/part-0.parquet
+
+Each run_forecast run adds its monthly rows (date, value) as a new run instead of
+replacing the last one. A run's catalog row is written into its own directory, which is
+moved into place in one step, so concurrent runs never rewrite a shared catalog file.
+Partitions are Parquet when pyarrow is installed (the filters are pushed down to the
+dataset scan, which skips partitions and row groups), CSV otherwise (partitions are
+pruned by path). diff() lines two runs or two scenarios up on (indicator, scenario,
+date) and returns the deltas in one vectorized join.
+
+    python -m src.forecast_store runs
+    python -m src.forecast_store diff                      # latest run vs the one before
+    python -m src.forecast_store diff RUN_A RUN_B --indicators ACC_OWNERSHIP
+    python -m src.forecast_store scenarios --against Base  # scenario spread of the latest run
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.snapshots import git_commit, new_version
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, 'data', 'processed', 'forecast_store')
+RUN_ROW = '_run.csv'
+PARTS = 'parts'
+PARTITIONS = ['run', 'indicator', 'scenario']
+CATALOG_COLUMNS = ['run', 'created', 'data_version', 'commit', 'rows', 'format', 'note']
+
+
+def _dataset_module():
+    # optional, and imported on first use (it takes longer to import than pandas)
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:  # without pyarrow partitions are CSV files
+        return None
+    return ds
+
+
+def _format():
+    return 'parquet' if _dataset_module() is not None else 'csv'
+
+
+def runs(store_dir=STORE_DIR):
+    """Catalog of the stored runs, oldest first."""
+    dtype = {'run': str, 'data_version': str, 'commit': str, 'note': str}
+    frames = [pd.read_csv(p, dtype=dtype) for p in glob.glob(os.path.join(store_dir, PARTS, 'run=*', RUN_ROW))]
+    if not frames:
+        return pd.DataFrame(columns=CATALOG_COLUMNS)
+    catalog = pd.concat(frames, ignore_index=True).reindex(columns=CATALOG_COLUMNS)
+    # run ids sort by creation time
+    return catalog.sort_values('run', ignore_index=True)
+
+
+def resolve_run(run, store_dir=STORE_DIR):
+    """Run id for 'latest', 'previous', a negative position ('-3') or a unique id prefix."""
+    ids = runs(store_dir)['run'].tolist()
+    if not ids:
+        raise FileNotFoundError(f"No forecast runs in {store_dir}")
+    run = str(run)
+    pos = {'latest': -1, 'previous': -2}.get(run, int(run) if run[1:].isdigit() and run[0] == '-' else None)
+    if pos is not None:
+        if -pos > len(ids):
+            raise KeyError(f"Only {len(ids)} runs stored")
+        return ids[pos]
+    matches = [i for i in ids if i.startswith(run)]
+    if len(matches) != 1:
+        raise KeyError(f"Run {run!r} matches {len(matches)} stored runs")
+    return matches[0]
+
+
+def write_run(forecasts, store_dir=STORE_DIR, data_version=None, note=None):
+    """
+    Store monthly forecast rows (Date, Value, Scenario, Indicator) as a new run and return
+    its id. The run, with its catalog row, becomes visible only once all of its partitions
+    are written.
+    """
+    run = new_version()
+    fmt = _format()
+    parts_dir = os.path.join(store_dir, PARTS)
+    tmp_dir = os.path.join(parts_dir, f'.tmp-{run}')
+    for (indicator, scenario), rows in forecasts.groupby(['Indicator', 'Scenario'], sort=True):
+        part_dir = os.path.join(tmp_dir, f'indicator={indicator}', f'scenario={scenario}')
+        os.makedirs(part_dir, exist_ok=True)
+        part = pd.DataFrame({'date': pd.to_datetime(rows['Date']).to_numpy(dtype='datetime64[ns]'),
+                             'value': rows['Value'].to_numpy(dtype='float64')}).sort_values('date')
+        if fmt == 'parquet':
+            part.to_parquet(os.path.join(part_dir, 'part-0.parquet'), index=False)
+        else:
+            part.to_csv(os.path.join(part_dir, 'part-0.csv'), index=False)
+    os.makedirs(tmp_dir, exist_ok=True)
+    pd.DataFrame([{
+        'run': run, 'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'data_version': data_version, 'commit': git_commit(), 'rows': len(forecasts), 'format': fmt, 'note': note,
+    }], columns=CATALOG_COLUMNS).to_csv(os.path.join(tmp_dir, RUN_ROW), index=False)
+    os.replace(tmp_dir, os.path.join(parts_dir, f'run={run}'))
+    return run
+
+
+def _as_list(values):
+    return None if values is None else [values] if isinstance(values, str) else list(values)
+
+
+def read(run_ids=None, indicators=None, scenarios=None, start=None, end=None, store_dir=STORE_DIR):
+    """
+    Stored rows (run, indicator, scenario, date, value) matching the filters; None means
+    no filter on that column. Only matching partitions (and row groups) are read.
+    """
+    run_ids = None if run_ids is None else [resolve_run(r, store_dir) for r in _as_list(run_ids)]
+    indicators, scenarios = _as_list(indicators), _as_list(scenarios)
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    parts_dir = os.path.join(store_dir, PARTS)
+    columns = PARTITIONS + ['date', 'value']
+
+    ds = _dataset_module()
+    # a store that also holds CSV runs (written before pyarrow was installed) is read file by file
+    if ds is not None and not glob.glob(os.path.join(parts_dir, 'run=*', '*', '*', '*.csv')):
+        import pyarrow as pa
+        partitioning = ds.partitioning(pa.schema([(p, pa.string()) for p in PARTITIONS]), flavor='hive')
+        # runs still being written sit in .tmp-* directories, which the scan ignores
+        dataset = ds.dataset(parts_dir, format='parquet', partitioning=partitioning)
+        expr = None
+        for field, values in (('run', run_ids), ('indicator', indicators), ('scenario', scenarios)):
+            if values is not None:
+                expr = _and(expr, ds.field(field).isin(values))
+        if start is not None:
+            expr = _and(expr, ds.field('date') >= pa.scalar(start.to_pydatetime(), pa.timestamp('ns')))
+        if end is not None:
+            expr = _and(expr, ds.field('date') <= pa.scalar(end.to_pydatetime(), pa.timestamp('ns')))
+        out = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    else:
+        frames = []
+        # partition pruning on the directory names, then the date filter on the rows
+        for path in sorted(glob.glob(os.path.join(parts_dir, 'run=*', 'indicator=*', 'scenario=*', 'part-0.*'))):
+            keys = dict(d.split('=', 1) for d in os.path.relpath(os.path.dirname(path), parts_dir).split(os.sep))
+            if ((run_ids is not None and keys['run'] not in run_ids) or
+                    (indicators is not None and keys['indicator'] not in indicators) or
+                    (scenarios is not None and keys['scenario'] not in scenarios)):
+                continue
+            part = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, parse_dates=['date'])
+            if start is not None:
+                part = part[part['date'] >= start]
+            if end is not None:
+                part = part[part['date'] <= end]
+            frames.append(part.assign(**keys))
+        out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    return out[columns].sort_values(PARTITIONS + ['date'], ignore_index=True)
+
+
+def _and(expr, term):
+    return term if expr is None else expr & term
+
+
+def _join(left, right, on, left_name, right_name):
+    merged = left.merge(right, on=on, how='outer', suffixes=('_a', '_b'))
+    merged = merged.rename(columns={'value_a': left_name, 'value_b': right_name})
+    a, b = merged[left_name].to_numpy(dtype=float), merged[right_name].to_numpy(dtype=float)
+    merged['delta'] = b - a
+    with np.errstate(divide='ignore', invalid='ignore'):
+        merged['pct'] = np.where(a != 0, 100.0 * (b - a) / np.abs(a), np.nan)
+    return merged.sort_values(on, ignore_index=True)
+
+
+def diff(run_a='previous', run_b='latest', indicators=None, scenarios=None, start=None, end=None,
+         store_dir=STORE_DIR):
+    """
+    Deltas between two runs per (indicator, scenario, date): value_a, value_b, delta = b - a
+    and pct (relative to a). Rows present in only one run have NaN on the other side.
+    """
+    run_a, run_b = resolve_run(run_a, store_dir), resolve_run(run_b, store_dir)
+    rows = read([run_a, run_b], indicators, scenarios, start, end, store_dir)
+    on = ['indicator', 'scenario', 'date']
+    left = rows.loc[rows['run'] == run_a, on + ['value']]
+    right = rows.loc[rows['run'] == run_b, on + ['value']]
+    return _join(left, right, on, 'value_a', 'value_b')
+
+
+def scenario_diff(run='latest', against='Base', indicators=None, start=None, end=None, store_dir=STORE_DIR):
+    """Deltas of every other scenario against `against` within one run, per (indicator, scenario, date)."""
+    rows = read(run, indicators, None, start, end, store_dir)
+    base = rows.loc[rows['scenario'] == against, ['indicator', 'date', 'value']]
+    others = rows.loc[rows['scenario'] != against, ['indicator', 'scenario', 'date', 'value']]
+    merged = _join(base, others, ['indicator', 'date'], against, 'value')
+    return merged[['indicator', 'scenario', 'date', against, 'value', 'delta', 'pct']].sort_values(
+        ['indicator', 'scenario', 'date'], ignore_index=True)
+
+
+def summarize(deltas, by=('indicator', 'scenario')):
+    """Per group: months compared, mean and largest absolute delta, and the delta at the last date."""
+    deltas = deltas.sort_values('date')
+    groups = deltas.groupby(list(by))['delta']
+    return pd.DataFrame({
+        'months': groups.count(),
+        'mean_delta': groups.mean(),
+        'max_abs_delta': groups.apply(lambda d: d.abs().max()),
+        'last_delta': groups.last(),
+    }).round(3)
+
+
+def drop_run(run, store_dir=STORE_DIR):
+    """Delete a stored run, catalog row included."""
+    run = resolve_run(run, store_dir)
+    shutil.rmtree(os.path.join(store_dir, PARTS, f'run={run}'), ignore_errors=True)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and compare stored forecast runs.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('runs', help="List the stored runs.")
+    for name, text in (('diff', "Deltas between two runs."), ('scenarios', "Scenario deltas within one run.")):
+        p = sub.add_parser(name, help=text)
+        if name == 'diff':
+            p.add_argument('run_a', nargs='?', default='previous')
+            p.add_argument('run_b', nargs='?', default='latest')
+            p.add_argument('--scenarios', nargs='+', default=None)
+        else:
+            p.add_argument('run', nargs='?', default='latest')
+            p.add_argument('--against', default='Base')
+        p.add_argument('--indicators', nargs='+', default=None)
+        p.add_argument('--start', default=None)
+        p.add_argument('--end', default=None)
+        p.add_argument('--out', default=None, help="Write the per-month deltas to this CSV.")
+    drop = sub.add_parser('drop', help="Delete a stored run.")
+    drop.add_argument('run')
+    args = parser.parse_args()
+
+    if args.command == 'runs':
+        print(runs().to_string(index=False))
+        return
+    try:
+        if args.command == 'drop':
+            print(f"Dropped run {drop_run(args.run)}")
+            return
+        if args.command == 'diff':
+            deltas = diff(args.run_a, args.run_b, args.indicators, args.scenarios, args.start, args.end)
+            header = f"{resolve_run(args.run_b)} vs {resolve_run(args.run_a)}:"
+        else:
+            deltas = scenario_diff(args.run, args.against, args.indicators, args.start, args.end)
+            header = f"Scenarios vs {args.against} in run {resolve_run(args.run)}:"
+    except (KeyError, FileNotFoundError) as e:
+        # e.g. "diff" with a single run stored, or an unknown run id
+        print(f"forecast_store {args.command}: {e.args[0]}", file=sys.stderr)
+        sys.exit(1)
+    print(header)
+    print(summarize(deltas).to_string())
+    if args.out:
+        deltas.to_csv(args.out, index=False)
+        print(f"Saved deltas to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
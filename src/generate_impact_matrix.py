@@ -1,174 +1,101 @@
+import argparse
 import pandas as pd
 import numpy as np
-from datetime import timedelta, datetime
 import os
 
-def calculate_ramp_factor(current_date, start_date, ramp_months=6):
-    """Calculates a linear ramp factor (0.0 to 1.0)."""
-    if current_date < start_date:
-        return 0.0
-    days_elapsed = (current_date - start_date).days
-    ramp_days = ramp_months * 30
-    if days_elapsed >= ramp_days:
-        return 1.0
-    return max(0.0, days_elapsed / ramp_days)
-
-def get_magnitude_numeric(magnitude_str, default_high=0.2, default_med=0.1, default_low=0.05):
-    mapping = {
-        'high': default_high,
-        'medium': default_med,
-        'low': default_low,
-        'negligible': 0.01
-    }
-    return mapping.get(str(magnitude_str).lower(), 0.0)
+from src.impacts import event_table, resolve_links, impact_matrix
+from src.instrument import log, setup, span, finish
+from src.propagation import split_links, cascade_matrix, propagate
+from src.render import impact_tasks, render
+from src.schema import load_unified
+from src.snapshots import publish
+
+def plot_impacts(df, base_dir, target_ind='ACC_OWNERSHIP', workers=None, force=False):
+    """
+    Per-indicator impact figures (direct and cascaded) plus small multiples, rendered in a
+    process pool; target_ind is also saved as reports/impact_visualization.png.
+    """
+    total, direct = propagate(df, '2020-01-01', '2030-12-31')
+    if total.empty:
+        return
+    figures_dir = os.path.join(base_dir, 'reports', 'figures')
+    tasks = impact_tasks(total, direct, figures_dir)
+    if target_ind in total.columns:
+        main_task = next(t for t in tasks if t['path'] == os.path.join(figures_dir, 'impacts', f'{target_ind}.png'))
+        tasks.append({**main_task, 'path': os.path.join(base_dir, 'reports', 'impact_visualization.png')})
+
+    rendered, skipped = render(tasks, figures_dir, workers, force)
+    log.info("Rendered %d impact figures to %s (%d unchanged)", len(rendered), figures_dir, skipped)
 
 def main():
     # Paths
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_dir, 'data', 'raw', 'ethiopia_fi_unified_data.csv')
+    parser = argparse.ArgumentParser(description="Event x indicator impact matrix from the impact links.")
+    parser.add_argument('--data', default=os.path.join(base_dir, 'data', 'raw', 'ethiopia_fi_unified_data.csv'))
+    parser.add_argument('--no-plot', action='store_true', help="Skip the impact figures.")
+    parser.add_argument('--workers', type=int, default=None, help="Figure rendering processes (default: one per CPU).")
+    args = parser.parse_args()
+
+    setup()
+    data_path = args.data
     output_path = os.path.join(base_dir, 'data', 'processed', 'event_indicator_matrix.csv')
-
-    print(f"Loading data from {data_path}...")
-    df = pd.read_csv(data_path)
-
-    # Parse dates
-    for col in ['observation_date']:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
-
-    # Clean strings
-    str_cols = ['record_type', 'parent_id', 'record_id', 'indicator_code']
-    for col in str_cols:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
-
-    events = df[df['record_type'] == 'event'].copy()
-    impact_links = df[df['record_type'] == 'impact_link'].copy()
-
-    impact_effects = []
-    
-    print(f"Processing {len(impact_links)} impact links...", flush=True)
-
-    for idx, link in impact_links.iterrows():
-        # Get Event
-        event_id = link['parent_id'] # In this dataset, parent_id often points to indicator_code if record_id match fails
-        
-        # Debug
-        print(f"Link {link.get('record_id', 'Unknown')}: Looking for parent '{event_id}'...", end='', flush=True)
-
-        # Try finding event
-        event_row = events[events['record_id'] == event_id]
-        if event_row.empty:
-            event_row = events[events['indicator_code'] == event_id]
-        
-        if event_row.empty:
-            print(f" NOT FOUND.", flush=True)
-            print(f"   Available Codes: {events['indicator_code'].unique()[:5]}...", flush=True)
-            continue
-            
-        print(f" FOUND ({event_row['record_id'].values[0]}).", flush=True)
-        
-        event = event_row.iloc[0]
-        event_date = event['observation_date']
-        
-        if pd.isna(event_date):
-            print("   WARN: Event has no date. Skipping.", flush=True)
-            continue
-
-        # Parameters
-        # Impact links target an indicator. In the CSV, this target ID is in 'indicator_code'.
-        indicator_target = link['indicator_code']
-        if pd.isna(indicator_target) or indicator_target == '':
-             indicator_target = link['indicator']
-        
-        # Direction
-        direction_map = {'increase': 1, 'decrease': -1, 'stabilize': 0, 'mixed': 0}
-        direction = direction_map.get(link.get('impact_direction', 'increase'), 1)
-
-        # Magnitude
-        if pd.notna(link.get('impact_estimate')):
-            magnitude = float(link['impact_estimate'])
-        else:
-            magnitude = get_magnitude_numeric(link.get('impact_magnitude'))
-
-        impact_effects.append({
-            'event_name': event.get('indicator', 'Unknown'),
-            'target_indicator': indicator_target,
-            'net_impact': direction * magnitude
-        })
+    total_path = os.path.join(base_dir, 'data', 'processed', 'event_indicator_matrix_total.csv')
+
+    log.info("Loading data from %s...", data_path)
+    # Dates are parsed, code strings stripped and interned as categoricals by the schema layer
+    df = load_unified(data_path)
+
+    with span('split'):
+        events = event_table(df)
+        impact_links = df[df['record_type'] == 'impact_link']
+        # links whose parent is an indicator are cascade edges, not unknown events
+        _, indicator_links = split_links(df)
+
+    log.info("Processing %d impact links...", len(impact_links))
+
+    # One vectorized join: parent_id matches an event record_id, else an event indicator_code
+    with span('resolve', links=len(impact_links)):
+        resolved, not_found, undated = resolve_links(impact_links, events)
+    not_found -= len(indicator_links)
+    if not_found:
+        log.warning("   WARN: %d links reference unknown events. Available Codes: %s...",
+                    not_found, events['indicator_code'].unique()[:5])
+    if undated:
+        log.warning("   WARN: %d links point at events with no date. Skipped.", undated)
 
     # Pivot and Save Matrix
-    if impact_effects:
-        df_effects = pd.DataFrame(impact_effects)
-        matrix = df_effects.pivot_table(
-            index='event_name',
-            columns='target_indicator',
-            values='net_impact',
-            aggfunc='sum'
-        ).fillna(0)
+    if not resolved.empty:
+        with span('pivot'):
+            matrix = impact_matrix(resolved)
         
-        print("\nGenerated Matrix:", flush=True)
-        print(matrix, flush=True)
+        log.info("Generated Matrix:\n%s", matrix.to_string())
         
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        matrix.to_csv(output_path)
-        print(f"\nSaved matrix to {output_path}", flush=True)
+        with span('export'):
+            version = publish(matrix, output_path)
+        log.info("Saved matrix to %s (version %s)", output_path, version)
+
+        if not indicator_links.empty:
+            # direct effects plus everything they cascade to through indicator -> indicator links
+            with span('kernel', edges=len(indicator_links)):
+                total = cascade_matrix(matrix, indicator_links)
+            log.info("Cascaded through %d indicator links:\n%s", len(indicator_links), total.to_string())
+            with span('export'):
+                version = publish(total, total_path)
+            log.info("Saved total-effect matrix to %s (version %s)", total_path, version)
         
         # --- Visualization ---
         try:
-            import matplotlib.pyplot as plt
-            
-            # Generate timeline for a key indicator
-            target_ind = 'ACC_OWNERSHIP' 
-            # Check if this indicator is affected
-            relevant_links = [l for i, l in impact_links.iterrows() if l.get('indicator_code') == target_ind or l.get('indicator') == target_ind]
-            
-            if relevant_links:
-                print(f"\nGenerating visualization for {target_ind}...", flush=True)
-                timeline = pd.date_range(start='2020-01-01', end='2030-12-31', freq='ME')
-                series_data = np.zeros(len(timeline))
-                
-                for idx, link in impact_links.iterrows():
-                    code = link.get('indicator_code')
-                    if pd.isna(code) or code == '': code = link.get('indicator')
-                    if code != target_ind: continue
-                    
-                    # Get event date again (inefficient lookup but fine for script)
-                    event_id = link['parent_id']
-                    event_row = events[events['record_id'] == event_id]
-                    if event_row.empty: event_row = events[events['indicator_code'] == event_id]
-                    if event_row.empty: continue
-                    e_date = event_row.iloc[0]['observation_date']
-                    if pd.isna(e_date): continue
-                    
-                    mdir = direction_map.get(link.get('impact_direction', 'increase'), 1)
-                    mmag = float(link['impact_estimate']) if pd.notna(link.get('impact_estimate')) else get_magnitude_numeric(link.get('impact_magnitude'))
-                    mlag = float(link.get('lag_months', 0))
-                    
-                    start_date = e_date + timedelta(days=mlag*30)
-                    
-                    # Add to series
-                    for i, t in enumerate(timeline):
-                        factor = calculate_ramp_factor(t, start_date)
-                        series_data[i] += mdir * mmag * factor
-                
-                # Plot
-                plt.figure(figsize=(10, 6))
-                plt.plot(timeline, series_data, label=f'Model Impact: {target_ind}', color='blue', linewidth=2)
-                plt.title(f'Modeled Cumulative Impact on {target_ind}')
-                plt.ylabel('Impact Magnitude (Additive)')
-                plt.grid(True)
-                plt.legend()
-                
-                vis_path = os.path.join(base_dir, 'reports', 'impact_visualization.png')
-                os.makedirs(os.path.dirname(vis_path), exist_ok=True)
-                plt.savefig(vis_path)
-                print(f"Saved visualization to {vis_path}", flush=True)
-                
+            if not args.no_plot:
+                with span('plot'):
+                    plot_impacts(df, base_dir, workers=args.workers)
         except Exception as e:
-            print(f"Visualization failed: {e}", flush=True)
+            log.error("Visualization failed: %s", e)
 
     else:
-        print("No effects generated.", flush=True)
+        log.info("No effects generated.")
+
+    finish()
 
 if __name__ == "__main__":
     main()
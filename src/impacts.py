@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from src.response_shapes import link_shapes
+from src.schema import code_mask
+
+# Direction multipliers; unknown or missing directions count as increases.
+DIRECTION_SIGN = {'increase': 1, 'decrease': -1, 'stabilize': 0, 'mixed': 0}
+
+EVENT_COLUMNS = ['record_id', 'indicator_code', 'indicator', 'observation_date']
+
+# Effect size assumed for a qualitative impact_magnitude label when a link has no
+# impact_estimate. Also the priors src/calibration.py shrinks fitted magnitudes towards.
+MAGNITUDE_PRIORS = {
+    'high': 0.2,
+    'medium': 0.1,
+    'low': 0.05,
+    'negligible': 0.01,
+}
+
+
+def get_magnitude_numeric(magnitude_str, default_high=None, default_med=None, default_low=None):
+    mapping = dict(MAGNITUDE_PRIORS)
+    for label, value in (('high', default_high), ('medium', default_med), ('low', default_low)):
+        if value is not None:
+            mapping[label] = value
+    return mapping.get(str(magnitude_str).lower(), 0.0)
+
+
+def event_table(df):
+    """The (small) event table: record_id, indicator_code, indicator, observation_date."""
+    is_event = code_mask(df['record_type'], 'event')
+    events = df.loc[is_event, [c for c in EVENT_COLUMNS if c in df.columns]]
+    return events.reindex(columns=EVENT_COLUMNS).reset_index(drop=True)
+
+
+def _first_position(keys):
+    """key -> position of its first occurrence (nulls dropped)."""
+    keys = pd.Series(keys.astype(object).to_numpy())
+    keys = keys[keys.notna() & ~keys.duplicated()]
+    return pd.Series(keys.index.to_numpy(), index=keys.to_numpy())
+
+
+def match_parents(parent_ids, events):
+    """
+    Position in `events` of each link's parent, -1 if it has none.
+
+    parent_id is matched against event record_ids first, then event indicator_codes;
+    the first matching event wins.
+    """
+    parents = pd.Series(parent_ids).astype(object).to_numpy()
+    pos = _first_position(events['record_id']).reindex(parents)
+    pos = pos.fillna(_first_position(events['indicator_code']).reindex(parents).set_axis(pos.index))
+    return pos.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def link_parameters(links):
+    """
+    Target indicator, lag (months) and signed impact (direction x magnitude) of each link.
+
+    The target falls back to the `indicator` column when indicator_code is blank; the
+    magnitude is impact_estimate when present, else the prior for impact_magnitude.
+    """
+    links = links.reset_index(drop=True)
+    target = links['indicator_code'].astype(object)
+    if 'indicator' in links.columns:
+        blank = target.isna() | (target == '')
+        target = target.where(~blank, links['indicator'].astype(object))
+
+    direction = links['impact_direction'].astype(object).map(DIRECTION_SIGN).fillna(1) \
+        if 'impact_direction' in links.columns else pd.Series(1.0, index=links.index)
+    magnitude = pd.to_numeric(links['impact_estimate'], errors='coerce') \
+        if 'impact_estimate' in links.columns else pd.Series(np.nan, index=links.index)
+    if 'impact_magnitude' in links.columns:
+        priors = links['impact_magnitude'].astype(object).map(get_magnitude_numeric)
+        magnitude = magnitude.fillna(priors)
+    lag = pd.to_numeric(links['lag_months'], errors='coerce').fillna(0) \
+        if 'lag_months' in links.columns else pd.Series(0.0, index=links.index)
+
+    return pd.DataFrame({
+        'target_indicator': target,
+        'lag_months': lag.to_numpy(dtype=float),
+        'net_impact': direction.to_numpy(dtype=float) * magnitude.fillna(0).to_numpy(dtype=float),
+    })
+
+
+def resolve_links(links, events):
+    """
+    Join impact links to their parent events and compute each link's signed impact.
+
+    Returns one row per resolvable link (parent found, event dated) with columns
+    record_id, event_id, event_name, event_date, target_indicator, lag_months,
+    net_impact, response_shape, response_months, plus the number of links whose parent
+    was not found and the number whose event has no date.
+    """
+    links = links.reset_index(drop=True)
+    pos = match_parents(links['parent_id'].to_numpy(), events)
+    found = pos >= 0
+    event_dates = pd.to_datetime(events['observation_date'], errors='coerce').to_numpy()
+    dated = found.copy()
+    dated[found] = ~pd.isna(event_dates[pos[found]])
+
+    params = link_parameters(links)
+    shapes, months = link_shapes(links)
+
+    sel = pos[dated]
+    resolved = pd.DataFrame({
+        'record_id': links['record_id'].to_numpy()[dated],
+        'event_id': events['record_id'].to_numpy()[sel],
+        'event_name': events['indicator'].to_numpy()[sel],
+        'event_date': event_dates[sel],
+        'target_indicator': params['target_indicator'].to_numpy()[dated],
+        'lag_months': params['lag_months'].to_numpy()[dated],
+        'net_impact': params['net_impact'].to_numpy()[dated],
+        'response_shape': shapes[dated],
+        'response_months': months[dated],
+    })
+    return resolved, int((~found).sum()), int((found & ~dated).sum())
+
+
+def impact_matrix(resolved):
+    """Event x target indicator matrix of summed net impacts."""
+    return resolved.pivot_table(index='event_name', columns='target_indicator',
+                                values='net_impact', aggfunc='sum').fillna(0)
@@ -0,0 +1,239 @@
+"""
+Drop-folder ingestion service.
+
+Partner teams drop CSV / JSON / JSONL batches of observations, events and impact links
+into data/inbox/. Each poll, new files are parsed and validated concurrently in a
+thread pool; accepted rows are merged into the unified store as delta segments (one
+per batch of files), rejected rows are written to data/inbox/failed/ with the rule
+they broke. Throughput and backlog are written to data/inbox/_metrics.json.
+
+    python -m src.ingest_daemon                  # watch forever
+    python -m src.ingest_daemon --once           # drain the inbox and exit
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from src.delta_store import UNIFIED_PATH, append_records, read_merged
+from src.instrument import log, setup
+from src.validate_data import check_parent_references, load_reference_codes, validate, parent_keys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INBOX_DIR = os.path.join(BASE_DIR, 'data', 'inbox')
+REFERENCE_PATH = os.path.join(BASE_DIR, 'data', 'raw', 'reference_codes.csv')
+
+EXTENSIONS = ('.csv', '.json', '.jsonl')
+# Files modified more recently than this are assumed to still be being written.
+SETTLE_SECONDS = 2.0
+
+
+def parse_file(path):
+    """Read a dropped batch into a DataFrame."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return pd.read_csv(path, low_memory=False)
+    if ext == '.jsonl':
+        return pd.read_json(path, lines=True, dtype=False)
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    # either a list of records or {"records": [...]}
+    if isinstance(payload, dict):
+        payload = payload.get('records', [])
+    return pd.DataFrame(payload)
+
+
+def pending_files(inbox, settle=SETTLE_SECONDS):
+    now = time.time()
+    files = []
+    for name in sorted(os.listdir(inbox)):
+        path = os.path.join(inbox, name)
+        if not os.path.isfile(path) or not name.lower().endswith(EXTENSIONS) or name.startswith(('.', '_')):
+            continue
+        if now - os.path.getmtime(path) < settle:
+            continue
+        files.append(path)
+    return files
+
+
+def _safe_parse(path):
+    try:
+        return path, parse_file(path), None
+    except Exception as e:
+        return path, None, f"parse failed: {e}"
+
+
+def validate_batch(df, reference_codes, known_parents):
+    """Split a parsed file into (accepted rows, rejected rows annotated with the rules they broke)."""
+    report = validate(df, reference_codes, known_parents=known_parents)
+    errors = report[report['severity'] == 'error']
+    bad_rows = errors['row'].unique()
+    rejected = df.iloc[bad_rows].copy()
+    if not rejected.empty:
+        rejected['rejected_by'] = errors.groupby('row')['rule'].agg(';'.join).reindex(bad_rows).to_numpy()
+    accepted = df.drop(index=df.index[bad_rows])
+    return accepted, rejected
+
+
+def reject_orphans(accepted, rejected, known_parents):
+    """Move accepted impact links whose parent is not among known_parents over to the rejected rows."""
+    if accepted.empty or 'parent_id' not in accepted.columns:
+        return accepted, rejected
+    accepted = accepted.reset_index(drop=True)
+    orphans = check_parent_references(accepted, known_parents)
+    if orphans is None:
+        return accepted, rejected
+    rows = orphans['row'].to_numpy()
+    moved = accepted.iloc[rows].assign(rejected_by='orphan_impact_link')
+    return accepted.drop(index=rows), pd.concat([rejected, moved], ignore_index=True)
+
+
+def _move(path, dest_dir):
+    os.makedirs(dest_dir, exist_ok=True)
+    shutil.move(path, os.path.join(dest_dir, os.path.basename(path)))
+
+
+def new_metrics():
+    return {'started_at': time.time(), 'files_processed': 0, 'files_failed': 0,
+            'rows_accepted': 0, 'rows_rejected': 0, 'rows_written': 0, 'batches': 0,
+            'backlog_files': 0, 'last_batch_seconds': None, 'last_batch_rows_per_second': None,
+            'files_per_second': 0.0, 'rows_per_second': 0.0}
+
+
+def write_metrics(metrics, inbox):
+    elapsed = max(time.time() - metrics['started_at'], 1e-9)
+    metrics['files_per_second'] = round(metrics['files_processed'] / elapsed, 3)
+    metrics['rows_per_second'] = round(metrics['rows_accepted'] / elapsed, 3)
+    path = os.path.join(inbox, '_metrics.json')
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(metrics, f, indent=2)
+    os.replace(tmp, path)
+
+
+def ingest_once(inbox, pool, reference_codes, known_parents, metrics,
+                base_path=UNIFIED_PATH, batch_size=50_000):
+    """Process every settled file currently in the inbox. Returns the number of files handled."""
+    files = pending_files(inbox)
+    metrics['backlog_files'] = len(files)
+    if not files:
+        return 0
+
+    start = time.perf_counter()
+    batch, batch_files = [], []
+
+    def flush():
+        if batch:
+            written = append_records(pd.concat(batch, ignore_index=True), base_path)
+            metrics['rows_written'] += written
+            metrics['batches'] += 1
+        # files are only moved once their rows are durably in the store
+        for done in batch_files:
+            _move(done, os.path.join(inbox, 'processed'))
+        batch.clear()
+        batch_files.clear()
+
+    # Phase 1: parse every file in parallel.
+    parsed = []
+    for path, df, error in pool.map(_safe_parse, files):
+        if error is None and not df.empty and not {'record_id', 'record_type'} <= set(df.columns):
+            error = "missing record_id / record_type columns"
+        if error:
+            log.warning("  %s: %s", os.path.basename(path), error)
+            metrics['files_failed'] += 1
+            metrics['backlog_files'] -= 1
+            _move(path, os.path.join(inbox, 'failed'))
+            continue
+        parsed.append((path, df))
+
+    # Events / indicators anywhere in this poll can be parents of links in any other file of it.
+    candidates = set(known_parents)
+    for _, df in parsed:
+        if not df.empty:
+            candidates.update(parent_keys(df))
+    candidates = frozenset(candidates)
+
+    # Phase 2: validate in parallel.
+    def check(item):
+        path, df = item
+        if df.empty:
+            return path, df, None
+        return (path,) + validate_batch(df, reference_codes, candidates)
+
+    checked = list(pool.map(check, parsed))
+
+    # Only accepted rows become parents; links to a parent that was itself rejected are
+    # rejected too (links are never parents, so one pass settles it).
+    for _, accepted, _ in checked:
+        if not accepted.empty:
+            known_parents.update(parent_keys(accepted))
+    parents = frozenset(known_parents)
+
+    # Phase 3: merge into the store in batches.
+    for path, accepted, rejected in checked:
+        name = os.path.basename(path)
+        if rejected is not None:
+            accepted, rejected = reject_orphans(accepted, rejected, parents)
+        if rejected is not None and not rejected.empty:
+            os.makedirs(os.path.join(inbox, 'failed'), exist_ok=True)
+            rejected.to_csv(os.path.join(inbox, 'failed', f"{name}.rejected.csv"), index=False)
+            metrics['rows_rejected'] += len(rejected)
+            log.warning("  %s: rejected %d rows", name, len(rejected))
+        if not accepted.empty:
+            batch.append(accepted)
+        batch_files.append(path)
+        metrics['rows_accepted'] += len(accepted)
+        metrics['files_processed'] += 1
+        metrics['backlog_files'] -= 1
+        if sum(len(b) for b in batch) >= batch_size:
+            flush()
+    flush()
+
+    elapsed = time.perf_counter() - start
+    metrics['last_batch_seconds'] = round(elapsed, 3)
+    metrics['last_batch_rows_per_second'] = round(sum(len(df) for _, df in parsed) / max(elapsed, 1e-9), 1)
+    return len(files)
+
+
+def run(inbox=INBOX_DIR, base_path=UNIFIED_PATH, ref_path=REFERENCE_PATH, workers=8,
+        interval=5.0, batch_size=50_000, once=False):
+    os.makedirs(inbox, exist_ok=True)
+    reference_codes = load_reference_codes(ref_path)
+    known_parents = parent_keys(read_merged(base_path)) if os.path.exists(base_path) else set()
+    metrics = new_metrics()
+
+    log.info("Watching %s with %d parser threads...", inbox, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            n = ingest_once(inbox, pool, reference_codes, known_parents, metrics, base_path, batch_size)
+            write_metrics(metrics, inbox)
+            if n:
+                log.info("Ingested %d files: %d rows accepted, %d rejected, %s rows/s overall",
+                         n, metrics['rows_accepted'], metrics['rows_rejected'], metrics['rows_per_second'])
+            if once and not pending_files(inbox, settle=0):
+                break
+            # in --once mode just wait for freshly dropped files to settle
+            time.sleep(0.5 if once else interval)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a drop folder and ingest record batches.")
+    parser.add_argument('--inbox', default=INBOX_DIR)
+    parser.add_argument('--base', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls.")
+    parser.add_argument('--batch-size', type=int, default=50_000, help="Rows per delta segment.")
+    parser.add_argument('--once', action='store_true', help="Drain the inbox and exit.")
+    args = parser.parse_args()
+    setup()
+    run(args.inbox, args.base, args.ref, args.workers, args.interval, args.batch_size, args.once)
+
+
+if __name__ == "__main__":
+    main()
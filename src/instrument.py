@@ -0,0 +1,166 @@
+"""
+Leveled logging plus timing / memory spans for the pipeline scripts.
+
+    from src.instrument import log, span
+
+    with span('resolve', links=len(links)):
+        resolved = resolve_links(links, events)
+    log.info("Resolved %d links", len(resolved))
+
+Spans are off unless tracing is enabled; then span() is a shared no-op context manager, so
+instrumented code pays one function call per stage. Enabled spans record wall time and,
+with tracemalloc, the net allocation and peak inside the span (nested spans included).
+
+Enable from the environment, which every instrumented script reads through setup():
+
+    FI_TRACE=reports/trace.json python -m src.run_forecast    # Chrome trace + summary table
+    FI_LOG_LEVEL=DEBUG python -m src.generate_impact_matrix
+
+Open the trace in chrome://tracing or https://ui.perfetto.dev.
+"""
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+log = logging.getLogger('fi')
+
+_NOOP = contextlib.nullcontext()
+_STATE = {'enabled': False, 'memory': False, 'started_tracemalloc': False}
+_SPANS = []
+_LOCAL = threading.local()
+
+
+def setup(level=None, trace=None):
+    """Configure logging (FI_LOG_LEVEL, default INFO) and tracing (FI_TRACE=<json path>)."""
+    level = level or os.environ.get('FI_LOG_LEVEL', 'INFO')
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(level.upper() if isinstance(level, str) else level)
+    trace = trace or os.environ.get('FI_TRACE')
+    if trace:
+        enable(memory=os.environ.get('FI_TRACE_MEMORY', '1') != '0')
+    return trace
+
+
+def enable(memory=True):
+    """Start recording spans (and tracemalloc peaks when memory=True)."""
+    _STATE['enabled'] = True
+    _STATE['memory'] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _STATE['started_tracemalloc'] = True
+
+
+def disable():
+    _STATE['enabled'] = False
+    if _STATE['started_tracemalloc']:
+        tracemalloc.stop()
+        _STATE['started_tracemalloc'] = False
+
+
+def enabled():
+    return _STATE['enabled']
+
+
+def spans():
+    """Recorded spans as a list of dicts (name, start_us, dur_us, ...)."""
+    return list(_SPANS)
+
+
+def reset():
+    _SPANS.clear()
+
+
+@contextlib.contextmanager
+def _span(name, args):
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    memory = _STATE['memory'] and tracemalloc.is_tracing()
+    record = {'name': name, 'args': args, 'pid': os.getpid(), 'tid': threading.get_ident(),
+              'depth': len(stack), 'peak': 0}
+    if memory:
+        # hand the peak so far to the enclosing span before this span starts its own
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        record['mem_start'] = current
+    stack.append(record)
+    start = time.perf_counter_ns()
+    try:
+        yield record
+    finally:
+        record['dur_us'] = (time.perf_counter_ns() - start) / 1000
+        record['start_us'] = start / 1000
+        stack.pop()
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record['peak'] = max(record['peak'], peak)
+            record['alloc_mb'] = (current - record['mem_start']) / 1e6
+            record['peak_mb'] = (record['peak'] - record['mem_start']) / 1e6
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], record['peak'])
+            tracemalloc.reset_peak()
+        _SPANS.append(record)
+        log.debug("%s%s: %.1f ms", '  ' * record['depth'], name, record['dur_us'] / 1000)
+
+
+def span(name, **args):
+    """Context manager timing a stage; a no-op unless tracing is enabled."""
+    if not _STATE['enabled']:
+        return _NOOP
+    return _span(name, args)
+
+
+def chrome_trace(records=None):
+    """Spans as a Chrome trace-event document (complete 'X' events)."""
+    events = []
+    for r in (_SPANS if records is None else records):
+        args = {k: v for k, v in r['args'].items()}
+        for key in ('alloc_mb', 'peak_mb'):
+            if key in r:
+                args[key] = round(r[key], 3)
+        events.append({'name': r['name'], 'ph': 'X', 'ts': r['start_us'], 'dur': r['dur_us'],
+                       'pid': r['pid'], 'tid': r['tid'], 'args': args})
+    return {'traceEvents': sorted(events, key=lambda e: e['ts']), 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(path, records=None):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(records), f, default=str)
+    return path
+
+
+def summary(records=None):
+    """Per-stage calls, total / mean wall time and the largest peak allocation, slowest first."""
+    records = _SPANS if records is None else records
+    if not records:
+        return pd.DataFrame(columns=['stage', 'calls', 'total_ms', 'mean_ms', 'peak_mb'])
+    df = pd.DataFrame({'stage': [r['name'] for r in records],
+                       'ms': [r['dur_us'] / 1000 for r in records],
+                       'peak_mb': [r.get('peak_mb', float('nan')) for r in records]})
+    table = df.groupby('stage', sort=False).agg(calls=('ms', 'size'), total_ms=('ms', 'sum'),
+                                                mean_ms=('ms', 'mean'), peak_mb=('peak_mb', 'max'))
+    return table.sort_values('total_ms', ascending=False).reset_index().round(2)
+
+
+def finish(trace=None):
+    """Write the Chrome trace and log the summary table if tracing was enabled by setup()."""
+    trace = trace or os.environ.get('FI_TRACE')
+    if not (_STATE['enabled'] and trace):
+        return None
+    export_chrome_trace(trace)
+    log.info("Stage timings:\n%s", summary().to_string(index=False))
+    log.info("Saved trace to %s", trace)
+    return trace
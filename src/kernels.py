@@ -0,0 +1,314 @@
+"""
+Compiled inner loops of the impact model, with the NumPy versions as the reference and fallback.
+
+    accumulate   weighted sum of link responses on a timeline, out[row] += w * shape(t - start, d),
+                 without materializing the [links x timesteps] response block
+    scenario     scenario scaling of baseline and impacts, clipped to a range
+    clip         clip into a range
+
+Each function has a NumPy implementation and, when Numba is installed, a JIT-compiled
+loop with the same signature and results (accumulate may add the links in another
+order, so its sums can differ in the last bits).
+The backend is picked per call: Numba for arrays of at least NUMBA_MIN_SIZE elements when
+it is available, NumPy otherwise. FI_KERNELS=numpy (or numba) forces one backend.
+Response shapes registered outside the built-in five always go through NumPy.
+
+    python -m src.kernels               # backend in use, equivalence check and timings
+    FI_KERNELS=numpy python -m src.run_forecast
+"""
+import argparse
+import functools
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.response_shapes import DAYS_PER_MONTH, evaluate
+
+KERNELS = os.environ.get('FI_KERNELS', 'auto')
+# Smallest call (elements, or links x timesteps) sent to Numba. Its first use in a process
+# costs about a second (import, load of the cached machine code), which smaller calls
+# don't earn back; long batch jobs can set FI_KERNELS=numba to use it for every call.
+NUMBA_MIN_SIZE = 1_000_000
+# Shapes with a compiled version, by the code the compiled loop switches on.
+SHAPE_CODES = {'linear': 0, 'logistic': 1, 'exponential': 2, 'pulse': 3, 'step': 4}
+EPOCH = np.datetime64('2000-01-01', 'ns')
+# Equivalence tolerance: compiled and NumPy sums may add the links in a different order.
+RTOL = 1e-10
+ATOL = 1e-12
+
+_compiled = None
+
+
+@functools.lru_cache(maxsize=None)
+def _numba():
+    # optional, and imported on first use (importing and compiling takes a second or two)
+    try:
+        import numba
+    except ImportError:  # without numba every kernel runs in NumPy
+        return None
+    return numba
+
+
+def backend(size=None):
+    """'numba' or 'numpy' for a call on `size` elements, honouring FI_KERNELS."""
+    if KERNELS not in ('auto', 'numpy', 'numba'):
+        raise ValueError(f"Unknown FI_KERNELS '{KERNELS}' (expected 'auto', 'numpy' or 'numba')")
+    if KERNELS == 'numpy' or _numba() is None:
+        return 'numpy'
+    if KERNELS == 'numba' or size is None or size >= NUMBA_MIN_SIZE:
+        return 'numba'
+    return 'numpy'
+
+
+# -----------------------------------------------------------------------------------
+# NumPy
+# -----------------------------------------------------------------------------------
+def accumulate_numpy(weights, starts, months, shapes, t, rows=None, n_rows=None):
+    # exp overflows in the logistic shape long before its midpoint, where the fraction is 1 / inf = 0
+    with np.errstate(over='ignore'):
+        fractions = evaluate(shapes, months, (t[None, :] - starts[:, None]) / DAYS_PER_MONTH)
+    if rows is None:
+        return weights @ fractions
+    out = np.zeros((n_rows, len(t)))
+    np.add.at(out, rows, weights[:, None] * fractions)
+    return out
+
+
+def scenario_numpy(baseline, impacts, baseline_scale, impact_scale, lower, upper):
+    return np.clip(baseline * baseline_scale + impacts * impact_scale, lower, upper)
+
+
+def clip_numpy(x, lower, upper):
+    return np.clip(x, lower, upper)
+
+
+# -----------------------------------------------------------------------------------
+# Numba
+# -----------------------------------------------------------------------------------
+def _accumulate_loop(weights, starts, months, codes, t, rows, out):
+    # the response_shapes kernels, one (link, timestep) at a time
+    for i in range(len(weights)):
+        w, s, d, code, r = weights[i], starts[i], months[i], codes[i], rows[i]
+        for j in range(len(t)):
+            x = (t[j] - s) / DAYS_PER_MONTH
+            if code == 0:
+                f = min(max(x / d, 0.0), 1.0)
+            elif x < 0:
+                f = 0.0
+            elif code == 1:
+                f = 1.0 / (1.0 + np.exp(-8.0 * (x - d / 2) / d))
+            elif code == 2:
+                f = -np.expm1(-3.0 * x / d)
+            elif code == 3:
+                f = np.exp2(-x / d)
+            else:
+                f = 1.0
+            out[r, j] += w * f
+    return out
+
+
+def _scenario_loop(baseline, impacts, baseline_scale, impact_scale, lower, upper, out):
+    for i in range(len(out)):
+        out[i] = min(max(baseline[i] * baseline_scale + impacts[i] * impact_scale, lower), upper)
+    return out
+
+
+def _clip_loop(x, lower, upper, out):
+    for i in range(len(out)):
+        out[i] = min(max(x[i], lower), upper)
+    return out
+
+
+def compiled():
+    """The jitted loops (compiled once per process, cached on disk by Numba); None without Numba."""
+    global _compiled
+    numba = _numba()
+    if numba is None:
+        return None
+    if _compiled is None:
+        jit = numba.njit(cache=True, nogil=True)
+        _compiled = {
+            'accumulate': jit(_accumulate_loop),
+            'scenario': jit(_scenario_loop),
+            'clip': jit(_clip_loop),
+        }
+    return _compiled
+
+
+def accumulate_numba(weights, starts, months, shapes, t, rows=None, n_rows=None):
+    shapes = np.asarray(shapes)
+    codes = np.array([SHAPE_CODES.get(s, -1) for s in shapes], dtype=np.int64)
+    builtin = codes >= 0
+    out = np.zeros((1 if rows is None else n_rows, len(t)))
+    link_rows = np.zeros(len(weights), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+    compiled()['accumulate'](weights[builtin], starts[builtin], months[builtin], codes[builtin],
+                             t, link_rows[builtin], out)
+    if not builtin.all():
+        rest = ~builtin
+        out += accumulate_numpy(weights[rest], starts[rest], months[rest], shapes[rest], t,
+                                link_rows[rest], len(out))
+    return out[0] if rows is None else out
+
+
+def _elementwise(name, arrays, *scalars):
+    """Run a 1-D compiled loop over broadcast arrays; returns the result in their shape."""
+    arrays = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in arrays])
+    shape = arrays[0].shape
+    flat = [np.ascontiguousarray(a).ravel() for a in arrays]
+    out = np.empty(flat[0].size)
+    compiled()[name](*flat, *scalars, out)
+    return out.reshape(shape)
+
+
+def scenario_numba(baseline, impacts, baseline_scale, impact_scale, lower, upper):
+    return _elementwise('scenario', (baseline, impacts), float(baseline_scale), float(impact_scale),
+                        float(lower), float(upper))
+
+
+def clip_numba(x, lower, upper):
+    return _elementwise('clip', (x,), float(lower), float(upper))
+
+
+# -----------------------------------------------------------------------------------
+# Dispatch
+# -----------------------------------------------------------------------------------
+def accumulate(weights, starts, months, shapes, t, rows=None, n_rows=None):
+    """
+    Sum over links i of weights[i] * shape_i(months from starts[i] to t, months[i]) on the
+    time grid t, with t and starts in days since EPOCH (see days_since_epoch): a [len(t)]
+    array, or [n_rows, len(t)] with link i added to row rows[i].
+    """
+    weights = np.asarray(weights, dtype=float)
+    starts = np.asarray(starts, dtype=float)
+    months = np.asarray(months, dtype=float)
+    t = np.asarray(t, dtype=float)
+    if backend(len(weights) * len(t)) == 'numba':
+        return accumulate_numba(weights, starts, months, shapes, t, rows, n_rows)
+    return accumulate_numpy(weights, starts, months, np.asarray(shapes), t, rows, n_rows)
+
+
+def scenario(baseline, impacts, baseline_scale=1.0, impact_scale=1.0, lower=0.0, upper=100.0):
+    """clip(baseline * baseline_scale + impacts * impact_scale, lower, upper), elementwise with broadcasting."""
+    if backend(np.broadcast(baseline, impacts).size) == 'numba':
+        return scenario_numba(baseline, impacts, baseline_scale, impact_scale, lower, upper)
+    return scenario_numpy(baseline, impacts, baseline_scale, impact_scale, lower, upper)
+
+
+def clip(x, lower, upper):
+    if backend(np.size(x)) == 'numba':
+        return clip_numba(x, lower, upper)
+    return clip_numpy(x, lower, upper)
+
+
+def days_since_epoch(dates):
+    """Dates (datetime-like) as float days since EPOCH."""
+    return (np.asarray(dates, dtype='datetime64[ns]') - EPOCH) / np.timedelta64(1, 'D')
+
+
+def link_starts(links):
+    """Start of each link's effect (event_date + lag_months), in days since EPOCH."""
+    starts = pd.to_datetime(links['event_date']) + \
+        pd.to_timedelta(np.asarray(links['lag_months'], dtype=float) * DAYS_PER_MONTH, unit='D')
+    return days_since_epoch(starts.to_numpy())
+
+
+# -----------------------------------------------------------------------------------
+# Equivalence check
+# -----------------------------------------------------------------------------------
+def sample(n_links=200, n_steps=400, n_rows=7, seed=0):
+    """Random links of every compiled shape on a daily grid (days since EPOCH), starting before and after it."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_steps, dtype=float) + 7300.0
+    return {
+        'weights': rng.normal(0, 0.1, n_links),
+        'starts': rng.uniform(t[0] - 1800, t[-1] + 360, n_links).round(1),
+        'months': rng.choice([0.5, 1.0, 6.0, 12.0, 36.0], n_links),
+        'shapes': rng.choice(sorted(SHAPE_CODES), n_links),
+        't': t,
+        'rows': rng.integers(0, n_rows, n_links),
+        'n_rows': n_rows,
+        # out of range and missing values, as members without a fit produce
+        'baseline': np.where(rng.random((n_rows, n_steps)) < 0.01, np.nan, rng.uniform(-20, 120, (n_rows, n_steps))),
+        'impacts': rng.normal(0, 10, n_steps),
+    }
+
+
+def check(n_links=200, n_steps=400, seed=0):
+    """
+    Compare the compiled kernels with the NumPy ones on random inputs, with starts between
+    and exactly on grid points. Returns
+    [(case, max abs difference, ok)]; raises RuntimeError if Numba is not installed.
+    """
+    if compiled() is None:
+        raise RuntimeError("Numba is not installed, only the NumPy kernels are available")
+    s = sample(n_links, n_steps, seed=seed)
+    on_grid = dict(s, starts=np.floor(s['starts']))
+    link_args = ('weights', 'starts', 'months', 'shapes', 't')
+    cases = {
+        'accumulate': lambda f, d: f(*(d[k] for k in link_args)),
+        'accumulate_rows': lambda f, d: f(*(d[k] for k in link_args), d['rows'], d['n_rows']),
+    }
+    results = []
+
+    def compare(case, a, b, exact):
+        # elementwise kernels must match exactly, NaNs included; sums up to the order of addition
+        ok = np.array_equal(a, b, equal_nan=True) if exact else np.allclose(a, b, rtol=RTOL, atol=ATOL)
+        results.append((case, float(np.nanmax(np.abs(a - b))), bool(ok)))
+
+    for name, call in cases.items():
+        for label, data in (('', s), ('_on_grid', on_grid)):
+            compare(name + label, call(accumulate_numpy, data), call(accumulate_numba, data), exact=False)
+    for scales in ((1.0, 1.0), (1.05, 1.2), (0.95, 0.8)):
+        compare(f'scenario_{scales[0]}_{scales[1]}',
+                scenario_numpy(s['baseline'], s['impacts'], *scales, 0.0, 100.0),
+                scenario_numba(s['baseline'], s['impacts'], *scales, 0.0, 100.0), exact=True)
+    compare('clip', clip_numpy(s['baseline'], 0.0, 100.0), clip_numba(s['baseline'], 0.0, 100.0), exact=True)
+    return results
+
+
+def _time(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the compiled kernels against NumPy and time both.")
+    parser.add_argument('--links', type=int, default=2000)
+    parser.add_argument('--steps', type=int, default=3000, help="Daily timesteps (3000: about eight years).")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"FI_KERNELS={KERNELS}: {backend()} for large arrays")
+    if compiled() is None:
+        print("Numba is not installed; nothing to compare.")
+        return
+    results = check()
+    for case, diff, ok in results:
+        print(f"  {case:<24} max |diff| {diff:.2e}  {'ok' if ok else 'MISMATCH'}")
+
+    s = sample(args.links, args.steps)
+    # one baseline per link, as in a simulation over link draws
+    block = np.resize(s['baseline'], (args.links, args.steps))
+    print(f"\n{args.links} links x {args.steps} steps:")
+    timings = {
+        'accumulate': (lambda: accumulate_numpy(s['weights'], s['starts'], s['months'], s['shapes'], s['t'],
+                                                s['rows'], s['n_rows']),
+                       lambda: accumulate_numba(s['weights'], s['starts'], s['months'], s['shapes'], s['t'],
+                                                s['rows'], s['n_rows'])),
+        'scenario': (lambda: scenario_numpy(block, s['impacts'], 1.05, 1.2, 0.0, 100.0),
+                     lambda: scenario_numba(block, s['impacts'], 1.05, 1.2, 0.0, 100.0)),
+    }
+    for name, (numpy_fn, numba_fn) in timings.items():
+        a, b = _time(numpy_fn, args.repeat), _time(numba_fn, args.repeat)
+        print(f"  {name:<12} numpy {a * 1000:9.1f} ms  numba {b * 1000:9.1f} ms  ({a / b:.1f}x)")
+    if not all(ok for _, _, ok in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
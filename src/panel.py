@@ -0,0 +1,277 @@
+"""
+Dense indicator x month panel of observations, built once and memory-mapped by every reader.
+
+    data/processed/panel/<version>/values.npy   float64 [rows, months], NaN where unobserved
+    data/processed/panel/<version>/dates.npy    datetime64 [rows, months], the observation date
+    data/processed/panel/<version>/mask.npy     bool    [rows, months], True where observed
+    data/processed/panel/<version>/index.json   row keys, month range, source signature
+    data/processed/panel/CURRENT                -> <version>
+
+Rows are (indicator_code, gender, location) with aliases resolved by the schema layer;
+missing gender / location mean the national aggregate ('all' / 'national'). Columns are
+calendar months, stamped at month end; each cell also keeps the exact value and date of
+its observation, so fits on the panel match fits on the raw rows. Several observations of
+one row in the same month keep the latest. Arrays are opened with np.load(mmap_mode='r'),
+so processes share the page cache instead of each holding a copy.
+
+The repository's dataset uses data/processed/panel; any other unified file gets its own
+directory keyed by its absolute path (panel_dir_for).
+
+    python -m src.panel build
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.delta_store import UNIFIED_PATH, source_signature
+from src.schema import REFERENCE_PATH, canonical_code, code_mask, load_unified
+from src.snapshots import new_version, POINTER
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PANEL_DIR = os.path.join(BASE_DIR, 'data', 'processed', 'panel')
+ROW_KEYS = ['indicator_code', 'gender', 'location']
+DEFAULT_GENDER = 'all'
+DEFAULT_LOCATION = 'national'
+KEEP_VERSIONS = 3
+# Bumped when the on-disk layout changes; panels of another format are rebuilt.
+PANEL_FORMAT = 2
+
+
+def panel_dir_for(base_path=UNIFIED_PATH):
+    """Panel directory of a unified file: PANEL_DIR for the repository's dataset, else one per source path."""
+    path = os.path.abspath(base_path)
+    if path == os.path.abspath(UNIFIED_PATH):
+        return PANEL_DIR
+    stem = os.path.splitext(os.path.basename(path))[0]
+    key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(os.path.dirname(PANEL_DIR), 'panels', f'{stem}-{key}')
+
+
+def build_panel(df):
+    """Pivot observation rows of the unified table into a panel dict (values, mask, rows, months)."""
+    is_obs = code_mask(df['record_type'], 'observation')
+    obs = df.loc[is_obs, [c for c in ROW_KEYS + ['indicator', 'pillar', 'observation_date', 'value_numeric']
+                          if c in df.columns]]
+    dates = pd.to_datetime(obs['observation_date'], errors='coerce')
+    values = pd.to_numeric(obs['value_numeric'], errors='coerce')
+    keep = (dates.notna() & values.notna() & obs['indicator_code'].notna()).to_numpy()
+    obs, dates, values = obs[keep], dates[keep], values[keep]
+
+    keys = pd.DataFrame({
+        'indicator_code': obs['indicator_code'].astype(str).to_numpy(),
+        'gender': obs['gender'].astype(object).fillna(DEFAULT_GENDER).astype(str).to_numpy()
+        if 'gender' in obs.columns else DEFAULT_GENDER,
+        'location': obs['location'].astype(object).fillna(DEFAULT_LOCATION).astype(str).to_numpy()
+        if 'location' in obs.columns else DEFAULT_LOCATION,
+    })
+    grouped = keys.groupby(ROW_KEYS, sort=True)
+    row_idx = grouped.ngroup().to_numpy()
+    rows = grouped.size().reset_index()[ROW_KEYS]
+    for col in ['indicator', 'pillar']:
+        if col in obs.columns:
+            labels = pd.Series(obs[col].astype(object).to_numpy()).groupby(row_idx).first()
+            rows[col] = labels.reindex(np.arange(len(rows))).to_numpy()
+
+    month = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+    first = int(month.min()) if len(month) else 0
+    n_months = int(month.max()) - first + 1 if len(month) else 0
+    col_idx = month - first
+
+    # latest observation in a (row, month) cell wins
+    order = np.argsort(dates.to_numpy(), kind='stable')
+    cells = pd.DataFrame({'row': row_idx[order], 'col': col_idx[order], 'value': values.to_numpy()[order],
+                          'date': dates.to_numpy()[order]})
+    cells = cells.drop_duplicates(['row', 'col'], keep='last')
+
+    panel_values = np.full((len(rows), n_months), np.nan, dtype=np.float64)
+    panel_dates = np.full((len(rows), n_months), np.datetime64('NaT'), dtype='datetime64[ns]')
+    panel_mask = np.zeros((len(rows), n_months), dtype=bool)
+    panel_values[cells['row'], cells['col']] = cells['value'].to_numpy(dtype=np.float64)
+    panel_dates[cells['row'], cells['col']] = cells['date'].to_numpy(dtype='datetime64[ns]')
+    panel_mask[cells['row'], cells['col']] = True
+
+    months = pd.period_range(start=pd.Period(year=first // 12, month=first % 12 + 1, freq='M'),
+                             periods=n_months, freq='M')
+    return {'values': panel_values, 'dates': panel_dates, 'mask': panel_mask, 'rows': rows,
+            'months': months.to_timestamp(how='end').normalize()}
+
+
+def write_panel(panel, panel_dir=PANEL_DIR, source=None, keep=KEEP_VERSIONS, current=True):
+    """Write a new panel version and atomically make it current (unless current=False). Returns the version."""
+    version = new_version()
+    tmp_dir = os.path.join(panel_dir, f'.{version}.tmp')
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, 'values.npy'), panel['values'])
+    np.save(os.path.join(tmp_dir, 'dates.npy'), panel['dates'])
+    np.save(os.path.join(tmp_dir, 'mask.npy'), panel['mask'])
+    index = {
+        'format': PANEL_FORMAT,
+        'rows': panel['rows'].astype(object).where(panel['rows'].notna(), None).to_dict(orient='records'),
+        'first_month': panel['months'][0].strftime('%Y-%m') if len(panel['months']) else None,
+        'n_months': len(panel['months']),
+        'source': source,
+    }
+    with open(os.path.join(tmp_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_dir, os.path.join(panel_dir, version))
+
+    if current:
+        pointer_tmp = os.path.join(panel_dir, f'{POINTER}.{os.getpid()}.tmp')
+        with open(pointer_tmp, 'w') as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(panel_dir, POINTER))
+
+    # readers that already mapped an old version keep their mapping after the unlink
+    keep_current = current_version(panel_dir)
+    for old in list_versions(panel_dir)[:-keep]:
+        if old not in (version, keep_current):
+            shutil.rmtree(os.path.join(panel_dir, old), ignore_errors=True)
+    return version
+
+
+def list_versions(panel_dir=PANEL_DIR):
+    if not os.path.isdir(panel_dir):
+        return []
+    return sorted(v for v in os.listdir(panel_dir) if not v.startswith('.') and v != POINTER)
+
+
+def find_version(panel_dir, source):
+    """Newest kept panel version (of the current format) built from `source` (a source_signature), or None."""
+    for version in reversed(list_versions(panel_dir)):
+        try:
+            with open(os.path.join(panel_dir, version, 'index.json')) as f:
+                index = json.load(f)
+            if index['source'] == source and index.get('format') == PANEL_FORMAT:
+                return version
+        except (FileNotFoundError, ValueError, KeyError):
+            continue
+    return None
+
+
+def current_version(panel_dir=PANEL_DIR):
+    try:
+        with open(os.path.join(panel_dir, POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_panel(panel_dir=PANEL_DIR, version=None):
+    """Memory-map a panel version (default: current). Arrays are read-only views of the files."""
+    version = version or current_version(panel_dir)
+    if version is None:
+        raise FileNotFoundError(f"No panel built in {panel_dir}")
+    path = os.path.join(panel_dir, version)
+    with open(os.path.join(path, 'index.json')) as f:
+        index = json.load(f)
+    months = pd.period_range(start=index['first_month'], periods=index['n_months'], freq='M') \
+        if index['n_months'] else pd.PeriodIndex([], freq='M')
+    return {
+        'values': np.load(os.path.join(path, 'values.npy'), mmap_mode='r'),
+        'dates': np.load(os.path.join(path, 'dates.npy'), mmap_mode='r')
+        if os.path.exists(os.path.join(path, 'dates.npy')) else None,
+        'mask': np.load(os.path.join(path, 'mask.npy'), mmap_mode='r'),
+        'rows': pd.DataFrame(index['rows'], columns=ROW_KEYS + ['indicator', 'pillar']),
+        'months': months.to_timestamp(how='end').normalize(),
+        'version': version,
+        'dir': panel_dir,
+        'source': index['source'],
+        'format': index.get('format', 1),
+    }
+
+
+def ensure_panel(base_path=UNIFIED_PATH, ref_path=REFERENCE_PATH, panel_dir=None, df=None, version=None):
+    """
+    Panel of the unified data, rebuilt first if the data changed since it was built.
+
+    panel_dir defaults to panel_dir_for(base_path).
+    `version` pins a data version (delta_store.current_version); its panel is looked up
+    among the kept panel versions and only becomes current when built from current data.
+    Pass the already loaded unified table as `df` to avoid reading it again on a rebuild.
+    """
+    panel_dir = panel_dir or panel_dir_for(base_path)
+    signature = source_signature(base_path, version)
+    try:
+        panel = load_panel(panel_dir)
+        if panel['source'] == signature and panel['format'] == PANEL_FORMAT:
+            return panel
+    except FileNotFoundError:
+        pass
+    found = find_version(panel_dir, signature)
+    if found is not None:
+        return load_panel(panel_dir, found)
+    os.makedirs(panel_dir, exist_ok=True)
+    df = load_unified(base_path, ref_path, version) if df is None else df
+    current = version is None or signature == source_signature(base_path)
+    return load_panel(panel_dir, write_panel(build_panel(df), panel_dir, signature, current=current))
+
+
+def row_index(panel, code, gender=DEFAULT_GENDER, location=DEFAULT_LOCATION):
+    """Panel row of an indicator series, or None if it has no observations."""
+    rows = panel['rows']
+    hit = np.flatnonzero((rows['indicator_code'] == canonical_code(code)).to_numpy() &
+                         (rows['gender'] == gender).to_numpy() & (rows['location'] == location).to_numpy())
+    return int(hit[0]) if len(hit) else None
+
+
+def series(panel, code, gender=DEFAULT_GENDER, location=DEFAULT_LOCATION, dropna=True):
+    """One indicator as a Series indexed by month end (observed months only by default)."""
+    row = row_index(panel, code, gender, location)
+    if row is None:
+        return pd.Series(dtype='float64')
+    s = pd.Series(np.asarray(panel['values'][row], dtype='float64'), index=panel['months'], name=code)
+    return s[np.asarray(panel['mask'][row])] if dropna else s
+
+
+def observations(panel, code, gender=DEFAULT_GENDER, location=DEFAULT_LOCATION):
+    """
+    One indicator's observed cells at their exact dates and values, oldest first.
+
+    Unlike series(), dates are not re-stamped to month end, so a fit on this matches a fit
+    on the raw observation rows (one per month).
+    """
+    row = row_index(panel, code, gender, location)
+    if row is None:
+        return pd.DataFrame({'observation_date': pd.Series(dtype='datetime64[ns]'),
+                             'value_numeric': pd.Series(dtype='float64')})
+    observed = np.asarray(panel['mask'][row])
+    return pd.DataFrame({'observation_date': pd.DatetimeIndex(np.asarray(panel['dates'][row])[observed]),
+                         'value_numeric': np.asarray(panel['values'][row], dtype='float64')[observed]})
+
+
+def to_frame(panel, gender=DEFAULT_GENDER, location=DEFAULT_LOCATION):
+    """Months x indicator_code DataFrame for one gender / location slice (NaN where unobserved)."""
+    rows = panel['rows']
+    sel = np.flatnonzero((rows['gender'] == gender).to_numpy() & (rows['location'] == location).to_numpy())
+    return pd.DataFrame(np.asarray(panel['values'][sel]).T, index=panel['months'],
+                        columns=rows['indicator_code'].to_numpy()[sel])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the indicator x month panel.")
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--out', default=None, help="Panel directory (default: keyed by --data).")
+    args = parser.parse_args()
+    args.out = args.out or panel_dir_for(args.data)
+
+    if args.command == 'build':
+        os.makedirs(args.out, exist_ok=True)
+        panel = build_panel(load_unified(args.data, args.ref))
+        version = write_panel(panel, args.out, source_signature(args.data))
+        print(f"Built panel {version}: {panel['values'].shape[0]} series x {panel['values'].shape[1]} months")
+    else:
+        panel = load_panel(args.out)
+        print(f"Panel {panel['version']}: {len(panel['rows'])} series, "
+              f"{panel['months'][0].date()} .. {panel['months'][-1].date()}, "
+              f"{int(np.asarray(panel['mask']).sum())} observed cells")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Dependency-aware runner for the pipeline stages, skipping stages whose inputs are unchanged.
+
+    enrich -> validate -> impacts  -> report
+                       -> forecast -/
+
+Each stage is one `python -m src <command>` run from the repo root, with declared input
+and output paths. Its hash covers the command line, the source of every src module the
+command imports (transitively) and the content of its inputs; a stage whose hash matches
+its last successful run and whose outputs still exist is skipped. Inputs include the
+outputs of upstream stages, so a stage that reruns but writes identical files does not
+invalidate what comes after it. Stages whose dependencies are done run concurrently.
+
+    data/.pipeline/state.json       last hash and duration per stage, recent runs
+    data/.pipeline/logs/<stage>.log output of the stage's last run
+
+    python -m src.pipeline                    # everything that is out of date
+    python -m src.pipeline report --dry-run   # what would run to refresh the figures
+    python -m src.pipeline forecast --force   # rerun forecast (and whatever it invalidates)
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from src.__main__ import COMMANDS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = os.path.join(BASE_DIR, 'data', '.pipeline')
+STATE_PATH = os.path.join(STATE_DIR, 'state.json')
+KEEP_RUNS = 20
+
+# Paths are relative to the repo root; directories stand for every file below them.
+DATA = ['data/raw/ethiopia_fi_unified_data.csv', 'data/raw/deltas', 'data/raw/reference_codes.csv']
+MATRIX = 'data/processed/event_indicator_matrix.csv'
+FORECASTS = 'data/forecasts_2025_2027.csv'
+MONTHLY = 'data/processed/forecasts_monthly.csv'
+
+# stage -> command, stages it runs after, input paths, output paths
+STAGES = {
+    'enrich': {
+        'command': ['enrich'], 'after': [],
+        'inputs': ['data/raw/ethiopia_fi_unified_data.csv'],
+        'outputs': ['data/raw/deltas'],
+    },
+    'validate': {
+        'command': ['validate', '--out', 'reports/violations.csv'], 'after': ['enrich'],
+        'inputs': DATA,
+        'outputs': ['reports/violations.csv'],
+    },
+    'impacts': {
+        'command': ['impacts', '--no-plot'], 'after': ['validate'],
+        'inputs': DATA,
+        'outputs': [MATRIX],
+    },
+    'forecast': {
+        'command': ['forecast', '--no-plot'], 'after': ['validate'],
+        'inputs': DATA,
+        'outputs': [FORECASTS, MONTHLY],
+    },
+    'report': {
+        'command': ['render'], 'after': ['impacts', 'forecast'],
+        'inputs': DATA + [MATRIX, MONTHLY],
+        'outputs': ['reports/figures/manifest.json'],
+    },
+}
+
+
+# -----------------------------------------------------------------------------------
+# Hashing
+# -----------------------------------------------------------------------------------
+def _imported(tree, lazy):
+    """src modules a module imports; lazy=False skips imports inside functions."""
+    nodes = list(ast.walk(tree)) if lazy else [
+        node for top in tree.body if not isinstance(top, (ast.FunctionDef, ast.AsyncFunctionDef))
+        for node in ast.walk(top)]
+    names = []
+    for node in nodes:
+        if isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] == 'src':
+            names.append(node.module)
+            names.extend(f'{node.module}.{alias.name}' for alias in node.names)
+        elif isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names if alias.name.split('.')[0] == 'src')
+    return names
+
+
+def module_sources(module):
+    """
+    Source files of a src module and the src modules it imports, transitively. Imports
+    inside functions count only for the module itself: they are how a script loads what
+    its own command needs (render's main imports run_forecast), not what its importers need.
+    """
+    seen, todo = set(), [(module, True)]
+    while todo:
+        name, lazy = todo.pop()
+        path = os.path.join(BASE_DIR, *name.split('.')) + '.py'
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        todo.extend((dep, False) for dep in _imported(tree, lazy))
+    return sorted(os.path.join(BASE_DIR, *name.split('.')) + '.py' for name in seen)
+
+
+def files_under(path):
+    if os.path.isdir(path):
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                if not name.endswith('.tmp'):
+                    yield os.path.join(root, name)
+    elif os.path.exists(path):
+        yield path
+
+
+def file_digest(path, cache):
+    """sha1 of a file's content, reused while its size and mtime are unchanged."""
+    st = os.stat(path)
+    key = os.path.relpath(path, BASE_DIR)
+    cached = cache.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    cache[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+    return cache[key][2]
+
+
+def stage_hash(name, cache):
+    stage = STAGES[name]
+    module = COMMANDS[stage['command'][0]][0]
+    h = hashlib.sha1(json.dumps(stage['command']).encode())
+    for path in module_sources(module) + [os.path.join(BASE_DIR, p) for p in stage['inputs']]:
+        for f in files_under(path):
+            h.update(os.path.relpath(f, BASE_DIR).encode())
+            h.update(file_digest(f, cache).encode())
+    return h.hexdigest()
+
+
+def outputs_exist(name):
+    return all(os.path.exists(os.path.join(BASE_DIR, p)) for p in STAGES[name]['outputs'])
+
+
+# -----------------------------------------------------------------------------------
+# Running
+# -----------------------------------------------------------------------------------
+def load_state():
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'stages': {}, 'files': {}, 'runs': []}
+
+
+def save_state(state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp = f'{STATE_PATH}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, STATE_PATH)
+
+
+def upstream(targets):
+    """The targets and every stage they depend on, in declaration (= topological) order."""
+    needed, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(STAGES[name]['after'])
+    return [name for name in STAGES if name in needed]
+
+
+def run_stage(name):
+    """Run one stage as a subprocess; returns (returncode, seconds)."""
+    log_dir = os.path.join(STATE_DIR, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(log_dir, f'{name}.log'), 'w') as out:
+        proc = subprocess.run([sys.executable, '-m', 'src'] + STAGES[name]['command'],
+                              cwd=BASE_DIR, stdout=out, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - start
+
+
+def run(targets=None, force=(), jobs=None, dry_run=False):
+    """
+    Bring the targets (default: every stage) up to date. Stages in `force` run even if
+    unchanged. Returns ({stage: status}, {stage: seconds}) in stage order; status is
+    ran / skipped / failed / blocked (planned instead of ran in a dry run).
+    """
+    order = upstream(targets or list(STAGES))
+    state = load_state()
+    cache = state['files']
+    status, hashes, seconds = {}, {}, {}
+
+    def ready(name):
+        return name not in status and all(status.get(dep) in ('ran', 'skipped', 'planned')
+                                          for dep in STAGES[name]['after'] if dep in order)
+
+    def blocked(name):
+        return any(status.get(dep) in ('failed', 'blocked') for dep in STAGES[name]['after'])
+
+    with ThreadPoolExecutor(max_workers=jobs or len(order)) as pool:
+        running = {}
+        while len(status) < len(order):
+            for name in order:
+                if name in status or name in running.values():
+                    continue
+                if blocked(name):
+                    status[name] = 'blocked'
+                    continue
+                if not ready(name):
+                    continue
+                # hashed only now: the inputs may be outputs of stages that just finished
+                hashes[name] = stage_hash(name, cache)
+                last = state['stages'].get(name, {})
+                if (name not in force and last.get('hash') == hashes[name] and outputs_exist(name)
+                        and not any(status.get(dep) == 'planned' for dep in STAGES[name]['after'])):
+                    status[name] = 'skipped'
+                elif dry_run:
+                    status[name] = 'planned'
+                else:
+                    print(f"[{name}] {' '.join(STAGES[name]['command'])}")
+                    running[pool.submit(run_stage, name)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                code, seconds[name] = future.result()
+                status[name] = 'ran' if code == 0 else 'failed'
+                print(f"[{name}] {status[name]} in {seconds[name]:.2f}s")
+                if code == 0:
+                    # rehash: a stage may rewrite its own inputs (enrich appends deltas)
+                    state['stages'][name] = {'hash': stage_hash(name, cache), 'seconds': round(seconds[name], 3),
+                                             'finished': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+                else:
+                    print(f"[{name}] exit code {code}, see {os.path.join(STATE_DIR, 'logs', name + '.log')}")
+
+    if not dry_run:
+        state['runs'] = (state['runs'] + [{
+            'started': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'stages': {name: {'status': status[name], 'seconds': round(seconds.get(name, 0.0), 3)}
+                       for name in order},
+        }])[-KEEP_RUNS:]
+    save_state(state)
+    return {name: status[name] for name in order}, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the out-of-date pipeline stages.")
+    parser.add_argument('targets', nargs='*', metavar='stage',
+                        help=f"Stages to bring up to date, with their dependencies ({', '.join(STAGES)}).")
+    parser.add_argument('--force', action='store_true', help="Rerun the named stages even if unchanged.")
+    parser.add_argument('--jobs', type=int, default=None, help="Stages run at the same time.")
+    parser.add_argument('--dry-run', action='store_true', help="Only show which stages would run.")
+    args = parser.parse_args()
+    unknown = set(args.targets) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    status, seconds = run(args.targets, args.targets if args.force else (), args.jobs, args.dry_run)
+    print("\nstage      status    seconds")
+    for name, s in status.items():
+        print(f"{name:<10} {s:<9} {seconds.get(name, 0.0):7.2f}")
+    if 'failed' in status.values():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Coverage, gap and correlation profile of every indicator series, computed in one
+vectorized pass over the indicator x month panel (src/panel.py).
+
+  * coverage     - observed months per series and year,
+  * first / last - first and last observed month per series,
+  * gaps         - runs of years without an observation between a series' first and last year,
+  * correlations - pairwise-complete Pearson correlations of the annual means of the
+                   national series (same result as DataFrame.corr(min_periods=...)).
+
+The profile is cached next to the panel version it was computed from, so the EDA
+notebook, the dashboard and the validation report reuse it until the data changes.
+
+    python -m src.profiling
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.panel import PANEL_DIR, DEFAULT_GENDER, DEFAULT_LOCATION, ensure_panel
+
+PROFILE_FILE = 'profile.pkl'
+# Pairs of series with fewer common years than this get a NaN correlation.
+MIN_PERIODS = 3
+
+
+def series_labels(rows):
+    """'CODE' for national series, 'CODE [gender, location]' for disaggregated ones."""
+    national = (rows['gender'] == DEFAULT_GENDER) & (rows['location'] == DEFAULT_LOCATION)
+    return rows['indicator_code'].where(
+        national, rows['indicator_code'] + ' [' + rows['gender'] + ', ' + rows['location'] + ']')
+
+
+def annual_blocks(panel):
+    """(values, mask, years) with months padded to whole years: arrays [series, years, 12]."""
+    values, mask, months = np.asarray(panel['values']), np.asarray(panel['mask']), panel['months']
+    if len(months) == 0:
+        return values.reshape(len(values), 0, 12), mask.reshape(len(mask), 0, 12), np.array([], dtype=int)
+    lead = months[0].month - 1
+    trail = 12 - months[-1].month
+    pad = ((0, 0), (lead, trail))
+    values = np.pad(values, pad, constant_values=np.nan)
+    mask = np.pad(mask, pad, constant_values=False)
+    years = np.arange(months[0].year, months[-1].year + 1)
+    return values.reshape(len(values), len(years), 12), mask.reshape(len(mask), len(years), 12), years
+
+
+def gap_runs(observed, years, labels):
+    """Runs of unobserved years strictly between each series' first and last observed year."""
+    n_series, n_years = observed.shape
+    if n_years == 0:
+        return pd.DataFrame(columns=['series', 'gap_start', 'gap_end', 'years'])
+    any_obs = observed.any(axis=1)
+    first = np.where(any_obs, observed.argmax(axis=1), n_years)
+    last = np.where(any_obs, n_years - 1 - observed[:, ::-1].argmax(axis=1), -1)
+    idx = np.arange(n_years)
+    inside = (idx >= first[:, None]) & (idx <= last[:, None])
+    missing = inside & ~observed
+
+    # run starts / ends from the edges of the padded boolean matrix
+    edges = np.diff(np.pad(missing.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    s_row, s_col = np.nonzero(edges == 1)
+    _, e_col = np.nonzero(edges == -1)
+    return pd.DataFrame({
+        'series': np.asarray(labels)[s_row],
+        'gap_start': years[s_col],
+        'gap_end': years[e_col - 1],
+        'years': e_col - s_col,
+    })
+
+
+def pairwise_corr(x, present, min_periods=MIN_PERIODS):
+    """
+    Pairwise-complete Pearson correlation of the columns of x [periods, series].
+
+    All pairs at once from masked matrix products: for columns i, j, the sums run over
+    the periods where both are present.
+    """
+    m = present.astype(np.float64)
+    xm = np.where(present, x, 0.0)
+    n = m.T @ m
+    sx = xm.T @ m                  # sum of x_i over periods where j is also present
+    sxx = (xm * xm).T @ m
+    sxy = xm.T @ xm
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        var_j = var_i.T
+        corr = cov / np.sqrt(var_i * var_j)
+    corr[n < min_periods] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def compute_profile(panel, min_periods=MIN_PERIODS):
+    """Profile dict (coverage, series, gaps, years_without_data, correlations) of a panel."""
+    rows = panel['rows']
+    labels = series_labels(rows)
+    values, mask, years = annual_blocks(panel)
+
+    counts = mask.sum(axis=2)
+    coverage = pd.DataFrame(counts, index=labels, columns=years)
+    observed = counts > 0
+
+    month_mask = np.asarray(panel['mask'])
+    any_obs = month_mask.any(axis=1)
+    first = np.where(any_obs, month_mask.argmax(axis=1), 0)
+    last = np.where(any_obs, month_mask.shape[1] - 1 - month_mask[:, ::-1].argmax(axis=1), 0)
+    months = panel['months']
+    series = rows.assign(
+        series=labels.to_numpy(),
+        n_observations=month_mask.sum(axis=1),
+        first_observation=pd.DatetimeIndex(months[first]).where(any_obs),
+        last_observation=pd.DatetimeIndex(months[last]).where(any_obs),
+        years_covered=observed.sum(axis=1),
+    )
+
+    # correlations between the national series, on annual means
+    with np.errstate(invalid='ignore'):
+        annual = np.nansum(values, axis=2) / counts
+    national = ((rows['gender'] == DEFAULT_GENDER) & (rows['location'] == DEFAULT_LOCATION)).to_numpy()
+    codes = rows['indicator_code'].to_numpy()[national]
+    corr = pairwise_corr(annual[national].T, observed[national].T, min_periods)
+
+    return {
+        'version': panel.get('version'),
+        'coverage': coverage,
+        'series': series,
+        'gaps': gap_runs(observed, years, labels),
+        'years_without_data': years[~observed.any(axis=0)].tolist(),
+        'correlations': pd.DataFrame(corr, index=codes, columns=codes),
+    }
+
+
+def load_profile(panel=None, panel_dir=PANEL_DIR):
+    """Profile of a panel (default: the current one of panel_dir, built if needed), cached in its version directory."""
+    panel = panel if panel is not None else ensure_panel(panel_dir=panel_dir)
+    cache = os.path.join(panel['dir'], panel['version'], PROFILE_FILE)
+    if os.path.exists(cache):
+        return pd.read_pickle(cache)
+    profile = compute_profile(panel)
+    tmp = f'{cache}.{os.getpid()}.tmp'
+    pd.to_pickle(profile, tmp)
+    os.replace(tmp, cache)
+    return profile
+
+
+def top_correlations(profile, code, n=10):
+    corr = profile['correlations']
+    if code not in corr.columns:
+        return pd.Series(dtype='float64')
+    return corr[code].drop(code).dropna().sort_values(ascending=False).head(n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coverage / gap / correlation profile of the indicator panel.")
+    parser.add_argument('--panel-dir', default=PANEL_DIR)
+    parser.add_argument('--indicator', default='ACC_OWNERSHIP', help="Print its top correlations.")
+    args = parser.parse_args()
+
+    profile = load_profile(panel_dir=args.panel_dir)
+    print(f"Panel version {profile['version']}")
+    print("\nSeries coverage:")
+    print(profile['series'][['series', 'n_observations', 'years_covered', 'first_observation',
+                             'last_observation']].to_string(index=False))
+    print(f"\nYears without any observation: {profile['years_without_data']}")
+    print("\nGaps inside series:")
+    print(profile['gaps'].to_string(index=False) if not profile['gaps'].empty else "None")
+    print(f"\nTop correlations with {args.indicator}:")
+    print(top_correlations(profile, args.indicator).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Cascading impact propagation through the event / indicator dependency graph.
+
+impact_link rows whose parent_id is an event are direct effects (event -> indicator);
+rows whose parent_id is an observed indicator code are indicator -> indicator edges,
+e.g. ACC_MOBILE_PEN -> ACC_OWNERSHIP -> USG_DIGITAL_PAYMENT. An indicator edge with net
+impact w and lag L passes w times the source's change on to the target, starting L
+months later and following the link's response shape (src/response_shapes.py), as
+direct effects do.
+
+The indicator graph must be acyclic (checked with Kahn's algorithm). Effects are then
+propagated one topological level at a time: all edges leaving a level are applied in one
+batched FFT convolution of the source effect series with the edge kernels. The
+convolution runs from the month before the earliest event effect, so the result for a
+month does not depend on where the requested window starts.
+
+    python -m src.propagation --indicator ACC_OWNERSHIP
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.impacts import event_table, link_parameters, match_parents, resolve_links
+from src.kernels import EPOCH, accumulate, link_starts, days_since_epoch
+from src.response_shapes import increments, link_shapes
+from src.schema import REFERENCE_PATH, UNIFIED_PATH, canonical_code, code_mask, load_unified
+
+
+def split_links(df):
+    """
+    (event links, indicator links) from the impact_link rows of the unified table.
+
+    Event links are resolved as in impacts.resolve_links. Indicator links are the
+    remaining rows whose parent_id is an observed indicator code, as a DataFrame with
+    source, target, lag_months, weight (net impact per unit change of the source),
+    response_shape and response_months.
+    """
+    is_link = code_mask(df['record_type'], 'impact_link')
+    links = df[is_link].reset_index(drop=True)
+    events = event_table(df)
+    event_links, _, _ = resolve_links(links, events)
+
+    is_obs = code_mask(df['record_type'], 'observation')
+    indicators = set(df.loc[is_obs, 'indicator_code'].dropna().astype(str))
+    parents = links['parent_id'].astype(object).map(
+        lambda p: canonical_code(str(p).strip()) if pd.notna(p) else p)
+    no_event = match_parents(links['parent_id'].to_numpy(), events) < 0
+    from_indicator = no_event & parents.isin(indicators).to_numpy()
+
+    params = link_parameters(links)[from_indicator]
+    shapes, months = link_shapes(links)
+    indicator_links = pd.DataFrame({
+        'source': parents[from_indicator].to_numpy(),
+        'target': params['target_indicator'].astype(str).map(canonical_code).to_numpy(),
+        'lag_months': params['lag_months'].to_numpy(),
+        'weight': params['net_impact'].to_numpy(),
+        'response_shape': shapes[from_indicator],
+        'response_months': months[from_indicator],
+    })
+    return event_links, indicator_links
+
+
+def topological_levels(nodes, edges):
+    """
+    Kahn's algorithm over node indices; returns a list of levels (arrays of node indices).
+
+    Raises ValueError naming the nodes on a cycle if the graph is not acyclic.
+    """
+    n = len(nodes)
+    src = edges['source'].to_numpy(dtype=np.int64)
+    dst = edges['target'].to_numpy(dtype=np.int64)
+    indegree = np.bincount(dst, minlength=n)
+    levels, done = [], np.zeros(n, dtype=bool)
+    frontier = np.flatnonzero(indegree == 0)
+    while len(frontier):
+        levels.append(frontier)
+        done[frontier] = True
+        out = np.isin(src, frontier)
+        np.subtract.at(indegree, dst[out], 1)
+        frontier = np.flatnonzero((indegree == 0) & ~done)
+    if not done.all():
+        stuck = [nodes[i] for i in np.flatnonzero(~done)]
+        raise ValueError(f"Indicator impact links form a cycle through: {', '.join(stuck)}")
+    return levels
+
+
+def direct_effects(event_links, timeline, nodes):
+    """[nodes, months] additive effect of the event links (response shape from event date + lag)."""
+    effects = np.zeros((len(nodes), len(timeline)))
+    if event_links.empty:
+        return effects
+    node_idx = pd.Index(nodes).get_indexer(event_links['target_indicator'].astype(str).map(canonical_code))
+    keep = node_idx >= 0
+    links = event_links[keep]
+    return accumulate(links['net_impact'].to_numpy(), link_starts(links), links['response_months'].to_numpy(),
+                      links['response_shape'].to_numpy(), days_since_epoch(timeline), node_idx[keep], len(nodes))
+
+
+def effect_timeline(event_links, start_date, end_date):
+    """
+    Month ends from before the earliest event effect (or start_date, if earlier) to end_date.
+
+    Every effect series is zero at its first month, so cascades need no assumption about
+    what happened before the timeline.
+    """
+    start = pd.Timestamp(start_date)
+    if not event_links.empty:
+        starts = link_starts(event_links)
+        starts = starts[~np.isnan(starts)]
+        if len(starts):
+            # the month end before the first effect starts
+            first = EPOCH + np.timedelta64(int(np.floor(starts.min())), 'D')
+            start = min(start, pd.Timestamp(first) - pd.offsets.MonthEnd(1))
+    return pd.date_range(start=start, end=end_date, freq='ME')
+
+
+def propagate(df, start_date, end_date):
+    """
+    Monthly (total, direct) effect per indicator as two DataFrames [month end x indicator].
+
+    total = direct + everything cascaded through indicator -> indicator links.
+    """
+    window = pd.date_range(start=start_date, end=end_date, freq='ME')
+    event_links, indicator_links = split_links(df)
+    nodes = sorted(set(event_links['target_indicator'].astype(str).map(canonical_code)) |
+                   set(indicator_links['source']) | set(indicator_links['target']))
+    timeline = effect_timeline(event_links, start_date, end_date)
+    direct = direct_effects(event_links, timeline, nodes)
+    total = direct.copy()
+
+    if not indicator_links.empty:
+        index = pd.Index(nodes)
+        edges = pd.DataFrame({'source': index.get_indexer(indicator_links['source']),
+                              'target': index.get_indexer(indicator_links['target'])})
+        levels = topological_levels(nodes, edges)
+        T = len(timeline)
+        n_fft = 1 << int(np.ceil(np.log2(max(2 * T, 2))))
+        # kernel = month-on-month change of the edge's response, so a step in the source
+        # reproduces the response shape in the target
+        kernels = indicator_links['weight'].to_numpy()[:, None] * increments(indicator_links, T)
+        kernel_fft = np.fft.rfft(kernels, n_fft, axis=1)
+        src, dst = edges['source'].to_numpy(), edges['target'].to_numpy()
+        # a level's totals are final once every earlier level has been pushed through
+        for level in levels:
+            out = np.isin(src, level)
+            if not out.any():
+                continue
+            contrib = np.fft.irfft(np.fft.rfft(total[src[out]], n_fft, axis=1) * kernel_fft[out],
+                                   n_fft, axis=1)[:, :T]
+            np.add.at(total, dst[out], contrib)
+
+    # the padded months before the window are dropped
+    keep = slice(len(timeline) - len(window), None)
+    return (pd.DataFrame(total[:, keep].T, index=window, columns=nodes),
+            pd.DataFrame(direct[:, keep].T, index=window, columns=nodes))
+
+
+def cascade_matrix(direct_matrix, indicator_links):
+    """
+    Long-run event x indicator totals: direct matrix D times (I - W)^-1, where W holds the
+    indicator -> indicator weights. W is nilpotent on a DAG, so this is D (I + W + W^2 + ...).
+    """
+    if indicator_links.empty:
+        return direct_matrix
+    nodes = sorted(set(direct_matrix.columns.astype(str)) | set(indicator_links['source']) |
+                   set(indicator_links['target']))
+    index = pd.Index(nodes)
+    src, dst = index.get_indexer(indicator_links['source']), index.get_indexer(indicator_links['target'])
+    topological_levels(nodes, pd.DataFrame({'source': src, 'target': dst}))
+    W = np.zeros((len(nodes), len(nodes)))
+    np.add.at(W, (src, dst), indicator_links['weight'].to_numpy())
+    D = direct_matrix.reindex(columns=nodes, fill_value=0.0).to_numpy()
+    total = np.linalg.solve((np.eye(len(nodes)) - W).T, D.T).T
+    return pd.DataFrame(total, index=direct_matrix.index, columns=nodes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propagate event impacts through indicator links.")
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--start', default='2020-01-01')
+    parser.add_argument('--end', default='2027-12-31')
+    parser.add_argument('--indicator', default=None, help="Print this indicator's monthly effects.")
+    args = parser.parse_args()
+
+    df = load_unified(args.data, args.ref)
+    event_links, indicator_links = split_links(df)
+    print(f"{len(event_links)} event links, {len(indicator_links)} indicator links")
+    if not indicator_links.empty:
+        print(indicator_links.to_string(index=False))
+
+    total, direct = propagate(df, args.start, args.end)
+    summary = pd.DataFrame({'direct': direct.iloc[-1], 'cascaded': total.iloc[-1] - direct.iloc[-1],
+                            'total': total.iloc[-1]})
+    print(f"\nEffects at {total.index[-1].date()}:")
+    print(summary.round(4).to_string())
+    if args.indicator:
+        code = canonical_code(args.indicator)
+        if code in total.columns:
+            print(pd.DataFrame({'direct': direct[code], 'total': total[code]}).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Report figures rendered headless (Agg) in a process pool, skipping unchanged ones.
+
+Each figure is a task: a kind (which renderer draws it), an output path and the arrays
+it is drawn from. A task's input hash covers the kind, the renderer version and every
+input value; reports/figures/manifest.json remembers the hash each file was last
+rendered from, so re-running a script only redraws figures whose inputs changed.
+
+    reports/figures/impacts/<CODE>.png       modeled impact on one indicator (direct / total)
+    reports/figures/impacts_grid_<n>.png     small multiples of every indicator's impact
+    reports/figures/forecasts/<CODE>.png     one indicator's scenarios with its history
+
+run_forecast and generate_impact_matrix build their tasks with forecast_tasks /
+impact_tasks and call render(); on its own the module redraws both sets of figures from
+the data and the monthly forecasts run_forecast last published:
+
+    python -m src.render --workers 4
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.instrument import finish, log, setup
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIGURES_DIR = os.path.join(BASE_DIR, 'reports', 'figures')
+MANIFEST = 'manifest.json'
+# Bump when a renderer's drawing code changes, so every figure is redrawn once.
+RENDER_VERSION = 1
+# Panels per small-multiples page.
+GRID_PANELS = 36
+SCENARIO_COLORS = {'Base': 'blue', 'Optimistic': 'green', 'Pessimistic': 'red'}
+
+
+def task(kind, path, title, **data):
+    """Figure task; data values are scalars, lists or arrays (dates as datetime64)."""
+    return {'kind': kind, 'path': path, 'title': title, 'data': data}
+
+
+def _feed(h, value):
+    if isinstance(value, dict):
+        for key in sorted(value):
+            h.update(str(key).encode())
+            _feed(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f'[{len(value)}'.encode())
+        for item in value:
+            _feed(h, item)
+    else:
+        arr = np.asarray(value)
+        if arr.dtype == object:
+            h.update(json.dumps(arr.tolist(), default=str).encode())
+        else:
+            h.update(f'{arr.dtype}{arr.shape}'.encode())
+            h.update(np.ascontiguousarray(arr).tobytes())
+
+
+def input_hash(t):
+    h = hashlib.sha1(f"{t['kind']}|{RENDER_VERSION}|{t['title']}".encode())
+    _feed(h, t['data'])
+    return h.hexdigest()
+
+
+# -----------------------------------------------------------------------------------
+# Renderers (run inside the workers): draw one panel onto an Axes
+# -----------------------------------------------------------------------------------
+def _draw_impact(ax, data):
+    ax.plot(data['dates'], data['total'], color='blue', linewidth=2, label='Total')
+    if not np.allclose(data['total'], data['direct']):
+        ax.plot(data['dates'], data['direct'], color='grey', linestyle='--', label='Direct')
+    ax.axhline(0, color='black', linewidth=0.5)
+
+
+def _draw_forecast(ax, data):
+    for scenario, values in zip(data['scenarios'], data['values']):
+        ax.plot(data['dates'], values, label=scenario, color=SCENARIO_COLORS.get(scenario, 'black'),
+                linestyle='-' if scenario == 'Base' else '--')
+    if len(data['history_dates']):
+        ax.scatter(data['history_dates'], data['history_values'], color='black', label='Historical', zorder=5)
+    ax.set_ylim(0, 100)
+
+
+PANELS = {'impact': _draw_impact, 'forecast': _draw_forecast}
+
+
+def _draw(t):
+    import matplotlib.pyplot as plt
+
+    if t['kind'] == 'grid':
+        panels = t['data']['panels']
+        ncols = min(len(panels), t['data'].get('ncols') or math.ceil(math.sqrt(len(panels))))
+        nrows = math.ceil(len(panels) / ncols)
+        fig, axes = plt.subplots(nrows, ncols, figsize=(4.5 * ncols, 3.2 * nrows), squeeze=False)
+        for ax, panel in zip(axes.flat, panels):
+            PANELS[panel['kind']](ax, panel['data'])
+            ax.set_title(panel['title'], fontsize=9)
+            ax.tick_params(labelsize=7)
+        for ax in axes.flat[len(panels):]:
+            ax.set_visible(False)
+        axes.flat[0].legend(fontsize=7)
+        fig.suptitle(t['title'])
+    else:
+        fig, ax = plt.subplots(figsize=(10, 6))
+        PANELS[t['kind']](ax, t['data'])
+        ax.set_title(t['title'])
+        ax.grid(True)
+        ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render_one(t):
+    import matplotlib.pyplot as plt
+
+    fig = _draw(t)
+    os.makedirs(os.path.dirname(t['path']), exist_ok=True)
+    tmp = f"{t['path']}.{os.getpid()}.tmp.png"
+    fig.savefig(tmp)
+    plt.close(fig)
+    os.replace(tmp, t['path'])
+    return t['path']
+
+
+# -----------------------------------------------------------------------------------
+# Driver
+# -----------------------------------------------------------------------------------
+def _manifest_path(figures_dir):
+    return os.path.join(figures_dir, MANIFEST)
+
+
+def load_manifest(figures_dir=FIGURES_DIR):
+    try:
+        with open(_manifest_path(figures_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def render(tasks, figures_dir=FIGURES_DIR, workers=None, force=False):
+    """Render tasks whose inputs changed; returns (rendered paths, number skipped)."""
+    manifest = load_manifest(figures_dir)
+    # keyed by path relative to figures_dir, so the reports/ tree can be moved as a whole
+    hashes = {t['path']: input_hash(t) for t in tasks}
+    todo = [t for t in tasks
+            if force or not os.path.exists(t['path'])
+            or manifest.get(os.path.relpath(t['path'], figures_dir)) != hashes[t['path']]]
+
+    if len(todo) <= 1 or workers == 1:
+        # not worth starting a pool for a single figure
+        _init_worker()
+        rendered = [_render_one(t) for t in todo]
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            rendered = list(pool.map(_render_one, todo))
+
+    if rendered:
+        manifest.update({os.path.relpath(path, figures_dir): hashes[path] for path in rendered})
+        os.makedirs(figures_dir, exist_ok=True)
+        tmp = f'{_manifest_path(figures_dir)}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, _manifest_path(figures_dir))
+    return rendered, len(tasks) - len(todo)
+
+
+def _grid_tasks(kind, panels, figures_dir, title):
+    """Small-multiples pages of at most GRID_PANELS panels each."""
+    pages = [panels[i:i + GRID_PANELS] for i in range(0, len(panels), GRID_PANELS)]
+    return [task('grid', os.path.join(figures_dir, f'{kind}_grid_{n:02d}.png'),
+                 f'{title} ({n}/{len(pages)})' if len(pages) > 1 else title, panels=page)
+            for n, page in enumerate(pages, start=1)]
+
+
+def impact_tasks(total, direct, figures_dir=FIGURES_DIR):
+    """Per-indicator and small-multiples tasks from [month x indicator] total / direct effects."""
+    dates = total.index.to_numpy()
+    panels = []
+    for code in total.columns:
+        data = {'dates': dates, 'total': total[code].to_numpy(), 'direct': direct[code].to_numpy()}
+        panels.append({'kind': 'impact', 'title': code, 'data': data})
+    tasks = [task('impact', os.path.join(figures_dir, 'impacts', f"{p['title']}.png"),
+                  f"Modeled Cumulative Impact on {p['title']}", **p['data']) for p in panels]
+    return tasks + _grid_tasks('impacts', panels, figures_dir, "Modeled Cumulative Impact")
+
+
+def forecast_tasks(forecasts, histories, figures_dir=FIGURES_DIR):
+    """
+    Per-indicator and small-multiples tasks from the forecast rows (Date, Value, Scenario,
+    Indicator) and each indicator's observed history (observation_date, value_numeric).
+    """
+    panels = []
+    for code, rows in forecasts.groupby('Indicator', sort=False):
+        wide = rows.pivot_table(index='Date', columns='Scenario', values='Value', aggfunc='last', sort=False)
+        hist = histories.get(code)
+        data = {
+            'dates': wide.index.to_numpy(),
+            'scenarios': list(wide.columns),
+            'values': [wide[s].to_numpy() for s in wide.columns],
+            'history_dates': np.array([], dtype='datetime64[ns]') if hist is None else hist['observation_date'].to_numpy(),
+            'history_values': np.array([]) if hist is None else hist['value_numeric'].to_numpy(dtype=float),
+        }
+        panels.append({'kind': 'forecast', 'title': f"Forecast: {code}", 'data': data})
+    tasks = [task('forecast', os.path.join(figures_dir, 'forecasts', f"{code}.png"), p['title'], **p['data'])
+             for code, p in zip(forecasts['Indicator'].unique(), panels)]
+    return tasks + _grid_tasks('forecasts', panels, figures_dir, "Forecasts 2025-2027")
+
+
+def main():
+    import pandas as pd
+
+    from src.generate_impact_matrix import plot_impacts
+    from src.panel import ensure_panel
+    from src.run_forecast import MONTHLY_PATH, panel_history, plot_forecasts
+    from src.schema import REFERENCE_PATH, UNIFIED_PATH, load_unified
+
+    parser = argparse.ArgumentParser(description="Render the impact and forecast figures.")
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--forecasts', default=MONTHLY_PATH, help="Monthly forecast rows written by run_forecast.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="Redraw even unchanged figures.")
+    args = parser.parse_args()
+
+    setup()
+    df = load_unified(args.data, args.ref)
+    plot_impacts(df, BASE_DIR, workers=args.workers, force=args.force)
+    if os.path.exists(args.forecasts):
+        forecasts = pd.read_csv(args.forecasts, parse_dates=['Date'])
+        panel = ensure_panel(args.data, args.ref, df=df)
+        histories = {code: panel_history(panel, code) for code in forecasts['Indicator'].unique()}
+        plot_forecasts(forecasts, histories, BASE_DIR, workers=args.workers, force=args.force)
+    else:
+        log.warning("No forecasts at %s; run `python -m src forecast` first.", args.forecasts)
+    finish()
+
+
+if __name__ == "__main__":
+    main()
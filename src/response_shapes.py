@@ -0,0 +1,137 @@
+"""
+Response shapes: how an impact link's effect builds up (or fades) after event date + lag.
+
+Each shape maps months since the effect started, t, and the link's time scale, d
+(response_months), to the fraction of the link's net impact in effect. Shapes are
+NumPy kernels over a whole [links, timesteps] block; `response` evaluates a mixed set of
+links with one call per distinct shape, never per link.
+
+    linear       linear ramp to 1 over d months (the original, and default, behaviour)
+    logistic     S-curve centred on d / 2, ~2% at t = 0 and ~98% at t = d
+    exponential  exponential approach to 1, 95% reached after d months
+    pulse        jumps to 1, then decays with a half-life of d months
+    step         full effect from t = 0
+
+The unified data selects them per impact_link with the optional columns response_shape
+and response_months; blanks fall back to DEFAULT_SHAPE and DEFAULT_MONTHS, and so do
+shape names that are not registered (with a logged warning).
+Register further shapes with @register('name').
+"""
+import numpy as np
+import pandas as pd
+
+from src.instrument import log
+
+DEFAULT_SHAPE = 'linear'
+DEFAULT_MONTHS = 6
+# Months per day count used throughout the impact model (lags are lag_months * 30 days).
+DAYS_PER_MONTH = 30
+
+SHAPES = {}
+
+
+def register(name):
+    """Decorator adding a kernel f(t, d) -> fraction to the registry."""
+    def wrap(kernel):
+        SHAPES[name] = kernel
+        return kernel
+    return wrap
+
+
+@register('linear')
+def linear(t, d):
+    return np.clip(t / d, 0.0, 1.0)
+
+
+@register('logistic')
+def logistic(t, d):
+    return np.where(t >= 0, 1.0 / (1.0 + np.exp(-8.0 * (t - d / 2) / d)), 0.0)
+
+
+@register('exponential')
+def exponential(t, d):
+    return np.where(t >= 0, -np.expm1(-3.0 * np.maximum(t, 0.0) / d), 0.0)
+
+
+@register('pulse')
+def pulse(t, d):
+    return np.where(t >= 0, np.exp2(-np.maximum(t, 0.0) / d), 0.0)
+
+
+@register('step')
+def step(t, d):
+    return (t >= 0).astype(np.float64)
+
+
+def shape_names(values):
+    """Normalised (lower-case, stripped) shape names; blanks become DEFAULT_SHAPE."""
+    shapes = np.asarray(values, dtype=object)
+    blank = pd.isna(shapes) | (shapes == '')
+    shapes = np.where(blank, DEFAULT_SHAPE, shapes).astype(str)
+    return np.char.lower(np.char.strip(shapes))
+
+
+def known_shapes(shapes):
+    """shapes with names missing from SHAPES replaced by DEFAULT_SHAPE, logging a warning."""
+    shapes = np.asarray(shapes)
+    unknown = sorted(set(np.unique(shapes).tolist()) - set(SHAPES))
+    if not unknown:
+        return shapes
+    log.warning("Unknown response shape(s) %s, using '%s' (expected one of %s)",
+                unknown, DEFAULT_SHAPE, sorted(SHAPES))
+    return np.where(np.isin(shapes, unknown), DEFAULT_SHAPE, shapes)
+
+
+def link_shapes(links):
+    """(shape names, time scales) of link rows, with defaults filled in."""
+    n = len(links)
+    if 'response_shape' in links.columns:
+        shapes = known_shapes(shape_names(links['response_shape']))
+    else:
+        shapes = np.full(n, DEFAULT_SHAPE)
+    months = pd.to_numeric(links['response_months'], errors='coerce').to_numpy(dtype=float) \
+        if 'response_months' in links.columns else np.full(n, np.nan)
+    months = np.where(np.isnan(months) | (months <= 0), DEFAULT_MONTHS, months)
+    return shapes, months
+
+
+def evaluate(shapes, months, t):
+    """
+    Fractions [links, timesteps] for months since start t ([links, timesteps] or broadcastable),
+    grouping links by shape so each kernel runs once on its whole block. Unknown shapes
+    fall back to DEFAULT_SHAPE.
+    """
+    shapes = known_shapes(shapes)
+    months = np.asarray(months, dtype=float)
+    t = np.broadcast_to(np.asarray(t, dtype=float), (len(shapes),) + np.shape(t)[1:])
+    out = np.empty(t.shape)
+    for name in np.unique(shapes):
+        rows = np.flatnonzero(shapes == name)
+        out[rows] = SHAPES[name](t[rows], months[rows, None])
+    return out
+
+
+def response(links, timeline):
+    """
+    [links, months] fraction of each link's effect at each timeline date.
+
+    links needs event_date and lag_months; response_shape / response_months are optional.
+    """
+    starts = pd.to_datetime(links['event_date']) + \
+        pd.to_timedelta(np.asarray(links['lag_months'], dtype=float) * DAYS_PER_MONTH, unit='D')
+    days = (pd.DatetimeIndex(timeline).to_numpy()[None, :] - starts.to_numpy()[:, None]) / np.timedelta64(1, 'D')
+    shapes, months = link_shapes(links)
+    return evaluate(shapes, months, days / DAYS_PER_MONTH)
+
+
+def increments(links, length):
+    """
+    [links, length] month-on-month change of each link's response on an integer month grid:
+    the kernel that turns a change in a source into the change it causes in the target.
+    """
+    lags = np.round(np.asarray(links['lag_months'], dtype=float))[:, None]
+    shapes, months = link_shapes(links)
+    # cumulative kernel = response one month after each grid point (a source step in month j
+    # is fully in the data by month j + 1); differencing from 0 keeps jumps at t = 0
+    cumulative = evaluate(shapes, months, np.arange(1, length + 1)[None, :] - lags)
+    return np.diff(cumulative, axis=1, prepend=0.0)
@@ -1,22 +1,36 @@
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 
-# Set style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 6)
+from src.forecast_store import write_run
+from src.impacts import event_table, get_magnitude_numeric, link_parameters, match_parents
+from src.instrument import log, setup, span, finish
+from src.kernels import accumulate, link_starts, days_since_epoch, scenario as scenario_kernel
+from src.panel import ensure_panel, observations
+from src.propagation import propagate
+from src.render import forecast_tasks, render
+from src.response_shapes import link_shapes
+from src.schema import load_unified, canonical_code, code_mask
+from src.snapshots import publish
 
-def get_magnitude_numeric(magnitude_str):
-    mapping = {
-        'high': 0.2,
-        'medium': 0.1,
-        'low': 0.05,
-        'negligible': 0.01
-    }
-    return mapping.get(str(magnitude_str).lower(), 0.0)
+MONTHLY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'data', 'processed', 'forecasts_monthly.csv')
+
+# Targets play no part in the fit or the event effects.
+FORECAST_RECORD_TYPES = ('observation', 'event', 'impact_link')
+
+# scenario -> (baseline multiplier, event impact multiplier); anything else is Base
+SCENARIO_SCALES = {
+    'Optimistic': (1.05, 1.2),
+    'Pessimistic': (0.95, 0.8),
+}
+
+
+def panel_history(panel, code):
+    """National series of an indicator from the panel: one row per observed month, at its exact date and value."""
+    return observations(panel, code)
 
 def train_baseline_model(history_df):
     if len(history_df) < 2:
@@ -28,115 +42,132 @@ def train_baseline_model(history_df):
 
 def calculate_event_add_ons(unified_df, start_date, end_date, target_indicator):
     timeline = pd.date_range(start=start_date, end=end_date, freq='ME')
-    total_impact = np.zeros(len(timeline))
-    
-    impact_links = unified_df[unified_df['record_type'] == 'impact_link']
-    
-    for idx, row in impact_links.iterrows():
-        # Check target
-        target = row.get('indicator_code')
-        if pd.isna(target): target = row.get('indicator')
-        
-        # Handle alias
-        if target == 'USG_DIGITAL_PAY': target = 'USG_DIGITAL_PAYMENT'
-        if target_indicator == 'USG_DIGITAL_PAY': target_indicator = 'USG_DIGITAL_PAYMENT'
-        
-        if target != target_indicator: continue
-            
-        # Get magnitude
-        mag = row.get('impact_estimate')
-        if pd.isna(mag):
-            mag = get_magnitude_numeric(row.get('impact_magnitude'))
-        else:
-            mag = float(mag)
-            
-        direction = 1 if row.get('impact_direction', 'increase') == 'increase' else -1
-        final_impact = mag * direction
-        
-        # Get event date
-        parent = row['parent_id']
-        event_row = unified_df[(unified_df['record_type'] == 'event') & 
-                               ((unified_df['record_id'] == parent) | (unified_df['indicator_code'] == parent))]
-        
-        if event_row.empty: continue
-        
-        evt_date = pd.to_datetime(event_row.iloc[0]['observation_date'])
-        if pd.isna(evt_date): continue
+    target_indicator = canonical_code(target_indicator)
 
-        lag = float(row.get('lag_months', 0))
-        if pd.isna(lag): lag = 0
-        
-        impact_start = evt_date + timedelta(days=int(lag*30))
-        ramp_days = 180 # 6 month ramp
-        
-        for i, t in enumerate(timeline):
-            if t < impact_start:
-                continue
-            
-            days_since = (t - impact_start).days
-            factor = min(1.0, days_since / ramp_days)
-            # Simple additive accumulation
-            total_impact[i] += final_impact * factor
-            
+    is_link = code_mask(unified_df['record_type'], 'impact_link')
+    impact_links = unified_df[is_link].reset_index(drop=True)
+    events = event_table(unified_df)
+
+    # Target (indicator_code, else indicator) and lag, as for the impact matrix
+    params = link_parameters(impact_links)
+    targets = params['target_indicator'].map(canonical_code)
+
+    # Magnitude: impact_estimate, else the prior for the qualitative label.
+    # Anything but an explicit 'increase' counts against the indicator here.
+    mag = pd.to_numeric(impact_links['impact_estimate'], errors='coerce').fillna(
+        impact_links['impact_magnitude'].astype(object).map(get_magnitude_numeric))
+    direction = np.where(impact_links['impact_direction'].astype(object) == 'increase', 1.0, -1.0)
+    final_impact = mag.to_numpy(dtype=float) * direction
+
+    # Parent event and its date
+    pos = match_parents(impact_links['parent_id'].to_numpy(), events)
+    evt_dates = pd.to_datetime(events['observation_date'], errors='coerce').to_numpy()
+    evt_date = np.full(len(pos), np.datetime64('NaT'), dtype='datetime64[ns]')
+    evt_date[pos >= 0] = evt_dates[pos[pos >= 0]]
+
+    keep = (targets == target_indicator).to_numpy() & ~pd.isna(evt_date)
+    if not keep.any():
+        return pd.Series(np.zeros(len(timeline)), index=timeline)
+
+    # response factors of every link at every month, summed over links (compiled when available)
+    links = impact_links[keep].assign(event_date=evt_date[keep], lag_months=params['lag_months'][keep])
+    shapes, months = link_shapes(links)
+    total_impact = accumulate(final_impact[keep], link_starts(links), months, shapes, days_since_epoch(timeline))
     return pd.Series(total_impact, index=timeline)
 
+def apply_scenario(baseline, impacts, scenario='Base'):
+    """Scenario adjustment of baseline and event impacts (arrays), clipped to 0-100."""
+    baseline_scale, impact_scale = SCENARIO_SCALES.get(scenario, (1.0, 1.0))
+    return scenario_kernel(baseline, impacts, baseline_scale, impact_scale, 0, 100)
+
 def generate_forecast(slope, intercept, impact_series, scenario='Base'):
     forecast_dates = impact_series.index
     X_future = forecast_dates.map(datetime.toordinal).values
     
     baseline = slope * X_future + intercept
-    impacts = impact_series.values
-    
-    if scenario == 'Optimistic':
-        adjusted_baseline = baseline * 1.05
-        adjusted_impacts = impacts * 1.2
-    elif scenario == 'Pessimistic':
-        adjusted_baseline = baseline * 0.95 
-        adjusted_impacts = impacts * 0.8
-    else:
-        adjusted_baseline = baseline
-        adjusted_impacts = impacts
-        
-    final_forecast = np.clip(adjusted_baseline + adjusted_impacts, 0, 100)
+    final_forecast = apply_scenario(baseline, impact_series.values, scenario)
     
     return pd.DataFrame({'Date': forecast_dates, 'Value': final_forecast, 'Scenario': scenario})
 
+def plot_forecasts(final_df, histories, base_dir, workers=None, force=False):
+    """
+    Per-indicator scenario figures plus small multiples, rendered in a process pool; the
+    small multiples are also saved as reports/forecast_plot_2025_2027.png.
+    """
+    figures_dir = os.path.join(base_dir, 'reports', 'figures')
+    tasks = forecast_tasks(final_df, histories, figures_dir)
+    grid = [t for t in tasks if t['kind'] == 'grid']
+    tasks.append({**grid[0], 'path': os.path.join(base_dir, 'reports', 'forecast_plot_2025_2027.png')})
+
+    rendered, skipped = render(tasks, figures_dir, workers, force)
+    log.info("Rendered %d forecast figures to %s (%d unchanged)", len(rendered), figures_dir, skipped)
+
 def main():
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_dir, 'data', 'raw', 'ethiopia_fi_unified_data.csv')
+    parser = argparse.ArgumentParser(description="Baseline + event impact forecasts for 2025-2027.")
+    parser.add_argument('--data', default=os.path.join(base_dir, 'data', 'raw', 'ethiopia_fi_unified_data.csv'))
+    parser.add_argument('--no-plot', action='store_true', help="Skip rendering the forecast figures.")
+    parser.add_argument('--workers', type=int, default=None, help="Figure rendering processes (default: one per CPU).")
+    parser.add_argument('--ensemble', action='store_true',
+                        help="Backtest-weighted ensemble baselines with 90%% intervals (src/ensemble.py).")
+    args = parser.parse_args()
+    if args.ensemble:
+        from src.ensemble import PROXY_INDICATOR, ensemble_forecast
+
+    setup()
+    data_path = args.data
     
-    print(f"Loading {data_path}...")
-    unified_df = pd.read_csv(data_path)
-    unified_df['observation_date'] = pd.to_datetime(unified_df['observation_date'], errors='coerce')
+    log.info("Loading %s...", data_path)
+    unified_df = load_unified(data_path, record_types=FORECAST_RECORD_TYPES)
     
-    obs_df = unified_df[unified_df['record_type'] == 'observation'].copy()
+    # Monthly national series shared with the dashboard / profiling (built once per data version)
+    with span('panel'):
+        panel = ensure_panel(data_path, df=unified_df)
     
     indicators = ['ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT']
     scenarios = ['Base', 'Optimistic', 'Pessimistic']
     
     all_results = []
+    histories = {}
+    sigmas = {}
+
+    # Effects reaching an indicator through other indicators (e.g. mobile penetration ->
+    # account ownership -> digital payments); direct event effects are added per indicator below
+    with span('kernel', stage='propagate'):
+        total_effects, direct_effects = propagate(unified_df, '2020-01-01', '2027-12-31')
+    cascaded = total_effects - direct_effects
     
     for ind in indicators:
-        print(f"Processing {ind}...")
-        # Get history
-        # Handle alias in observation data
-        lookup_ind = ind
-        if ind == 'USG_DIGITAL_PAYMENT':
-            # Check if it exists as USG_DIGITAL_PAYMENT or USG_DIGITAL_PAY
-            if 'USG_DIGITAL_PAYMENT' not in obs_df['indicator_code'].unique():
-                lookup_ind = 'USG_DIGITAL_PAY'
+        log.info("Processing %s...", ind)
+        # Get history (aliases such as USG_DIGITAL_PAY are resolved at load time)
+        history = panel_history(panel, ind)
+        histories[ind] = history
         
-        history = obs_df[obs_df['indicator_code'] == lookup_ind].sort_values('observation_date')
-        history = history.drop_duplicates(subset=['observation_date'], keep='last')
+        if args.ensemble:
+            with span('kernel', stage='add_ons', indicator=ind):
+                impacts = calculate_event_add_ons(unified_df, '2020-01-01', '2027-12-31', ind)
+            if ind in cascaded.columns:
+                impacts = impacts + cascaded[ind].reindex(impacts.index, fill_value=0.0)
+            with span('fit', indicator=ind, model='ensemble'):
+                res, members, sigmas[ind] = ensemble_forecast(unified_df, panel, ind, impacts.index, impacts, scenarios,
+                                                              fallback_sigma=sigmas.get(PROXY_INDICATOR))
+            if res is None:
+                log.info("  No history for %s. Skipping.", ind)
+                continue
+            log.info("  Ensemble weights (backtest RMSE):\n%s", members.to_string(index=False))
+            res['Indicator'] = ind
+            all_results.append(res)
+            continue
         
         if len(history) < 2:
-            print(f"  Not enough history for {ind} (Found {len(history)} records).")
-            if ind in ['USG_DIGITAL_PAYMENT', 'USG_DIGITAL_PAY']:
-                print("  Using ACC_OWNERSHIP slope as proxy baseline.")
+            log.info("  Not enough history for %s (Found %d records).", ind, len(history))
+            if ind == 'USG_DIGITAL_PAYMENT':
+                log.info("  Using ACC_OWNERSHIP slope as proxy baseline.")
                 # Find ACC history to derive slope
-                acc_hist = obs_df[obs_df['indicator_code'] == 'ACC_OWNERSHIP'].sort_values('observation_date')
+                acc_hist = panel_history(panel, 'ACC_OWNERSHIP')
                 if len(acc_hist) >= 2:
-                    slope, _ = train_baseline_model(acc_hist)
+                    with span('fit', indicator=ind):
+                        slope, _ = train_baseline_model(acc_hist)
                     # Calculate synthetic intercept to match the ONE usage point we might have
                     # or if we have 0 points, we can't do anything. We likely have 1 point (2024).
                     if len(history) == 1:
@@ -145,30 +176,37 @@ def main():
                         x_val = datetime.toordinal(latest_pt['observation_date'])
                         y_val = latest_pt['value_numeric']
                         intercept = y_val - slope * x_val
-                        print(f"  Proxy Baseline: Slope={slope:.6f}, Intercept={intercept:.2f} (Anchored to {y_val} at {latest_pt['observation_date'].date()})")
+                        log.info("  Proxy Baseline: Slope=%.6f, Intercept=%.2f (Anchored to %s at %s)",
+                                 slope, intercept, y_val, latest_pt['observation_date'].date())
                     else:
-                        print("  No history at all for USG. Skipping.")
+                        log.info("  No history at all for USG. Skipping.")
                         continue
                 else:
-                    print("  ACC_OWNERSHIP also lacks history. Skipping.")
+                    log.info("  ACC_OWNERSHIP also lacks history. Skipping.")
                     continue
             else:
-                print("  Skipping.")
+                log.info("  Skipping.")
                 continue
             
         else:
-            slope, intercept = train_baseline_model(history)
-            print(f"  Baseline: Slope={slope:.6f}, Intercept={intercept:.2f}")
+            with span('fit', indicator=ind):
+                slope, intercept = train_baseline_model(history)
+            log.info("  Baseline: Slope=%.6f, Intercept=%.2f", slope, intercept)
         
-        impacts = calculate_event_add_ons(unified_df, '2020-01-01', '2027-12-31', ind)
+        with span('kernel', stage='add_ons', indicator=ind):
+            impacts = calculate_event_add_ons(unified_df, '2020-01-01', '2027-12-31', ind)
+        if ind in cascaded.columns:
+            impacts = impacts + cascaded[ind].reindex(impacts.index, fill_value=0.0)
         
         for s in scenarios:
-            res = generate_forecast(slope, intercept, impacts, s)
+            with span('scenario', indicator=ind, scenario=s):
+                res = generate_forecast(slope, intercept, impacts, s)
             res['Indicator'] = ind
             all_results.append(res)
             
     if not all_results:
-        print("No forecasts generated.")
+        log.warning("No forecasts generated.")
+        finish()
         return
 
     final_df = pd.concat(all_results)
@@ -179,51 +217,31 @@ def main():
     # Format for export
     export_df = final_df[final_df['Date'].dt.year >= 2025].copy()
     export_df['Year'] = export_df['Date'].dt.year
-    summary = export_df.groupby(['Indicator', 'Scenario', 'Year'])['Value'].last().reset_index()
-    summary['Value'] = summary['Value'].round(2)
+    value_cols = [c for c in ['Value', 'Lower', 'Upper'] if c in export_df.columns]
+    summary = export_df.groupby(['Indicator', 'Scenario', 'Year'])[value_cols].last().reset_index()
+    summary[value_cols] = summary[value_cols].round(2)
     
-    summary.to_csv(out_path, index=False)
-    print(f"Saved forecasts to {out_path}")
-    print(summary)
+    with span('export'):
+        version = publish(summary, out_path, index=False)
+        # monthly rows, for re-rendering the figures without re-running the forecast
+        publish(final_df, MONTHLY_PATH, index=False)
+        # and kept as a run of the versioned store, for comparing against earlier runs
+        run = write_run(final_df, data_version=panel['version'])
+    log.info("Saved forecasts to %s (version %s, store run %s)", out_path, version, run)
+    log.info("Forecast summary:\n%s", summary.to_string(index=False))
     
+    if args.no_plot:
+        finish()
+        return
+
     # Plotting
     try:
-        import matplotlib.pyplot as plt
-        fig, axes = plt.subplots(1, 2, figsize=(18, 6))
-        
-        for i, ind in enumerate(indicators):
-            if i >= len(axes): break
-            
-            ax = axes[i]
-            subset = final_df[final_df['Indicator'] == ind]
-            
-            if subset.empty: continue
-            
-            # Plot forecast
-            for s in scenarios:
-                data = subset[subset['Scenario'] == s]
-                color = {'Base': 'blue', 'Optimistic': 'green', 'Pessimistic': 'red'}.get(s, 'black')
-                ax.plot(data['Date'], data['Value'], label=s, color=color, linestyle='--' if s != 'Base' else '-')
-                
-            # Plot history
-            lookup_ind = ind
-            if ind == 'USG_DIGITAL_PAYMENT' and 'USG_DIGITAL_PAYMENT' not in obs_df['indicator_code'].unique():
-                lookup_ind = 'USG_DIGITAL_PAY'
-            
-            hist_data = obs_df[obs_df['indicator_code'] == lookup_ind]
-            ax.scatter(hist_data['observation_date'], hist_data['value_numeric'], color='black', label='Historical', zorder=5)
-            
-            ax.set_title(f"Forecast: {ind}")
-            ax.set_ylim(0, 100)
-            ax.legend()
-            
-        plt.tight_layout()
-        plot_path = os.path.join(base_dir, 'reports', 'forecast_plot_2025_2027.png')
-        plt.savefig(plot_path)
-        print(f"Saved plot to {plot_path}")
-        
+        with span('plot'):
+            plot_forecasts(final_df, histories, base_dir, args.workers)
     except Exception as e:
-        print(f"Plotting failed: {e}")
+        log.error("Plotting failed: %s", e)
+
+    finish()
 
 if __name__ == "__main__":
     main()
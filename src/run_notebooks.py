@@ -0,0 +1,208 @@
+"""
+Headless, cached execution of the analysis notebooks, one kernel per notebook in parallel.
+
+Every code cell's outputs are cached under a key chained from the upstream hash (the
+unified data files and the source of the src modules the notebook imports) and the
+source of that cell and every code cell before it, since a cell sees the state the
+earlier cells left behind. A notebook whose keys all hit is refreshed from the cache
+without starting a kernel. Otherwise a kernel runs the cells before the first stale one
+to rebuild its state (their cached outputs are kept) and then executes the stale cells.
+
+    notebooks/.nbcache/<notebook>.json   cell key -> outputs, for the notebook's current cells
+
+Needs nbclient and ipykernel (installed with jupyter):
+
+    python -m src.run_notebooks                       # every notebook in notebooks/
+    python -m src.run_notebooks notebooks/03_impact_modeling.ipynb --force
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.pipeline import DATA, file_digest, files_under, module_sources
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOTEBOOK_DIR = os.path.join(BASE_DIR, 'notebooks')
+CACHE_DIR = os.path.join(NOTEBOOK_DIR, '.nbcache')
+CELL_TIMEOUT = 600
+
+
+def read_notebook(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_notebook(nb, path):
+    # same layout as the helper scripts write (4-space indent, unescaped unicode)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(nb, indent=4, ensure_ascii=False) + '\n')
+    os.replace(tmp, path)
+
+
+def _source(cell):
+    return cell['source'] if isinstance(cell['source'], str) else ''.join(cell['source'])
+
+
+def notebook_modules(nb):
+    """src modules imported by the notebook's code cells (magics translated to Python first)."""
+    import ast
+    from IPython.core.inputtransformer2 import TransformerManager
+
+    transformer = TransformerManager()
+    modules = set()
+    for cell in nb['cells']:
+        if cell['cell_type'] != 'code':
+            continue
+        try:
+            tree = ast.parse(transformer.transform_cell(_source(cell)))
+        except SyntaxError:
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.split('.')[0] == 'src':
+                modules.add(node.module)
+            elif isinstance(node, ast.Import):
+                modules.update(a.name for a in node.names if a.name.split('.')[0] == 'src')
+    return sorted(modules)
+
+
+def upstream_hash(nb, file_cache):
+    """Hash of the data files and the src sources a notebook depends on."""
+    h = hashlib.sha1()
+    paths = [os.path.join(BASE_DIR, p) for p in DATA]
+    paths += sorted({src for module in notebook_modules(nb) for src in module_sources(module)})
+    for path in paths:
+        for f in files_under(path):
+            h.update(os.path.relpath(f, BASE_DIR).encode())
+            h.update(file_digest(f, file_cache).encode())
+    return h.hexdigest()
+
+
+def cell_keys(nb, upstream, kernel=None):
+    """{cell index: key} for the code cells, each key chained from the previous one."""
+    kernel = kernel or nb.get('metadata', {}).get('kernelspec', {}).get('name', 'python3')
+    key = hashlib.sha1(f'{upstream}|{kernel}'.encode()).hexdigest()
+    keys = {}
+    for i, cell in enumerate(nb['cells']):
+        if cell['cell_type'] == 'code':
+            key = hashlib.sha1(f'{key}|{_source(cell)}'.encode()).hexdigest()
+            keys[i] = key
+    return keys
+
+
+def _cache_path(path):
+    return os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(path))[0] + '.json')
+
+
+def load_cache(path):
+    try:
+        with open(_cache_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'cells': {}, 'files': {}}
+
+
+def save_cache(path, cache):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f'{_cache_path(path)}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, _cache_path(path))
+
+
+def execute(path, force=False, kernel=None, timeout=CELL_TIMEOUT):
+    """
+    Bring one notebook's outputs up to date. Returns a summary dict: notebook, executed,
+    cached and replayed cell counts, seconds, and the error text if a cell failed.
+    """
+    start = time.perf_counter()
+    nb = read_notebook(path)
+    cache = load_cache(path)
+    keys = cell_keys(nb, upstream_hash(nb, cache['files']), kernel)
+    stale = [i for i, key in keys.items() if force or key not in cache['cells']]
+    summary = {'notebook': os.path.relpath(path, BASE_DIR), 'executed': 0, 'cached': len(keys) - len(stale),
+               'replayed': 0, 'seconds': 0.0, 'error': None}
+
+    outputs = {i: cache['cells'][key] for i, key in keys.items() if key in cache['cells']}
+    if stale:
+        import nbformat
+        from nbclient import NotebookClient
+        from nbclient.exceptions import CellExecutionError
+        from nbformat.v4.rwbase import split_lines
+
+        node = nbformat.reads(json.dumps(nb), as_version=4)
+        client = NotebookClient(node, timeout=timeout, kernel_name=kernel or '',
+                                resources={'metadata': {'path': os.path.dirname(os.path.abspath(path))}})
+        first = stale[0]
+        with client.setup_kernel():
+            for i, key in keys.items():
+                if i < first:
+                    summary['replayed'] += 1
+                try:
+                    client.execute_cell(node.cells[i], i)
+                except CellExecutionError as e:
+                    outputs[i] = {'outputs': node.cells[i].outputs, 'execution_count': node.cells[i].execution_count}
+                    summary['error'] = f"cell {i}: {e.ename}: {e.evalue}"
+                    break
+                if i >= first:
+                    summary['executed'] += 1
+                    outputs[i] = {'outputs': node.cells[i].outputs, 'execution_count': node.cells[i].execution_count}
+                    cache['cells'][key] = outputs[i]
+        # multi-line output text stored as a list of lines, like the saved notebooks
+        split_lines(node)
+
+    # only the current cells' entries are kept, so the cache doesn't grow with every edit
+    cache['cells'] = {key: cache['cells'][key] for key in keys.values() if key in cache['cells']}
+    save_cache(path, cache)
+
+    changed = False
+    for i, result in outputs.items():
+        cell = nb['cells'][i]
+        if cell.get('outputs') != result['outputs'] or cell.get('execution_count') != result['execution_count']:
+            cell['outputs'], cell['execution_count'] = result['outputs'], result['execution_count']
+            changed = True
+    if changed:
+        write_notebook(nb, path)
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+def _execute(args):
+    return execute(*args)
+
+
+def run(paths, workers=None, force=False, kernel=None, timeout=CELL_TIMEOUT):
+    """Execute notebooks in parallel (one kernel each); returns their summaries in order."""
+    jobs = [(path, force, kernel, timeout) for path in paths]
+    if len(jobs) <= 1 or workers == 1:
+        return [_execute(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+        return list(pool.map(_execute, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Execute the notebooks headless, re-running only stale cells.")
+    parser.add_argument('notebooks', nargs='*', help="Notebooks to run (default: every notebook in notebooks/).")
+    parser.add_argument('--workers', type=int, default=None, help="Notebooks executed at the same time.")
+    parser.add_argument('--force', action='store_true', help="Ignore the cache and execute every cell.")
+    parser.add_argument('--kernel', default=None, help="Kernel name (default: the notebook's own kernelspec).")
+    parser.add_argument('--timeout', type=int, default=CELL_TIMEOUT, help="Seconds allowed per cell.")
+    args = parser.parse_args()
+
+    paths = args.notebooks or sorted(glob.glob(os.path.join(NOTEBOOK_DIR, '*.ipynb')))
+    summaries = run(paths, args.workers, args.force, args.kernel, args.timeout)
+    for s in summaries:
+        line = (f"{s['notebook']}: {s['executed']} executed, {s['cached']} cached, "
+                f"{s['replayed']} replayed ({s['seconds']:.2f}s)")
+        print(line + (f"  FAILED at {s['error']}" if s['error'] else ""))
+    if any(s['error'] for s in summaries):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.delta_store import current_version, read_merged
+from src.instrument import span
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNIFIED_PATH = os.path.join(BASE_DIR, 'data', 'raw', 'ethiopia_fi_unified_data.csv')
+REFERENCE_PATH = os.path.join(BASE_DIR, 'data', 'raw', 'reference_codes.csv')
+
+# Low-cardinality code columns stored as pandas Categoricals. Categories come from
+# reference_codes.csv (field == column); values missing from it are appended after the
+# reference codes so nothing is lost (validate_data flags them).
+CATEGORICAL_COLUMNS = [
+    'record_type', 'pillar', 'indicator_code', 'confidence', 'gender', 'location',
+    'category', 'indicator_direction', 'value_type', 'source_type', 'impact_direction',
+    'impact_magnitude', 'relationship_type', 'evidence_basis', 'response_shape',
+]
+
+# Alternative spellings of the same indicator, resolved to one canonical code at load time.
+INDICATOR_ALIASES = {
+    'USG_DIGITAL_PAY': 'USG_DIGITAL_PAYMENT',
+}
+
+DATE_COLUMNS = ['observation_date']
+
+# Storage backend for load_unified: 'csv' (base file + deltas) or 'sqlite' (src/sql_store.py).
+BACKEND = os.environ.get('FI_BACKEND', 'csv')
+
+
+def canonical_code(code):
+    """Canonical indicator code for a (possibly aliased) code."""
+    return INDICATOR_ALIASES.get(code, code)
+
+
+def reference_categories(ref=REFERENCE_PATH):
+    """{field: [codes in file order]} from reference_codes.csv, or {} when it is missing."""
+    if isinstance(ref, str):
+        if not os.path.exists(ref):
+            return {}
+        ref = pd.read_csv(ref)
+    ref = ref.dropna(subset=['field', 'code'])
+    return {field: list(dict.fromkeys(group['code'].astype(str).str.strip()))
+            for field, group in ref.groupby('field', sort=False)}
+
+
+def to_categorical(values, categories=()):
+    """Categorical with the given categories first, then any other observed values (sorted)."""
+    categories = list(categories)
+    extra = pd.Index(values.dropna().unique()).difference(pd.Index(categories))
+    return pd.Categorical(values, categories=categories + sorted(extra, key=str))
+
+
+def apply_schema(df, ref=REFERENCE_PATH):
+    """Strip code strings, resolve indicator aliases and intern code columns as Categoricals."""
+    categories = reference_categories(ref) if not isinstance(ref, dict) else ref
+    df = df.copy()
+
+    for col in CATEGORICAL_COLUMNS + ['record_id', 'parent_id']:
+        if col in df.columns and pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+
+    if 'indicator_code' in df.columns:
+        df['indicator_code'] = df['indicator_code'].replace(INDICATOR_ALIASES)
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = to_categorical(df[col].astype(object), categories.get(col, ()))
+
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def load_unified(path=UNIFIED_PATH, ref=REFERENCE_PATH, version=None, backend=None, record_types=None):
+    """
+    Read the unified dataset (base snapshot plus pending deltas) with the schema applied.
+
+    `record_types` keeps only those record types. backend='sqlite' reads the indexed
+    mirror instead (kept in sync with the CSV side) and selects them through its index;
+    the mirror only holds the current data, so a pinned `version` must be the current one.
+    """
+    backend = backend or BACKEND
+    if backend not in ('csv', 'sqlite'):
+        raise ValueError(f"Unknown backend '{backend}' (expected 'csv' or 'sqlite')")
+    with span('load', backend=backend):
+        if backend == 'sqlite':
+            from src import sql_store
+            if version is not None and version != current_version(path):
+                raise FileNotFoundError(f"Version {version} of {path} is not current; "
+                                        f"the sqlite backend only serves the current version")
+            raw = sql_store.read_records(path, record_types=record_types)
+        else:
+            raw = read_merged(path, version)
+    with span('parse', rows=len(raw)):
+        df = apply_schema(raw, ref)
+    if record_types is not None and backend == 'csv':
+        df = df[codes_mask(df['record_type'], record_types)].reset_index(drop=True)
+    return df
+
+
+def code_mask(series, value):
+    """Boolean mask `series == value` as an integer compare on the category codes."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return (series == value).to_numpy(dtype=bool, na_value=False)
+    try:
+        code = series.cat.categories.get_loc(value)
+    except KeyError:
+        return np.zeros(len(series), dtype=bool)
+    return series.cat.codes.to_numpy() == code
+
+
+def codes_mask(series, values):
+    """Boolean mask `series.isin(values)` as an integer lookup on the category codes."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.isin(list(values)).to_numpy()
+    wanted = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+    idx = series.cat.categories.get_indexer(list(values))
+    wanted[idx[idx >= 0]] = True
+    # code -1 (missing) indexes the trailing False slot
+    return wanted[series.cat.codes.to_numpy()]
@@ -0,0 +1,243 @@
+"""
+Versioned, immutable output snapshots with an atomic "current" pointer.
+
+Publishing data/processed/event_indicator_matrix.csv writes
+
+    data/processed/.snapshots/event_indicator_matrix/<version>.csv   immutable
+    data/processed/.snapshots/event_indicator_matrix/CURRENT         -> <version>
+
+Each file is written to a temp path and moved into place with os.replace, so a reader
+sees either the previous or the new version, never a half-written file. The plain
+path (data/processed/event_indicator_matrix.csv) is a copy swapped in the same way for
+readers that don't know about snapshots. Readers that need a consistent view resolve a
+version once and keep reading that version while newer ones are published.
+
+Publishers of one output take a lock file while they swap the plain copy and the
+pointer, which also records the plain copy's stat. If the plain path is replaced by hand
+after a publish, readers see it as an unpublished "plain-..." version (current_version
+never writes); `adopt` snapshots it as a real version:
+
+    python -m src.snapshots adopt data/raw/ethiopia_fi_unified_data.csv
+"""
+import argparse
+import contextlib
+import filecmp
+import glob
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = '.snapshots'
+# "<version>\n<size> <mtime_ns>": the current version and the stat of the plain path it
+# was published with, to notice hand edits.
+POINTER = 'CURRENT'
+LOCK = '.lock'
+# Seconds after which a publisher's lock is taken to be left over from a crash.
+LOCK_TIMEOUT = 60
+# Prefix of the version reported for a plain path replaced outside publish.
+PLAIN_PREFIX = 'plain-'
+# Old versions kept per output; pinned readers older than this may lose their version.
+KEEP_VERSIONS = 10
+
+# (plain path, stat, snapshot file) -> whether their contents match, so an unchanged but
+# touched plain file is compared once per process
+_SAME_CONTENT = {}
+
+
+def snapshot_dir(path):
+    stem, _ = os.path.splitext(os.path.basename(path))
+    return os.path.join(os.path.dirname(os.path.abspath(path)), SNAPSHOT_DIR, stem)
+
+
+def new_version():
+    # sortable, and unique across concurrent publishers
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f') + f'-{os.getpid()}'
+
+
+def git_commit():
+    """Short commit id of the checkout, recorded next to versioned outputs; None outside git."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _atomic_write_text(path, text):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def list_versions(path):
+    ext = os.path.splitext(path)[1]
+    files = glob.glob(os.path.join(snapshot_dir(path), f'*{ext}'))
+    return sorted(os.path.splitext(os.path.basename(f))[0] for f in files)
+
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _plain_stat(path):
+    st = os.stat(path)
+    return f'{st.st_size} {st.st_mtime_ns}'
+
+
+def _read_pointer(path):
+    """(current version, stat of the plain path it was published with); (None, None) if never published."""
+    text = _read_text(os.path.join(snapshot_dir(path), POINTER))
+    if text is None:
+        return None, None
+    version, _, stat = text.partition('\n')
+    return version, stat.strip() or None
+
+
+def _same_content(path, stat, published):
+    key = (os.path.abspath(path), stat, published)
+    if key not in _SAME_CONTENT:
+        _SAME_CONTENT[key] = os.path.exists(published) and filecmp.cmp(path, published, shallow=False)
+    return _SAME_CONTENT[key]
+
+
+def current_version(path):
+    """
+    Version the pointer currently names, or None if the output was never published.
+
+    Read-only. A plain path replaced outside publish (different content) is reported as
+    the unpublished version "plain-<size>-<mtime_ns>", which resolve() maps to the plain
+    path; adopt() makes it a real version.
+    """
+    version, published_stat = _read_pointer(path)
+    if version is None or not os.path.exists(path):
+        return version
+    stat = _plain_stat(path)
+    if stat == published_stat:
+        return version
+    # same content, only the stat moved (e.g. touched, or copied back unchanged)
+    if _same_content(path, stat, os.path.join(snapshot_dir(path), version + os.path.splitext(path)[1])):
+        return version
+    return PLAIN_PREFIX + stat.replace(' ', '-')
+
+
+def resolve(path, version=None):
+    """Concrete file for `version` (default: current). Falls back to the plain path if unpublished."""
+    version = version or current_version(path)
+    if version is None:
+        return path
+    if version.startswith(PLAIN_PREFIX):
+        if not os.path.exists(path) or current_version(path) != version:
+            raise FileNotFoundError(f"Unpublished version {version} of {path} was replaced")
+        return path
+    resolved = os.path.join(snapshot_dir(path), version + os.path.splitext(path)[1])
+    if not os.path.exists(resolved):
+        raise FileNotFoundError(f"Snapshot {version} of {path} no longer exists")
+    return resolved
+
+
+@contextlib.contextmanager
+def _lock(out_dir, timeout=LOCK_TIMEOUT):
+    """Exclusive lock file for the writers of one output; a lock older than `timeout` seconds is stale."""
+    lock_path = os.path.join(out_dir, LOCK)
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > timeout:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.01)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+def _install(path, write, keep, update_plain=True):
+    """Write a new version with write(tmp_path), refresh the plain path, and make the version current."""
+    out_dir = snapshot_dir(path)
+    os.makedirs(out_dir, exist_ok=True)
+    version = new_version()
+    final = os.path.join(out_dir, version + os.path.splitext(path)[1])
+
+    # written outside the lock; prune never sees the .tmp file
+    tmp = final + '.tmp'
+    write(tmp)
+    with open(tmp, 'rb') as f:
+        os.fsync(f.fileno())
+
+    # one writer at a time, so the pointer always names the version the plain path holds
+    with _lock(out_dir):
+        os.replace(tmp, final)
+        if update_plain:
+            # a copy, not a hard link: editing the plain file must never touch the snapshot
+            legacy_tmp = f'{path}.{os.getpid()}.tmp'
+            shutil.copyfile(final, legacy_tmp)
+            os.replace(legacy_tmp, path)
+        # version and plain stat in one file, swapped in one step
+        _atomic_write_text(os.path.join(out_dir, POINTER), f'{version}\n{_plain_stat(path)}')
+        if keep:
+            prune(path, keep)
+    return version
+
+
+def publish(df, path, keep=KEEP_VERSIONS, **to_csv_kwargs):
+    """Write df as a new immutable version of `path` and atomically make it current."""
+    return _install(path, lambda tmp: df.to_csv(tmp, **to_csv_kwargs), keep)
+
+
+def adopt(path, keep=KEEP_VERSIONS):
+    """Snapshot the plain path as it is on disk (e.g. after a hand edit) as a new current version."""
+    return _install(path, lambda tmp: shutil.copyfile(path, tmp), keep, update_plain=False)
+
+
+def prune(path, keep=KEEP_VERSIONS):
+    """Delete all but the newest `keep` versions (never the current one)."""
+    current = current_version(path)
+    ext = os.path.splitext(path)[1]
+    for version in list_versions(path)[:-keep]:
+        if version != current:
+            try:
+                os.remove(os.path.join(snapshot_dir(path), version + ext))
+            except FileNotFoundError:
+                pass
+
+
+def read_csv(path, version=None, **kwargs):
+    """Read a pinned (or the current) version of a published CSV."""
+    return pd.read_csv(resolve(path, version), **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned snapshots of published outputs.")
+    parser.add_argument('command', choices=['status', 'adopt'])
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'adopt':
+        print(f"Adopted {args.path} as version {adopt(args.path)}")
+        return
+    version = current_version(args.path)
+    print(f"{args.path}: {version or 'never published'} ({len(list_versions(args.path))} versions kept)")
+
+
+if __name__ == "__main__":
+    main()
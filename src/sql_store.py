@@ -0,0 +1,251 @@
+"""
+SQLite backend for the unified dataset.
+
+The base snapshot plus pending deltas are mirrored into a single indexed table
+
+    data/raw/ethiopia_fi_unified_data.sqlite
+
+so point queries ("latest ACC_OWNERSHIP value", "links for event X") are index lookups
+instead of CSV scans. The database runs in WAL mode: any number of readers (dashboard
+sessions, scripts) can query while a rebuild is in progress and keep seeing the previous
+table until the rebuild commits. New delta segments are applied to the mirror
+incrementally; it is rebuilt only when the base file changes (e.g. after a compaction).
+
+Select it for every loader with FI_BACKEND=sqlite (or load_unified(..., backend='sqlite')).
+
+    python -m src.sql_store build
+    python -m src.sql_store latest ACC_OWNERSHIP
+    python -m src.sql_store links EVT_TELEBIRR
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from src.delta_store import UNIFIED_PATH, read_merged, source_signature
+from src.schema import INDICATOR_ALIASES, canonical_code
+
+TABLE = 'records'
+INDEXES = {
+    'idx_records_type_code_date': ('record_type', 'indicator_code', 'observation_date'),
+    'idx_records_parent': ('parent_id',),
+    'idx_records_id': ('record_id',),
+}
+# Code columns stored stripped (and aliases resolved) so lookups can use the indexes.
+KEY_COLUMNS = ['record_id', 'record_type', 'indicator_code', 'parent_id']
+BUSY_TIMEOUT_MS = 30_000
+
+
+def db_path_for(base_path=UNIFIED_PATH):
+    return os.path.splitext(base_path)[0] + '.sqlite'
+
+
+def connect(db_path, readonly=False):
+    """Connection in autocommit mode (transactions are explicit); read-only connections never block writers."""
+    if readonly:
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None,
+                               check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    return conn
+
+
+def stored_signature(conn):
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _sql_type(col):
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _rows(df):
+    # object columns with None for missing values, so sqlite3 gets plain Python scalars
+    columns = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns]
+    return zip(*columns)
+
+
+def _prepare(df):
+    for col in KEY_COLUMNS:
+        if col in df.columns and pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+    if 'indicator_code' in df.columns:
+        df['indicator_code'] = df['indicator_code'].replace(INDICATOR_ALIASES)
+    return df
+
+
+def build(base_path=UNIFIED_PATH, db_path=None):
+    """Rebuild the table from base + deltas in one transaction. Returns the number of rows."""
+    db_path = db_path or db_path_for(base_path)
+    signature = source_signature(base_path)
+    df = _prepare(read_merged(base_path))
+
+    column_defs = ', '.join(f'"{c}" {_sql_type(df[c])}' for c in df.columns)
+    placeholders = ', '.join('?' * len(df.columns))
+
+    conn = connect(db_path)
+    try:
+        # IMMEDIATE takes the write lock up front; readers keep the old table until COMMIT
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        conn.execute(f'CREATE TABLE {TABLE} ({column_defs})')
+        conn.executemany(f'INSERT INTO {TABLE} VALUES ({placeholders})', _rows(df))
+        for name, cols in INDEXES.items():
+            if set(cols) <= set(df.columns):
+                conn.execute(f'CREATE INDEX {name} ON {TABLE} ({", ".join(cols)})')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('source_signature', ?)", (signature,))
+        conn.execute('COMMIT')
+        conn.execute('ANALYZE')
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return len(df)
+
+
+def new_segments(stored, signature):
+    """
+    Delta segments added since the mirror was built, or None if it needs a full rebuild.
+
+    Only appends are incremental: the stored file list must be a prefix of the current one
+    (same base file, same earlier segments).
+    """
+    if not stored:
+        return None
+    old, new = json.loads(stored), json.loads(signature)
+    if not old or new[:len(old)] != old:
+        return None
+    return [path for path, _, _ in new[len(old):]]
+
+
+def append_segments(segments, signature, db_path):
+    """Apply delta segments to the mirror in one transaction: a record_id's old row is replaced."""
+    conn = connect(db_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({TABLE})')]
+        for path in segments:
+            df = _prepare(pd.read_csv(path, low_memory=False))
+            # latest row per record_id wins, as in read_merged
+            df = df[~(df['record_id'].notna() & df['record_id'].duplicated(keep='last'))]
+            for col in df.columns:
+                if col not in columns:
+                    conn.execute(f'ALTER TABLE {TABLE} ADD COLUMN "{col}" {_sql_type(df[col])}')
+                    columns.append(col)
+            ids = df['record_id'].dropna().astype(str)
+            conn.executemany(f'DELETE FROM {TABLE} WHERE record_id = ?', ((i,) for i in ids))
+            names = ', '.join(f'"{c}"' for c in df.columns)
+            placeholders = ', '.join('?' * len(df.columns))
+            conn.executemany(f'INSERT INTO {TABLE} ({names}) VALUES ({placeholders})', _rows(df))
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('source_signature', ?)", (signature,))
+        conn.execute('COMMIT')
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+
+def ensure_current(base_path=UNIFIED_PATH, db_path=None):
+    """Bring the mirror up to date with the CSV side (new deltas only, else a rebuild). Returns the db path."""
+    db_path = db_path or db_path_for(base_path)
+    if os.path.exists(db_path):
+        signature = source_signature(base_path)
+        conn = connect(db_path, readonly=True)
+        try:
+            stored = stored_signature(conn)
+        finally:
+            conn.close()
+        if stored == signature:
+            return db_path
+        segments = new_segments(stored, signature)
+        if segments is not None:
+            try:
+                append_segments(segments, signature, db_path)
+                return db_path
+            except FileNotFoundError:
+                pass  # compacted meanwhile: rebuild from the new base
+    build(base_path, db_path)
+    return db_path
+
+
+def query(sql, params=(), base_path=UNIFIED_PATH, db_path=None):
+    """Run a read-only query against an up-to-date mirror and return a DataFrame."""
+    db_path = ensure_current(base_path, db_path)
+    conn = connect(db_path, readonly=True)
+    try:
+        return pd.read_sql_query(sql, conn, params=list(params))
+    finally:
+        conn.close()
+
+
+def read_records(base_path=UNIFIED_PATH, db_path=None, record_types=None, indicator_codes=None):
+    """Rows of the unified table in file order, optionally filtered via the indexes."""
+    where, params = [], []
+    if record_types is not None:
+        where.append(f'record_type IN ({", ".join("?" * len(record_types))})')
+        params += list(record_types)
+    if indicator_codes is not None:
+        codes = [canonical_code(c) for c in indicator_codes]
+        where.append(f'indicator_code IN ({", ".join("?" * len(codes))})')
+        params += codes
+    clause = f' WHERE {" AND ".join(where)}' if where else ''
+    return query(f'SELECT * FROM {TABLE}{clause} ORDER BY rowid', params, base_path, db_path)
+
+
+def latest_value(code, base_path=UNIFIED_PATH, db_path=None, gender='all', location='national'):
+    """Most recent observation of an indicator as a one-row DataFrame (empty if none)."""
+    return query(
+        f'SELECT record_id, indicator_code, observation_date, value_numeric, gender, location '
+        f'FROM {TABLE} WHERE record_type = ? AND indicator_code = ? '
+        f'AND (gender = ? OR gender IS NULL) AND (location = ? OR location IS NULL) '
+        f'ORDER BY observation_date DESC LIMIT 1',
+        ('observation', canonical_code(code), gender, location), base_path, db_path)
+
+
+def links_for_event(event, base_path=UNIFIED_PATH, db_path=None):
+    """Impact links whose parent_id is the event's record_id or indicator_code."""
+    return query(
+        f'SELECT * FROM {TABLE} WHERE parent_id IN ('
+        f'  SELECT ? UNION SELECT indicator_code FROM {TABLE} WHERE record_id = ? AND record_type = ?'
+        f'  UNION SELECT record_id FROM {TABLE} WHERE record_type = ? AND indicator_code = ?'
+        f') AND record_type = ? ORDER BY rowid',
+        (event, event, 'event', 'event', event, 'impact_link'), base_path, db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed SQLite mirror of the unified dataset.")
+    parser.add_argument('command', choices=['build', 'latest', 'links'])
+    parser.add_argument('key', nargs='?', help="Indicator code (latest) or event id / code (links).")
+    parser.add_argument('--base', default=UNIFIED_PATH)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        n = build(args.base, args.db)
+        print(f"Built {args.db or db_path_for(args.base)} with {n} records")
+        return
+    if not args.key:
+        parser.error(f"{args.command} needs a key")
+    if args.command == 'latest':
+        print(latest_value(args.key, args.base, args.db).to_string(index=False))
+    else:
+        print(links_for_event(args.key, args.base, args.db).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Streaming (chunked) processing for unified datasets larger than memory.
+
+The base snapshot is read in fixed-size chunks with pd.read_csv(chunksize=...), followed
+by the pending delta segments (small by design, merged with latest-wins). Only bounded
+state is kept between chunks:
+
+  * validation   - the parent keys (pass 1) and per-rule violation counts; duplicate
+                   record_ids are found by spilling record_id hashes to hash-partitioned
+                   files and checking one partition at a time,
+  * impact links - the event table (pass 1) and the event x indicator sum matrix,
+  * baselines    - per-indicator least-squares sufficient statistics
+                   (n, sum x, sum y, sum x^2, sum xy) of the national series, with x in
+                   days from a fixed per-indicator offset (its first date seen).
+
+    python -m src.streaming validate --chunksize 500000 --out reports/violations.csv
+    python -m src.streaming impacts
+    python -m src.streaming baseline
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.delta_store import UNIFIED_PATH, delta_files
+from src.impacts import EVENT_COLUMNS, event_table, resolve_links
+from src.panel import DEFAULT_GENDER, DEFAULT_LOCATION
+from src.schema import INDICATOR_ALIASES, REFERENCE_PATH, apply_schema, code_mask, reference_categories
+from src.snapshots import resolve
+from src.validate_data import load_reference_codes, validate, parent_keys, summarize, REPORT_COLUMNS
+
+CHUNKSIZE = 250_000
+# Origin for least-squares x values; keeps the running sums well conditioned.
+X_ORIGIN = pd.Timestamp('2000-01-01')
+# Target rows per duplicate-check partition (16 bytes each on disk and in memory).
+ROWS_PER_PARTITION = 4_000_000
+
+
+def _pending_deltas(base_path):
+    deltas = [pd.read_csv(p, low_memory=False) for p in delta_files(base_path)]
+    if not deltas:
+        return None
+    deltas = pd.concat(deltas, ignore_index=True)
+    return deltas.drop_duplicates('record_id', keep='last').reset_index(drop=True)
+
+
+def iter_chunks(base_path=UNIFIED_PATH, chunksize=CHUNKSIZE, usecols=None, ref=None):
+    """
+    Yield (first_row, chunk) over base + deltas in read_merged order.
+
+    Base records superseded by a delta are skipped, so each record_id is seen once.
+    With `ref`, the schema (stripping, aliases, categoricals, dates) is applied per chunk.
+    """
+    deltas = _pending_deltas(base_path)
+    superseded = pd.Index(deltas['record_id'].dropna().astype(str).unique()) if deltas is not None else None
+    categories = ref if ref is None or isinstance(ref, dict) else reference_categories(ref)
+    if usecols is not None:
+        # as a callable, columns missing from the file are skipped instead of raising;
+        # record_id is always read so superseded base records can be dropped
+        wanted = usecols if callable(usecols) else set(usecols).__contains__
+        usecols = lambda c: c == 'record_id' or wanted(c)
+    if usecols is not None and deltas is not None:
+        deltas = deltas[[c for c in deltas.columns if usecols(c)]]
+
+    row = 0
+    base_file = resolve(base_path)
+    if os.path.exists(base_file):
+        for chunk in pd.read_csv(base_file, chunksize=chunksize, usecols=usecols, low_memory=False):
+            if superseded is not None and 'record_id' in chunk.columns:
+                chunk = chunk[superseded.get_indexer(chunk['record_id'].astype(str)) < 0].reset_index(drop=True)
+            if categories is not None:
+                chunk = apply_schema(chunk, categories)
+            yield row, chunk
+            row += len(chunk)
+    if deltas is not None:
+        for start in range(0, len(deltas), chunksize):
+            chunk = deltas.iloc[start:start + chunksize].reset_index(drop=True)
+            if categories is not None:
+                chunk = apply_schema(chunk, categories)
+            yield row, chunk
+            row += len(chunk)
+
+
+def scan_events(base_path=UNIFIED_PATH, chunksize=CHUNKSIZE):
+    """Pass 1: the event table, reading only the columns it needs."""
+    usecols = lambda c: c in EVENT_COLUMNS + ['record_type']
+    tables = [event_table(chunk) for _, chunk in iter_chunks(base_path, chunksize, usecols)]
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=EVENT_COLUMNS)
+
+
+# -----------------------------------------------------------------------------------
+# Validation
+# -----------------------------------------------------------------------------------
+def _find_duplicates(spill_dir, n_partitions):
+    """Stream rows whose record_id hash occurs more than once, one partition at a time."""
+    dtype = np.dtype([('hash', np.uint64), ('row', np.int64)])
+    for p in range(n_partitions):
+        path = os.path.join(spill_dir, f'part_{p}.bin')
+        if not os.path.exists(path):
+            continue
+        part = np.fromfile(path, dtype=dtype)
+        _, inverse, counts = np.unique(part['hash'], return_inverse=True, return_counts=True)
+        yield part['row'][counts[inverse] > 1]
+
+
+def validate_stream(base_path=UNIFIED_PATH, ref_path=REFERENCE_PATH, chunksize=CHUNKSIZE, out=None, today=None):
+    """
+    Validate chunk by chunk; returns violation counts per rule (as validate_data.summarize).
+
+    Every violation is appended to `out` (CSV) when given, so the full report never has to
+    fit in memory. Row numbers are positions in the merged (base + deltas) stream.
+    """
+    reference_codes = load_reference_codes(ref_path)
+    parents = set()
+    for _, chunk in iter_chunks(base_path, chunksize, usecols=['record_type', 'record_id', 'indicator_code']):
+        if len(chunk.columns) == 3:
+            parents |= parent_keys(chunk)
+    parents = frozenset(parents)
+    base_file = resolve(base_path)
+    size = os.path.getsize(base_file) if os.path.exists(base_file) else 0
+    # ~100 bytes per CSV row is a conservative row estimate for sizing the partitions
+    n_partitions = max(1, size // 100 // ROWS_PER_PARTITION + 1)
+
+    counts = []
+    if out:
+        pd.DataFrame(columns=REPORT_COLUMNS).to_csv(out, index=False)
+
+    def emit(report):
+        if report.empty:
+            return
+        counts.append(summarize(report))
+        if out:
+            report.to_csv(out, mode='a', header=False, index=False)
+
+    with tempfile.TemporaryDirectory(prefix='fi_dups_') as spill_dir:
+        for first_row, chunk in iter_chunks(base_path, chunksize):
+            report = validate(chunk, reference_codes, today=today, known_parents=parents)
+            # duplicates are checked across the whole stream below; missing columns once
+            skip = ['duplicate_record_id'] + (['missing_column'] if first_row else [])
+            report = report[~report['rule'].isin(skip)].copy()
+            report['row'] += first_row
+            emit(report)
+            if 'record_id' not in chunk.columns:
+                continue
+
+            ids = chunk['record_id']
+            present = ids.notna().to_numpy()
+            hashes = pd.util.hash_pandas_object(ids[present].astype(str), index=False).to_numpy()
+            rows = np.flatnonzero(present) + first_row
+            part_of = hashes % np.uint64(n_partitions)
+            for p in np.unique(part_of):
+                sel = part_of == p
+                spill = np.empty(sel.sum(), dtype=[('hash', np.uint64), ('row', np.int64)])
+                spill['hash'], spill['row'] = hashes[sel], rows[sel]
+                with open(os.path.join(spill_dir, f'part_{p}.bin'), 'ab') as f:
+                    spill.tofile(f)
+
+        dup_rows = np.sort(np.concatenate(list(_find_duplicates(spill_dir, n_partitions)) or [np.empty(0, np.int64)]))
+
+    if len(dup_rows):
+        # one more narrow pass to fetch the offending ids
+        ids = []
+        for first_row, chunk in iter_chunks(base_path, chunksize, usecols=['record_id']):
+            local = dup_rows[(dup_rows >= first_row) & (dup_rows < first_row + len(chunk))] - first_row
+            ids.append(chunk['record_id'].to_numpy()[local])
+        ids = np.concatenate(ids)
+        emit(pd.DataFrame({'rule': 'duplicate_record_id', 'severity': 'error', 'row': dup_rows,
+                           'record_id': ids, 'field': 'record_id', 'value': ids.astype(str)}))
+
+    if not counts:
+        return summarize(pd.DataFrame(columns=REPORT_COLUMNS))
+    return pd.concat(counts).groupby(['rule', 'severity'], as_index=False)['count'].sum()
+
+
+# -----------------------------------------------------------------------------------
+# Impact links
+# -----------------------------------------------------------------------------------
+def impact_matrix_stream(base_path=UNIFIED_PATH, ref_path=REFERENCE_PATH, chunksize=CHUNKSIZE):
+    """Event x target indicator net-impact matrix, resolving the links chunk by chunk."""
+    categories = reference_categories(ref_path)
+    events = apply_schema(scan_events(base_path, chunksize), categories)
+    matrix = None
+    not_found = undated = 0
+    for _, chunk in iter_chunks(base_path, chunksize, ref=categories):
+        links = chunk[code_mask(chunk['record_type'], 'impact_link')]
+        if links.empty:
+            continue
+        resolved, missing, no_date = resolve_links(links, events)
+        not_found += missing
+        undated += no_date
+        part = resolved.groupby(['event_name', 'target_indicator'])['net_impact'].sum()
+        matrix = part if matrix is None else matrix.add(part, fill_value=0)
+
+    if matrix is None:
+        return pd.DataFrame(), not_found, undated
+    matrix = matrix.unstack(fill_value=0).fillna(0)
+    matrix.columns.name = 'target_indicator'
+    return matrix, not_found, undated
+
+
+# -----------------------------------------------------------------------------------
+# Baselines
+# -----------------------------------------------------------------------------------
+STAT_COLUMNS = ['n', 'sx', 'sy', 'sxx', 'sxy']
+
+
+def _slice_mask(chunk, column, value):
+    """Rows in the given gender / location slice; a missing value counts as the default, as in the panel."""
+    if value is None or column not in chunk.columns:
+        return np.ones(len(chunk), dtype=bool)
+    default = DEFAULT_GENDER if column == 'gender' else DEFAULT_LOCATION
+    return (chunk[column].astype(object).fillna(default).astype(str).str.strip() == value).to_numpy()
+
+
+def baseline_stats(base_path=UNIFIED_PATH, chunksize=CHUNKSIZE, by=('indicator_code',),
+                   gender=DEFAULT_GENDER, location=DEFAULT_LOCATION):
+    """
+    Running least-squares sums per group over the observations of one gender / location slice.
+
+    Indicator aliases are resolved, so aliased series merge. x is in days since the group's
+    offset `k` (its first date seen, in days since X_ORIGIN); summing around a fixed point
+    near the data keeps n * sum x^2 - (sum x)^2 well conditioned.
+    """
+    by = list(by)
+    usecols = by + ['record_type', 'observation_date', 'value_numeric', 'gender', 'location']
+    stats = None
+    for _, chunk in iter_chunks(base_path, chunksize, usecols=usecols):
+        obs = chunk[(chunk['record_type'].astype(str).str.strip() == 'observation').to_numpy() &
+                    _slice_mask(chunk, 'gender', gender) & _slice_mask(chunk, 'location', location)]
+        x = (pd.to_datetime(obs['observation_date'], errors='coerce') - X_ORIGIN) / pd.Timedelta(days=1)
+        y = pd.to_numeric(obs['value_numeric'], errors='coerce')
+        keep = (x.notna() & y.notna()).to_numpy()
+        if not keep.any():
+            continue
+        keys = obs.loc[keep, by].astype(str).apply(lambda col: col.str.strip()).reset_index(drop=True)
+        if 'indicator_code' in keys.columns:
+            keys['indicator_code'] = keys['indicator_code'].replace(INDICATOR_ALIASES)
+        x, y = x[keep].to_numpy(), y[keep].to_numpy()
+        group_keys = [keys[c] for c in by]
+
+        # offset per group: kept from earlier chunks, else the group's first x in this one
+        first = pd.Series(x).groupby(group_keys).first()
+        offsets = first if stats is None else stats['k'].combine_first(first)
+        row_keys = pd.MultiIndex.from_frame(keys) if len(by) > 1 else pd.Index(keys[by[0]])
+        dx = x - offsets.reindex(row_keys).to_numpy()
+        part = pd.DataFrame({'n': 1.0, 'sx': dx, 'sy': y, 'sxx': dx * dx, 'sxy': dx * y}).groupby(group_keys).sum()
+        if stats is not None:
+            part = stats[STAT_COLUMNS].add(part, fill_value=0)
+        stats = pd.concat([offsets.reindex(part.index).rename('k'), part], axis=1)
+    if stats is None:
+        return pd.DataFrame(columns=['k'] + STAT_COLUMNS)
+    return stats
+
+
+def fit_baselines(stats):
+    """
+    slope / intercept per group from the sufficient statistics.
+
+    The least-squares line over every observation row in the group, on date ordinals as in
+    run_forecast.train_baseline_model. That one fits the panel instead (one observation
+    per month, the latest), so the two only agree where no month holds more than one
+    row. Groups with fewer than two distinct dates get NaN.
+    """
+    n, sx, sy, sxx, sxy = (stats[c] for c in STAT_COLUMNS)
+    denom = n * sxx - sx * sx
+    slope = (n * sxy - sx * sy) / denom.where(denom.abs() > 1e-9)
+    intercept_offset = (sy - slope * sx) / n
+    # shift the intercept from the group offset to ordinal 0 so it matches datetime.toordinal
+    intercept = intercept_offset - slope * (X_ORIGIN.toordinal() + stats['k'])
+    return pd.DataFrame({'n': n.astype(int), 'slope': slope, 'intercept': intercept})
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked processing of the unified dataset.")
+    parser.add_argument('command', choices=['validate', 'impacts', 'baseline'])
+    parser.add_argument('--data', default=UNIFIED_PATH)
+    parser.add_argument('--ref', default=REFERENCE_PATH)
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--out', default=None, help="Write the result (violations / matrix / fits) to this CSV.")
+    args = parser.parse_args()
+
+    if args.command == 'validate':
+        counts = validate_stream(args.data, args.ref, args.chunksize, args.out)
+        print(counts.to_string(index=False) if not counts.empty else "No violations.")
+        failed = (counts['severity'] == 'error').any()
+    else:
+        if args.command == 'impacts':
+            result, not_found, undated = impact_matrix_stream(args.data, args.ref, args.chunksize)
+            print(f"{not_found} links with unknown events, {undated} with undated events")
+        else:
+            result = fit_baselines(baseline_stats(args.data, args.chunksize))
+        print(result)
+        if args.out:
+            result.to_csv(args.out)
+        failed = False
+
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.0f} MB")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
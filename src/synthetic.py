@@ -0,0 +1,218 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Column layout of data/raw/ethiopia_fi_unified_data.csv
+UNIFIED_COLUMNS = [
+    'record_id', 'record_type', 'category', 'pillar', 'indicator', 'indicator_code',
+    'indicator_direction', 'value_numeric', 'value_type', 'observation_date', 'fiscal_year',
+    'source_name', 'source_type', 'source_url', 'confidence', 'gender', 'location',
+    'parent_id', 'impact_direction', 'impact_magnitude', 'impact_estimate', 'lag_months',
+    'relationship_type', 'evidence_basis', 'response_shape', 'response_months',
+    'collected_by', 'collection_date', 'notes'
+]
+
+REFERENCE_CODES = {
+    'record_type': ['observation', 'event', 'impact_link', 'target'],
+    'pillar': ['ACCESS', 'USAGE', 'QUALITY', 'GENDER'],
+    'category': ['policy', 'product_launch', 'market_entry', 'infrastructure', 'regulation'],
+    'confidence': ['high', 'medium', 'low'],
+    'gender': ['all', 'male', 'female'],
+    'location': ['national', 'urban', 'rural'],
+    'source_type': ['survey', 'operator', 'regulator', 'research'],
+    'value_type': ['percentage', 'count', 'ratio'],
+    'impact_direction': ['increase', 'decrease', 'stabilize', 'mixed'],
+    'impact_magnitude': ['high', 'medium', 'low', 'negligible'],
+    'relationship_type': ['direct', 'indirect', 'enabling'],
+    'evidence_basis': ['empirical', 'literature', 'theoretical', 'expert'],
+    'response_shape': ['linear', 'logistic', 'exponential', 'pulse', 'step'],
+}
+
+# Real indicator codes first so the dashboard and forecast scripts find what they look for.
+CORE_INDICATORS = [
+    ('ACC_OWNERSHIP', 'ACCESS', 'Account Ownership Rate', 'percentage'),
+    ('ACC_MOBILE_PEN', 'ACCESS', 'Mobile Penetration', 'percentage'),
+    ('ACC_MM_AGENT_DENSITY', 'ACCESS', 'Mobile Money Agent Density (per 100k adults)', 'count'),
+    ('ACC_SMARTPHONE_PEN', 'ACCESS', 'Smartphone Penetration (% of connections)', 'percentage'),
+    ('USG_DIGITAL_PAYMENT', 'USAGE', 'Digital Payment Adoption (% of adults)', 'percentage'),
+    ('USG_MM_ACTIVE_RATE', 'USAGE', 'Active vs Registered Mobile Money Accounts (%)', 'percentage'),
+    ('USG_P2P_COUNT', 'USAGE', 'P2P Transaction Count', 'count'),
+    ('USG_ATM_COUNT', 'USAGE', 'ATM Transaction Count', 'count'),
+    ('USG_CROSSOVER', 'USAGE', 'P2P/ATM Crossover Ratio', 'ratio'),
+]
+
+
+def indicator_table(n_indicators):
+    """Core indicators padded with generated ones up to n_indicators."""
+    rows = list(CORE_INDICATORS[:n_indicators])
+    pillars = REFERENCE_CODES['pillar']
+    for i in range(len(rows), n_indicators):
+        pillar = pillars[i % len(pillars)]
+        rows.append((f"{pillar[:3]}_SYN_{i:04d}", pillar, f"Synthetic {pillar.title()} Indicator {i}", 'percentage'))
+    return pd.DataFrame(rows, columns=['indicator_code', 'pillar', 'indicator', 'value_type'])
+
+
+def _ids(prefix, n, start=1):
+    return prefix + pd.Series(np.arange(start, start + n)).astype(str).str.zfill(8)
+
+
+def _random_dates(rng, n, start, end):
+    lo, hi = pd.Timestamp(start).value // 86400_000_000_000, pd.Timestamp(end).value // 86400_000_000_000
+    days = rng.integers(lo, hi + 1, size=n)
+    return pd.to_datetime(days, unit='D')
+
+
+def generate_unified(n_records=10_000, n_indicators=None, seed=0,
+                     start='2011-01-01', end='2024-12-31', shares=(0.90, 0.02, 0.05, 0.03)):
+    """
+    Schema-faithful synthetic unified dataset.
+
+    shares are the fractions of observations, events, impact_links and targets.
+    Everything is generated column-wise, so 10M records take seconds.
+    """
+    rng = np.random.default_rng(seed)
+    n_obs, n_evt, n_lnk = (int(n_records * s) for s in shares[:3])
+    n_evt = max(n_evt, 1)
+    n_tgt = max(n_records - n_obs - n_evt - n_lnk, 0)
+    if n_indicators is None:
+        n_indicators = int(min(500, max(len(CORE_INDICATORS), np.sqrt(max(n_records, 1)) / 2)))
+    inds = indicator_table(n_indicators)
+
+    # --- Observations: one random walk-ish trend per (indicator, gender, location) series ---
+    ind_idx = rng.integers(0, len(inds), size=n_obs)
+    gender = rng.choice(REFERENCE_CODES['gender'], size=n_obs, p=[0.6, 0.2, 0.2])
+    location = rng.choice(REFERENCE_CODES['location'], size=n_obs, p=[0.6, 0.2, 0.2])
+    obs_dates = _random_dates(rng, n_obs, start, end)
+    years = (obs_dates.year - pd.Timestamp(start).year).to_numpy() + obs_dates.dayofyear.to_numpy() / 365.25
+    base = rng.uniform(5, 40, size=len(inds))[ind_idx]
+    slope = rng.uniform(0.5, 3.5, size=len(inds))[ind_idx]
+    values = base + slope * years + rng.normal(0, 1.5, size=n_obs)
+    value_type = inds['value_type'].to_numpy()[ind_idx]
+    is_pct = value_type == 'percentage'
+    values = np.where(is_pct, np.clip(values, 0, 100), np.abs(values) * 10)
+
+    obs = pd.DataFrame({
+        'record_id': _ids('REC_', n_obs),
+        'record_type': 'observation',
+        'pillar': inds['pillar'].to_numpy()[ind_idx],
+        'indicator': inds['indicator'].to_numpy()[ind_idx],
+        'indicator_code': inds['indicator_code'].to_numpy()[ind_idx],
+        'indicator_direction': 'higher_better',
+        'value_numeric': values.round(2),
+        'value_type': value_type,
+        'observation_date': obs_dates,
+        'fiscal_year': obs_dates.year,
+        'source_name': rng.choice(['Global Findex', 'NBE', 'GSMA', 'Ethio Telecom'], size=n_obs),
+        'source_type': rng.choice(REFERENCE_CODES['source_type'], size=n_obs),
+        'confidence': rng.choice(REFERENCE_CODES['confidence'], size=n_obs, p=[0.5, 0.35, 0.15]),
+        'gender': gender,
+        'location': location,
+    })
+
+    # --- Events ---
+    evt_dates = _random_dates(rng, n_evt, start, end)
+    evt_ids = _ids('EVT_', n_evt)
+    evt_codes = _ids('EVT_SYN_', n_evt)
+    evt = pd.DataFrame({
+        'record_id': evt_ids,
+        'record_type': 'event',
+        'category': rng.choice(REFERENCE_CODES['category'], size=n_evt),
+        'indicator': 'Synthetic event ' + pd.Series(np.arange(n_evt)).astype(str),
+        'indicator_code': evt_codes,
+        'observation_date': evt_dates,
+        'fiscal_year': evt_dates.year,
+        'confidence': rng.choice(REFERENCE_CODES['confidence'], size=n_evt),
+    })
+
+    # --- Impact links: parent_id references an event by record_id or (as in the real data) by code ---
+    parent = rng.integers(0, n_evt, size=n_lnk)
+    by_code = rng.random(n_lnk) < 0.3
+    lnk_ind = rng.integers(0, len(inds), size=n_lnk)
+    estimate = np.where(rng.random(n_lnk) < 0.2, rng.uniform(0.5, 5.0, size=n_lnk).round(2), np.nan)
+    lnk = pd.DataFrame({
+        'record_id': _ids('LNK_', n_lnk),
+        'record_type': 'impact_link',
+        'pillar': inds['pillar'].to_numpy()[lnk_ind],
+        'indicator_code': inds['indicator_code'].to_numpy()[lnk_ind],
+        'parent_id': np.where(by_code, evt_codes.to_numpy()[parent], evt_ids.to_numpy()[parent]),
+        'impact_direction': rng.choice(REFERENCE_CODES['impact_direction'], size=n_lnk, p=[0.75, 0.15, 0.05, 0.05]),
+        'impact_magnitude': rng.choice(REFERENCE_CODES['impact_magnitude'], size=n_lnk),
+        'impact_estimate': estimate,
+        'lag_months': rng.choice([0, 3, 6, 12, 18, 24], size=n_lnk),
+        'relationship_type': rng.choice(REFERENCE_CODES['relationship_type'], size=n_lnk),
+        'evidence_basis': rng.choice(REFERENCE_CODES['evidence_basis'], size=n_lnk),
+        'confidence': rng.choice(REFERENCE_CODES['confidence'], size=n_lnk),
+    })
+
+    # --- Targets ---
+    tgt_ind = rng.integers(0, len(inds), size=n_tgt)
+    tgt_dates = _random_dates(rng, n_tgt, '2025-01-01', '2030-12-31')
+    tgt = pd.DataFrame({
+        'record_id': _ids('TGT_', n_tgt),
+        'record_type': 'target',
+        'pillar': inds['pillar'].to_numpy()[tgt_ind],
+        'indicator': inds['indicator'].to_numpy()[tgt_ind],
+        'indicator_code': inds['indicator_code'].to_numpy()[tgt_ind],
+        'value_numeric': rng.uniform(40, 90, size=n_tgt).round(1),
+        'value_type': 'percentage',
+        'observation_date': tgt_dates,
+        'fiscal_year': tgt_dates.year,
+        'confidence': 'high',
+    })
+
+    # drawn last so the other columns stay identical to datasets generated before shapes existed
+    lnk['response_shape'] = rng.choice(REFERENCE_CODES['response_shape'], size=n_lnk,
+                                       p=[0.6, 0.1, 0.1, 0.1, 0.1])
+    lnk['response_months'] = rng.choice([3, 6, 12, 24], size=n_lnk)
+
+    df = pd.concat([obs, evt, lnk, tgt], ignore_index=True)
+    df['collected_by'] = 'synthetic'
+    df['collection_date'] = pd.Timestamp(end).date().isoformat()
+    df['observation_date'] = df['observation_date'].dt.strftime('%Y-%m-%d')
+    return df.reindex(columns=UNIFIED_COLUMNS)
+
+
+def generate_reference_codes():
+    rows = [{'field': field, 'code': code, 'description': code.replace('_', ' ')}
+            for field, codes in REFERENCE_CODES.items() for code in codes]
+    return pd.DataFrame(rows)
+
+
+def generate_forecasts(indicators=('ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT'), years=(2025, 2026, 2027), seed=0):
+    """Forecast table in the layout run_forecast.py writes."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for ind in indicators:
+        start, step = rng.uniform(35, 55), rng.uniform(2, 5)
+        for scenario, mult in [('Base', 1.0), ('Optimistic', 1.05), ('Pessimistic', 0.95)]:
+            for i, year in enumerate(years):
+                rows.append({'Indicator': ind, 'Scenario': scenario, 'Year': year,
+                             'Value': round(min(100.0, (start + step * i) * mult), 2)})
+    return pd.DataFrame(rows)
+
+
+def write_dataset(data_dir, n_records=10_000, seed=0, **kwargs):
+    """Write a full synthetic data/ tree (raw unified data, reference codes, forecasts)."""
+    raw_dir = os.path.join(data_dir, 'raw')
+    os.makedirs(raw_dir, exist_ok=True)
+    generate_unified(n_records, seed=seed, **kwargs).to_csv(
+        os.path.join(raw_dir, 'ethiopia_fi_unified_data.csv'), index=False)
+    generate_reference_codes().to_csv(os.path.join(raw_dir, 'reference_codes.csv'), index=False)
+    generate_forecasts(seed=seed).to_csv(os.path.join(data_dir, 'forecasts_2025_2027.csv'), index=False)
+    return data_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic data/ tree for offline runs.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--records', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_dataset(args.out_dir, args.records, seed=args.seed)
+    print(f"Wrote {args.records} synthetic records to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.delta_store import read_merged
+from src.response_shapes import SHAPES, shape_names
+from src.schema import code_mask, codes_mask
+
+# Columns every other rule depends on. A file missing one is reported once, and the rules
+# and checks that need the column are skipped instead of failing with a KeyError.
+REQUIRED_COLUMNS = ['record_id', 'record_type']
+
+# Declarative structural rules. Each rule applies to rows matching `when` (all records if
+# omitted) and flags rows where `column` is null ('require': 'notnull') or present
+# ('require': 'null'). Code-list rules are generated from reference_codes.csv at run time.
+STRUCTURAL_RULES = [
+    {'name': 'missing_record_id', 'severity': 'error', 'column': 'record_id', 'require': 'notnull'},
+    {'name': 'missing_record_type', 'severity': 'error', 'column': 'record_type', 'require': 'notnull'},
+    {'name': 'event_has_pillar', 'severity': 'error', 'when': {'record_type': 'event'},
+     'column': 'pillar', 'require': 'null'},
+    {'name': 'observation_missing_pillar', 'severity': 'error', 'when': {'record_type': 'observation'},
+     'column': 'pillar', 'require': 'notnull'},
+    {'name': 'observation_missing_value', 'severity': 'error', 'when': {'record_type': 'observation'},
+     'column': 'value_numeric', 'require': 'notnull'},
+    {'name': 'observation_missing_indicator', 'severity': 'error', 'when': {'record_type': 'observation'},
+     'column': 'indicator_code', 'require': 'notnull'},
+    {'name': 'event_missing_date', 'severity': 'error', 'when': {'record_type': 'event'},
+     'column': 'observation_date', 'require': 'notnull'},
+    {'name': 'impact_link_missing_parent', 'severity': 'error', 'when': {'record_type': 'impact_link'},
+     'column': 'parent_id', 'require': 'notnull'},
+    {'name': 'impact_link_missing_target', 'severity': 'error', 'when': {'record_type': 'impact_link'},
+     'column': 'indicator_code', 'require': 'notnull'},
+]
+
+# Dates outside this window are almost certainly typos.
+MIN_DATE = pd.Timestamp('1990-01-01')
+# Only targets may lie in the future.
+FUTURE_ALLOWED = ('target',)
+
+REPORT_COLUMNS = ['rule', 'severity', 'row', 'record_id', 'field', 'value']
+
+
+def load_reference_codes(ref):
+    """{field: set of valid codes} from reference_codes.csv (path or DataFrame)."""
+    if isinstance(ref, str):
+        ref = pd.read_csv(ref)
+    return {field: set(group['code'].astype(str)) for field, group in ref.groupby('field')}
+
+
+def code_rules(reference_codes, columns):
+    """One 'value must be a reference code' rule per reference field present in the data."""
+    return [{'name': f'invalid_{field}', 'severity': 'error', 'column': field, 'require': 'in_codes',
+             'codes': sorted(codes)}
+            for field, codes in reference_codes.items() if field in columns]
+
+
+def compile_rule(rule):
+    """Compile a declarative rule into a function df -> boolean violation mask."""
+    column, require = rule['column'], rule['require']
+    when = rule.get('when', {})
+
+    def mask(df):
+        if column not in df.columns or not set(when) <= set(df.columns):
+            return np.zeros(len(df), dtype=bool)
+        applies = np.ones(len(df), dtype=bool)
+        for col, value in when.items():
+            applies &= code_mask(df[col], value)
+        values = df[column]
+        if require == 'notnull':
+            bad = values.isna().to_numpy()
+        elif require == 'null':
+            bad = values.notna().to_numpy()
+        elif require == 'in_codes':
+            # nulls are allowed: most columns only apply to some record types
+            bad = (values.notna() & ~values.astype(str).isin(rule['codes'])).to_numpy()
+        else:
+            raise ValueError(f"Unknown requirement '{require}' in rule {rule['name']}")
+        return applies & bad
+
+    return mask
+
+
+def _violations(df, mask, rule, severity, field):
+    rows = np.flatnonzero(mask)
+    if len(rows) == 0:
+        return None
+    sub = df.iloc[rows]
+    return pd.DataFrame({
+        'rule': rule,
+        'severity': severity,
+        'row': rows,
+        'record_id': sub['record_id'].to_numpy() if 'record_id' in df.columns else None,
+        'field': field,
+        'value': sub[field].astype(str).to_numpy() if field in df.columns else None,
+    })
+
+
+def check_required_columns(df):
+    """One 'missing_column' error per REQUIRED_COLUMNS entry absent from df."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if not missing:
+        return None
+    return pd.DataFrame({'rule': 'missing_column', 'severity': 'error', 'row': np.nan,
+                         'record_id': None, 'field': missing, 'value': None})
+
+
+def check_duplicates(df):
+    mask = df['record_id'].notna() & df['record_id'].duplicated(keep=False)
+    return _violations(df, mask.to_numpy(), 'duplicate_record_id', 'error', 'record_id')
+
+
+def event_keys(df):
+    """record_ids and indicator_codes of the events in df (what a parent_id may point at)."""
+    is_event = code_mask(df['record_type'], 'event')
+    return set(pd.concat([df.loc[is_event, 'record_id'], df.loc[is_event, 'indicator_code']])
+               .dropna().astype(str))
+
+
+def parent_keys(df):
+    """
+    Everything a parent_id may point at: event keys, plus the codes of observed indicators
+    (indicator -> indicator links, which src/propagation.py cascades through).
+    """
+    is_obs = code_mask(df['record_type'], 'observation')
+    return event_keys(df) | set(df.loc[is_obs, 'indicator_code'].dropna().astype(str))
+
+
+def check_parent_references(df, known_parents=()):
+    """
+    impact_link parent_id must resolve to an event or an observed indicator (hash semi-join).
+
+    known_parents adds parent keys from outside df, e.g. the store when validating a new batch.
+    """
+    is_link = code_mask(df['record_type'], 'impact_link')
+    keys = pd.Index(list(parent_keys(df) | set(known_parents)))
+    parents = df['parent_id'].astype(str)
+    orphan = is_link & df['parent_id'].notna().to_numpy() & (keys.get_indexer(parents) < 0)
+    return _violations(df, orphan, 'orphan_impact_link', 'error', 'parent_id')
+
+
+def check_dates(df, today=None):
+    """Unparseable, implausibly old, and (except for targets) future observation dates."""
+    today = pd.Timestamp(today) if today is not None else pd.Timestamp.today().normalize()
+    raw = df['observation_date']
+    parsed = pd.to_datetime(raw, errors='coerce')
+    future_ok = codes_mask(df['record_type'], FUTURE_ALLOWED)
+
+    out = [
+        _violations(df, (raw.notna() & parsed.isna()).to_numpy(), 'unparseable_date', 'error', 'observation_date'),
+        _violations(df, (parsed < MIN_DATE).to_numpy(), 'date_too_old', 'warning', 'observation_date'),
+        _violations(df, (parsed > today).to_numpy() & ~future_ok, 'date_in_future', 'warning', 'observation_date'),
+    ]
+    out = [o for o in out if o is not None]
+    return pd.concat(out, ignore_index=True) if out else None
+
+
+def check_percentages(df):
+    if 'value_type' not in df.columns:
+        return None
+    values = pd.to_numeric(df['value_numeric'], errors='coerce')
+    mask = code_mask(df['value_type'], 'percentage') & \
+           ((values < 0) | (values > 100)).to_numpy()
+    return _violations(df, mask, 'percentage_out_of_range', 'warning', 'value_numeric')
+
+
+def check_response_shapes(df):
+    """impact_link response_shape must name a registered shape (others fall back to the default)."""
+    is_link = code_mask(df['record_type'], 'impact_link')
+    unknown = ~np.isin(shape_names(df['response_shape']), list(SHAPES))
+    return _violations(df, is_link & unknown, 'unknown_response_shape', 'warning', 'response_shape')
+
+
+def validate(df, reference_codes, rules=None, today=None, known_parents=()):
+    """Run every rule over df; returns one row per violation (columns REPORT_COLUMNS)."""
+    if not isinstance(reference_codes, dict):
+        reference_codes = load_reference_codes(reference_codes)
+    rules = (STRUCTURAL_RULES if rules is None else rules) + code_rules(reference_codes, df.columns)
+
+    results = [check_required_columns(df)]
+    for rule in rules:
+        results.append(_violations(df, compile_rule(rule)(df), rule['name'], rule['severity'], rule['column']))
+
+    # each check runs only when the columns it reads are present
+    columns = set(df.columns)
+    if 'record_id' in columns:
+        results.append(check_duplicates(df))
+    if {'record_id', 'record_type', 'indicator_code', 'parent_id'} <= columns:
+        results.append(check_parent_references(df, known_parents))
+    if {'record_type', 'observation_date'} <= columns:
+        results.append(check_dates(df, today))
+    if 'value_numeric' in columns:
+        results.append(check_percentages(df))
+    if {'record_type', 'response_shape'} <= columns:
+        results.append(check_response_shapes(df))
+
+    results = [r for r in results if r is not None]
+    if not results:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.concat(results, ignore_index=True)
+
+
+def summarize(report):
+    """Violation counts per rule."""
+    if report.empty:
+        return pd.DataFrame(columns=['rule', 'severity', 'count'])
+    return report.groupby(['rule', 'severity']).size().reset_index(name='count')
+
+
+def main():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Validate the unified dataset against reference_codes.csv.")
+    parser.add_argument('--data', default=os.path.join(base_dir, 'data', 'raw', 'ethiopia_fi_unified_data.csv'))
+    parser.add_argument('--ref', default=os.path.join(base_dir, 'data', 'raw', 'reference_codes.csv'))
+    parser.add_argument('--out', default=None, help="Write every violation to this CSV.")
+    parser.add_argument('--fail-on', choices=['error', 'warning', 'never'], default='error')
+    parser.add_argument('--coverage', action='store_true', help="Also report per-series coverage gaps.")
+    args = parser.parse_args()
+
+    print(f"Validating {args.data}...")
+    df = read_merged(args.data)
+    report = validate(df, args.ref)
+
+    print(f"Records: {len(df)}  Violations: {len(report)}")
+    if not report.empty:
+        print(summarize(report).to_string(index=False))
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        report.to_csv(args.out, index=False)
+        print(f"Saved violations to {args.out}")
+
+    if args.coverage:
+        # imported here: the profile needs the panel, which most validation runs don't
+        from src.panel import ensure_panel
+        from src.profiling import load_profile
+        profile = load_profile(ensure_panel(args.data, args.ref))
+        print(f"\nYears without any observation: {profile['years_without_data']}")
+        gaps = profile['gaps']
+        print(f"Series with gaps: {gaps['series'].nunique()}  Missing series-years: {int(gaps['years'].sum())}")
+        if not gaps.empty:
+            print(gaps.sort_values('years', ascending=False).head(20).to_string(index=False))
+
+    failing = {'error': ['error'], 'warning': ['error', 'warning'], 'never': []}[args.fail_on]
+    if report['severity'].isin(failing).any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import benchmark
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # tiny datasets: the suite is about the harness here, not the timings
+    monkeypatch.setitem(benchmark.SIZES, 'tiny', 200)
+    return str(tmp_path)
+
+
+def test_dataset_is_keyed_by_generator(cache_dir, monkeypatch):
+    unified, ref = benchmark.dataset('tiny', cache_dir)
+    assert benchmark.generator_hash() in unified
+    assert os.path.exists(unified) and os.path.exists(ref)
+    # cached: the same path, not regenerated
+    mtime = os.path.getmtime(unified)
+    assert benchmark.dataset('tiny', cache_dir)[0] == unified
+    assert os.path.getmtime(unified) == mtime
+
+    monkeypatch.setattr(benchmark, 'generator_hash', lambda: 'changed')
+    assert benchmark.dataset('tiny', cache_dir)[0] != unified
+
+
+def test_run_and_compare(cache_dir):
+    entry = benchmark.run(['tiny'], cases=['csv_load', 'resolve_links'], repeat=1, cache_dir=cache_dir)
+    assert [r['case'] for r in entry['results']] == ['csv_load', 'resolve_links']
+    assert all(r['records'] == 200 and r['min_seconds'] > 0 for r in entry['results'])
+
+    table = benchmark.compare(entry, [])
+    assert table['previous'].isna().all() and not table['regression'].any()
+    slower = {'commit': 'abc', 'results': [dict(r, min_seconds=r['min_seconds'] / 2) for r in entry['results']]}
+    table = benchmark.compare(entry, [slower])
+    assert table['previous_commit'].eq('abc').all()
+    pd.testing.assert_series_equal(table['ratio'], pd.Series([2.0, 2.0]), check_names=False)
+    assert table['regression'].all()
+
+
+def test_history_round_trip(tmp_path):
+    path = str(tmp_path / 'history' / 'benchmarks.json')
+    assert benchmark.load_history(path) == []
+    benchmark.save_history([{'commit': 'abc', 'results': []}], path)
+    assert benchmark.load_history(path) == [{'commit': 'abc', 'results': []}]
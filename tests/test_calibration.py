@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from src.calibration import calibrate
+from src.panel import build_panel
+
+
+def records(effects, magnitude='high'):
+    """
+    Monthly ACC_OWNERSHIP history 2015-2024: intercept 30, 2 points a year, plus a step of
+    each given size from an event in a different year.
+    """
+    months = pd.date_range('2015-01-31', '2024-12-31', freq='ME')
+    years = ((months - months[0]) / pd.Timedelta(days=365.25)).to_numpy()
+    values = 30.0 + 2.0 * years
+    rows = []
+    for i, effect in enumerate(effects):
+        event_date = pd.Timestamp(2017 + 2 * i, 3, 15)
+        values = values + effect * (months >= event_date)
+        rows.append({'record_id': f'EVT_{i}', 'record_type': 'event', 'indicator_code': f'EVT_{i}',
+                     'observation_date': event_date.strftime('%Y-%m-%d')})
+        rows.append({'record_id': f'IMP_{i}', 'record_type': 'impact_link', 'parent_id': f'EVT_{i}',
+                     'indicator_code': 'ACC_OWNERSHIP', 'impact_direction': 'increase',
+                     'impact_magnitude': magnitude, 'impact_estimate': np.nan, 'lag_months': 0,
+                     'response_shape': 'step'})
+    rows += [{'record_id': f'OBS_{k}', 'record_type': 'observation', 'indicator_code': 'ACC_OWNERSHIP',
+              'value_numeric': v, 'observation_date': d.strftime('%Y-%m-%d')}
+             for k, (d, v) in enumerate(zip(months, values))]
+    return pd.DataFrame(rows)
+
+
+def test_link_mode_recovers_effects():
+    df = records([3.0, -1.5, 6.0])
+    links, params = calibrate(df, build_panel(df), mode='link', lam=1e-6)
+    np.testing.assert_allclose(params['calibrated'], [3.0, -1.5, 6.0], atol=1e-4)
+    np.testing.assert_allclose(links['calibrated'], [3.0, -1.5, 6.0], atol=1e-4)
+
+
+def test_class_mode_shares_one_magnitude_and_shrinks_to_prior():
+    df = records([4.0, 4.0])
+    _, params = calibrate(df, build_panel(df), mode='class', lam=1e-6)
+    fitted = params.set_index('magnitude_class')['calibrated']
+    np.testing.assert_allclose(fitted['high'], 4.0, atol=1e-4)
+    # classes without links keep their prior
+    np.testing.assert_allclose(fitted.drop('high'), params.set_index('magnitude_class')['prior'].drop('high'))
+
+    _, strong = calibrate(df, build_panel(df), mode='class', lam=1e9)
+    np.testing.assert_allclose(strong.set_index('magnitude_class').loc['high', 'calibrated'], 0.2, atol=1e-4)
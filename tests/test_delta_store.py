@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from src import delta_store
+from src.delta_store import append_records, current_version, delta_files, read_merged
+
+
+def records(prefix, n=5):
+    return pd.DataFrame({'record_id': [f'{prefix}_{i}' for i in range(n)], 'record_type': 'observation',
+                         'value_numeric': range(n)})
+
+
+@pytest.fixture
+def base(tmp_path):
+    path = str(tmp_path / 'unified.csv')
+    records('BASE').to_csv(path, index=False)
+    return path
+
+
+def _append(args):
+    base_path, prefix = args
+    return append_records(records(prefix), base_path)
+
+
+def test_concurrent_appends_keep_every_segment(base):
+    prefixes = [f'P{i}' for i in range(8)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(_append, [(base, p) for p in prefixes])) == [5] * 8
+    assert len(delta_files(base)) == 8
+    assert len(read_merged(base)) == 5 * 9
+
+
+def test_existing_segment_is_not_replaced(base, monkeypatch):
+    class FrozenClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    monkeypatch.setattr(delta_store, 'datetime', FrozenClock)
+    append_records(records('A'), base)
+    with pytest.raises(FileExistsError):
+        append_records(records('B'), base)
+    assert set(read_merged(base)['record_id']) == set(records('BASE')['record_id']) | set(records('A')['record_id'])
+    assert not [f for f in os.listdir(delta_store.delta_dir(base)) if f.endswith('.tmp')]
+
+
+def test_pinned_version_ignores_later_appends(base):
+    append_records(records('A'), base)
+    version = current_version(base)
+    append_records(records('B'), base)
+    assert len(read_merged(base, version=version)) == 10
+    assert len(read_merged(base)) == 15
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.downsample import (downsample_frame, lttb_indices, minmax_indices, points_for_width,
+                                  render_mode_for)
+
+
+def wave(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 200) + rng.normal(0, 0.05, n)
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_count():
+    x, y = wave()
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    x, y = wave()
+    y[2345] = 50.0
+    assert 2345 in lttb_indices(x, y, 100)
+
+
+def test_lttb_short_series_unchanged():
+    x, y = wave(50)
+    np.testing.assert_array_equal(lttb_indices(x, y, 100), np.arange(50))
+    np.testing.assert_array_equal(lttb_indices(x, y, 2), np.arange(50))
+
+
+def test_minmax_keeps_extremes_of_every_bucket():
+    _, y = wave()
+    n_buckets = 40
+    idx = minmax_indices(y, n_buckets)
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+    bucket = (np.arange(len(y)) * n_buckets) // len(y)
+    for b in range(n_buckets):
+        members = np.flatnonzero(bucket == b)
+        assert members[np.argmin(y[members])] in idx
+        assert members[np.argmax(y[members])] in idx
+    assert len(idx) <= 2 * n_buckets + 2
+
+
+def test_minmax_short_series_unchanged():
+    _, y = wave(30)
+    np.testing.assert_array_equal(minmax_indices(y, 20), np.arange(30))
+
+
+def test_downsample_frame_per_series():
+    x, y = wave(3000)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(x, unit='D')
+    df = pd.concat([
+        pd.DataFrame({'indicator': 'A', 'observation_date': dates, 'value_numeric': y}),
+        pd.DataFrame({'indicator': 'B', 'observation_date': dates, 'value_numeric': -y}),
+        pd.DataFrame({'indicator': 'C', 'observation_date': dates[:10], 'value_numeric': y[:10]}),
+    ], ignore_index=True)
+    for method in ('lttb', 'minmax'):
+        out = downsample_frame(df, width_px=200, method=method)
+        counts = out['indicator'].value_counts()
+        assert counts['A'] <= points_for_width(200, method) + 2
+        assert counts['B'] <= points_for_width(200, method) + 2
+        assert counts['C'] == 10
+        # every series keeps its first and last point, in date order
+        for _, series in out.groupby('indicator'):
+            assert series['observation_date'].is_monotonic_increasing
+        first_last = df.groupby('indicator')['observation_date'].agg(['min', 'max'])
+        kept = out.groupby('indicator')['observation_date'].agg(['min', 'max'])
+        pd.testing.assert_frame_equal(kept, first_last)
+
+
+def test_render_mode():
+    assert render_mode_for(10) == 'svg'
+    assert render_mode_for(10_000) == 'webgl'
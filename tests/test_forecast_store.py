@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import forecast_store
+
+
+def forecasts(shift=0.0, scenarios=('Base', 'Optimistic')):
+    dates = pd.date_range('2025-01-31', periods=6, freq='ME')
+    frames = []
+    for indicator, level in (('ACC_OWNERSHIP', 50.0), ('USG_DIGITAL_PAYMENT', 30.0)):
+        for k, scenario in enumerate(scenarios):
+            frames.append(pd.DataFrame({'Date': dates, 'Value': level + k + np.arange(6) + shift,
+                                        'Scenario': scenario, 'Indicator': indicator}))
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    first = forecast_store.write_run(forecasts(), str(tmp_path), data_version='v1')
+    second = forecast_store.write_run(forecasts(shift=2.0), str(tmp_path), data_version='v2', note='shifted')
+    return str(tmp_path), first, second
+
+
+def test_runs_catalog(store):
+    store_dir, first, second = store
+    catalog = forecast_store.runs(store_dir)
+    assert catalog['run'].tolist() == [first, second]
+    assert catalog['data_version'].tolist() == ['v1', 'v2']
+    assert catalog['rows'].tolist() == [24, 24]
+    assert forecast_store.resolve_run('latest', store_dir) == second
+    assert forecast_store.resolve_run('previous', store_dir) == first
+    assert forecast_store.resolve_run('-2', store_dir) == first
+
+
+def test_read_filters(store):
+    store_dir, first, _ = store
+    rows = forecast_store.read(first, 'ACC_OWNERSHIP', 'Base', start='2025-03-01', store_dir=store_dir)
+    assert rows['run'].unique().tolist() == [first]
+    assert rows['scenario'].unique().tolist() == ['Base']
+    assert len(rows) == 4
+    np.testing.assert_array_equal(rows['value'], [52.0, 53.0, 54.0, 55.0])
+
+
+def test_diff(store):
+    store_dir, first, second = store
+    deltas = forecast_store.diff(first, second, store_dir=store_dir)
+    assert len(deltas) == 24
+    np.testing.assert_allclose(deltas['delta'], 2.0)
+    np.testing.assert_allclose(deltas['pct'], 100.0 * 2.0 / deltas['value_a'])
+    summary = forecast_store.summarize(deltas)
+    assert len(summary) == 4
+
+
+def test_diff_missing_rows(tmp_path):
+    store_dir = str(tmp_path)
+    first = forecast_store.write_run(forecasts(scenarios=('Base',)), store_dir)
+    second = forecast_store.write_run(forecasts(), store_dir)
+    deltas = forecast_store.diff(first, second, store_dir=store_dir)
+    only_b = deltas['scenario'] == 'Optimistic'
+    assert deltas.loc[only_b, 'value_a'].isna().all()
+    assert deltas.loc[only_b, 'delta'].isna().all()
+    np.testing.assert_allclose(deltas.loc[~only_b, 'delta'], 0.0)
+
+
+def test_scenario_diff(store):
+    store_dir, _, second = store
+    spread = forecast_store.scenario_diff(second, against='Base', store_dir=store_dir)
+    assert spread['scenario'].unique().tolist() == ['Optimistic']
+    np.testing.assert_allclose(spread['delta'], 1.0)
+
+
+def test_drop_run(store):
+    store_dir, first, second = store
+    forecast_store.drop_run(first, store_dir)
+    assert forecast_store.runs(store_dir)['run'].tolist() == [second]
+    assert forecast_store.read(store_dir=store_dir)['run'].unique().tolist() == [second]
+
+
+def _write(store_dir):
+    return forecast_store.write_run(forecasts(), store_dir)
+
+
+def test_concurrent_writes_keep_every_run(tmp_path):
+    store_dir = str(tmp_path)
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        written = list(pool.map(_write, [store_dir] * 8))
+    assert sorted(forecast_store.runs(store_dir)['run']) == sorted(written)
+    assert forecast_store.read(store_dir=store_dir)['run'].nunique() == 8
+
+
+
+def test_cli_diff_with_one_run(tmp_path, monkeypatch, capsys):
+    store_dir = str(tmp_path)
+    forecast_store.write_run(forecasts(), store_dir)
+    runs = forecast_store.runs
+    monkeypatch.setattr(forecast_store, 'runs', lambda _=None: runs(store_dir))
+    monkeypatch.setattr('sys.argv', ['forecast_store', 'diff'])
+    with pytest.raises(SystemExit) as exit_info:
+        forecast_store.main()
+    assert exit_info.value.code == 1
+    assert capsys.readouterr().err == "forecast_store diff: Only 1 runs stored\n"
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from src import kernels
+from src.kernels import (ATOL, RTOL, accumulate_numba, accumulate_numpy, clip_numba, clip_numpy,
+                         days_since_epoch, sample, scenario_numba, scenario_numpy)
+from src.response_shapes import DAYS_PER_MONTH, evaluate
+
+
+@pytest.fixture
+def s():
+    return sample(n_links=60, n_steps=120, n_rows=5)
+
+
+def test_accumulate_is_weighted_sum_of_responses(s):
+    fractions = evaluate(s['shapes'], s['months'], (s['t'][None, :] - s['starts'][:, None]) / DAYS_PER_MONTH)
+    expected = (s['weights'][:, None] * fractions).sum(axis=0)
+    np.testing.assert_allclose(accumulate_numpy(s['weights'], s['starts'], s['months'], s['shapes'], s['t']),
+                               expected, rtol=1e-12, atol=1e-12)
+
+
+def test_accumulate_rows_add_up_to_total(s):
+    args = (s['weights'], s['starts'], s['months'], s['shapes'], s['t'])
+    by_row = accumulate_numpy(*args, s['rows'], s['n_rows'])
+    assert by_row.shape == (s['n_rows'], len(s['t']))
+    np.testing.assert_allclose(by_row.sum(axis=0), accumulate_numpy(*args), rtol=1e-12, atol=1e-12)
+    # rows without links stay zero
+    empty = np.setdiff1d(np.arange(s['n_rows']), s['rows'])
+    assert (by_row[empty] == 0).all()
+
+
+def test_scenario_and_clip(s):
+    out = scenario_numpy(s['baseline'], s['impacts'], 1.05, 1.2, 0.0, 100.0)
+    assert np.nanmin(out) >= 0 and np.nanmax(out) <= 100
+    # missing baselines stay missing
+    np.testing.assert_array_equal(np.isnan(out), np.isnan(s['baseline']))
+    np.testing.assert_array_equal(clip_numpy(s['baseline'], 0.0, 100.0), np.clip(s['baseline'], 0.0, 100.0))
+
+
+def test_days_since_epoch():
+    days = days_since_epoch(np.array(['2000-01-01', '2000-01-31T12:00'], dtype='datetime64[ns]'))
+    np.testing.assert_array_equal(days, [0.0, 30.5])
+
+
+def test_backend_override(monkeypatch):
+    monkeypatch.setattr(kernels, 'KERNELS', 'numpy')
+    assert kernels.backend(10 ** 9) == 'numpy'
+    monkeypatch.setattr(kernels, 'KERNELS', 'fast')
+    with pytest.raises(ValueError):
+        kernels.backend()
+
+
+@pytest.fixture
+def numba():
+    return pytest.importorskip('numba')
+
+
+@pytest.mark.parametrize('on_grid', [False, True])
+def test_numba_accumulate_matches_numpy(numba, s, on_grid):
+    starts = np.floor(s['starts']) if on_grid else s['starts']
+    args = (s['weights'], starts, s['months'], s['shapes'], s['t'])
+    np.testing.assert_allclose(accumulate_numba(*args), accumulate_numpy(*args), rtol=RTOL, atol=ATOL)
+    np.testing.assert_allclose(accumulate_numba(*args, s['rows'], s['n_rows']),
+                               accumulate_numpy(*args, s['rows'], s['n_rows']), rtol=RTOL, atol=ATOL)
+
+
+def test_numba_accumulate_uncompiled_shape(numba, s):
+    # shapes without a compiled loop (here: unknown, so the default) go through NumPy
+    shapes = s['shapes'].astype(object)
+    shapes[::7] = 'sigmoid'
+    args = (s['weights'], s['starts'], s['months'], shapes.astype(str), s['t'])
+    np.testing.assert_allclose(accumulate_numba(*args, s['rows'], s['n_rows']),
+                               accumulate_numpy(*args, s['rows'], s['n_rows']), rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('scales', [(1.0, 1.0), (1.05, 1.2), (0.95, 0.8)])
+def test_numba_scenario_matches_numpy(numba, s, scales):
+    # elementwise: identical, NaNs included
+    np.testing.assert_array_equal(scenario_numba(s['baseline'], s['impacts'], *scales, 0.0, 100.0),
+                                  scenario_numpy(s['baseline'], s['impacts'], *scales, 0.0, 100.0))
+
+
+def test_numba_clip_matches_numpy(numba, s):
+    np.testing.assert_array_equal(clip_numba(s['baseline'], 0.0, 100.0), clip_numpy(s['baseline'], 0.0, 100.0))
+
+
+def test_forced_numba_backend(numba, s, monkeypatch):
+    monkeypatch.setattr(kernels, 'KERNELS', 'numba')
+    assert kernels.backend(1) == 'numba'
+    args = (s['weights'], s['starts'], s['months'], s['shapes'], s['t'])
+    np.testing.assert_allclose(kernels.accumulate(*args), accumulate_numpy(*args), rtol=RTOL, atol=ATOL)
+    np.testing.assert_array_equal(kernels.clip(s['baseline'], 0.0, 100.0), clip_numpy(s['baseline'], 0.0, 100.0))
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.propagation import cascade_matrix, propagate, split_links, topological_levels
+
+
+def records(links):
+    """Unified rows: three observed indicators, one event in Jan 2018, and the given impact links."""
+    rows = [
+        {'record_id': 'OBS_1', 'record_type': 'observation', 'indicator_code': 'ACC_MOBILE_PEN',
+         'value_numeric': 40.0, 'observation_date': '2017-01-01'},
+        {'record_id': 'OBS_2', 'record_type': 'observation', 'indicator_code': 'ACC_OWNERSHIP',
+         'value_numeric': 30.0, 'observation_date': '2017-01-01'},
+        {'record_id': 'OBS_3', 'record_type': 'observation', 'indicator_code': 'USG_DIGITAL_PAYMENT',
+         'value_numeric': 10.0, 'observation_date': '2017-01-01'},
+        {'record_id': 'EVT_A', 'record_type': 'event', 'indicator_code': 'EVT_A',
+         'observation_date': '2018-01-15'},
+    ]
+    for i, (parent, target, estimate, lag, shape) in enumerate(links):
+        rows.append({'record_id': f'IMP_{i}', 'record_type': 'impact_link', 'parent_id': parent,
+                     'indicator_code': target, 'impact_direction': 'increase', 'impact_estimate': estimate,
+                     'lag_months': lag, 'response_shape': shape, 'response_months': 6})
+    return pd.DataFrame(rows)
+
+
+# EVT_A -> ACC_MOBILE_PEN -> ACC_OWNERSHIP -> USG_DIGITAL_PAYMENT
+CHAIN = [
+    ('EVT_A', 'ACC_MOBILE_PEN', 2.0, 0, 'step'),
+    ('ACC_MOBILE_PEN', 'ACC_OWNERSHIP', 0.5, 0, 'linear'),
+    ('ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT', 0.2, 0, 'step'),
+]
+
+
+def test_split_links():
+    event_links, indicator_links = split_links(records(CHAIN))
+    assert event_links['target_indicator'].tolist() == ['ACC_MOBILE_PEN']
+    assert indicator_links[['source', 'target']].values.tolist() == [
+        ['ACC_MOBILE_PEN', 'ACC_OWNERSHIP'], ['ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT']]
+    np.testing.assert_allclose(indicator_links['weight'], [0.5, 0.2])
+
+
+def test_chain():
+    total, direct = propagate(records(CHAIN), '2017-01-01', '2019-12-31')
+    # only the event link is direct
+    assert (direct[['ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT']] == 0).all().all()
+    np.testing.assert_allclose(total['ACC_MOBILE_PEN'], direct['ACC_MOBILE_PEN'])
+    before = total.index < '2018-01-01'
+    np.testing.assert_allclose(total[before], 0.0, atol=1e-12)
+    np.testing.assert_allclose(total.loc['2018-01-31':, 'ACC_MOBILE_PEN'], 2.0)
+    # a linear ramp over six months, from the month of the step
+    np.testing.assert_allclose(total.loc['2018-01-31':'2018-06-30', 'ACC_OWNERSHIP'],
+                               0.5 * 2.0 * np.arange(1, 7) / 6, atol=1e-12)
+    # settled: each edge passes on its weight times the source's change
+    last = total.iloc[-1]
+    np.testing.assert_allclose(last['ACC_OWNERSHIP'], 1.0, atol=1e-12)
+    np.testing.assert_allclose(last['USG_DIGITAL_PAYMENT'], 0.2, atol=1e-12)
+
+
+def test_independent_of_start_date():
+    df = records(CHAIN)
+    long, _ = propagate(df, '2012-01-01', '2019-12-31')
+    # starts after the event, while the cascade is still building up
+    short, _ = propagate(df, '2018-03-01', '2019-12-31')
+    pd.testing.assert_frame_equal(short, long.loc[short.index], atol=1e-12, rtol=0)
+
+
+def test_lag_delays_cascade():
+    def payment(lag):
+        links = CHAIN[:2] + [('ACC_OWNERSHIP', 'USG_DIGITAL_PAYMENT', 0.2, lag, 'step')]
+        total, _ = propagate(records(links), '2017-01-01', '2019-12-31')
+        return total['USG_DIGITAL_PAYMENT'].to_numpy()
+
+    # three more months of lag, three months later
+    np.testing.assert_allclose(payment(4)[3:], payment(1)[:-3], atol=1e-12)
+    assert payment(4)[-1] == pytest.approx(0.2)
+
+
+def test_long_run_matches_cascade_matrix():
+    total, direct = propagate(records(CHAIN), '2017-01-01', '2019-12-31')
+    _, indicator_links = split_links(records(CHAIN))
+    direct_matrix = pd.DataFrame([direct.iloc[-1]], index=['EVT_A'])
+    long_run = cascade_matrix(direct_matrix, indicator_links)
+    np.testing.assert_allclose(long_run.loc['EVT_A', total.columns], total.iloc[-1], atol=1e-12)
+
+
+def test_cycle_is_rejected():
+    links = CHAIN + [('USG_DIGITAL_PAYMENT', 'ACC_MOBILE_PEN', 0.1, 0, 'step')]
+    with pytest.raises(ValueError, match='cycle'):
+        propagate(records(links), '2017-01-01', '2019-12-31')
+
+
+def test_topological_levels():
+    nodes = ['a', 'b', 'c', 'd']
+    edges = pd.DataFrame({'source': [0, 0, 1, 2], 'target': [1, 2, 3, 3]})
+    levels = topological_levels(nodes, edges)
+    assert [sorted(level.tolist()) for level in levels] == [[0], [1, 2], [3]]
@@ -0,0 +1,74 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.response_shapes import (DEFAULT_MONTHS, DEFAULT_SHAPE, SHAPES, evaluate, increments,
+                                 link_shapes, response)
+
+T = np.linspace(-12, 120, 529)
+
+
+@pytest.mark.parametrize('name', sorted(SHAPES))
+def test_zero_before_start(name):
+    out = evaluate([name], [6.0], T[None, :])[0]
+    assert (out[T < 0] == 0).all()
+    assert ((out >= 0) & (out <= 1)).all()
+
+
+@pytest.mark.parametrize('name', ['linear', 'logistic', 'exponential', 'step'])
+def test_persistent_shapes_settle_at_one(name):
+    out = evaluate([name], [6.0], T[None, :])[0]
+    assert np.all(np.diff(out) >= 0)
+    np.testing.assert_allclose(out[-1], 1.0, atol=1e-9)
+
+
+def test_shape_values():
+    t = np.array([[0.0, 3.0, 6.0, 12.0]])
+    np.testing.assert_allclose(evaluate(['linear'], [6.0], t)[0], [0, 0.5, 1, 1])
+    np.testing.assert_allclose(evaluate(['pulse'], [6.0], t)[0], [1, 2 ** -0.5, 0.5, 0.25])
+    np.testing.assert_allclose(evaluate(['exponential'], [6.0], t)[0, 2], 1 - np.exp(-3))
+    np.testing.assert_allclose(evaluate(['step'], [6.0], t)[0], 1.0)
+
+
+def test_mixed_shapes_match_single_calls():
+    names = sorted(SHAPES) * 2
+    months = np.arange(1, len(names) + 1, dtype=float)
+    mixed = evaluate(names, months, T[None, :])
+    for i, (name, d) in enumerate(zip(names, months)):
+        np.testing.assert_array_equal(mixed[i], evaluate([name], [d], T[None, :])[0])
+
+
+def test_link_shapes_defaults():
+    links = pd.DataFrame({'response_shape': [' Logistic', None, '', 'step'],
+                          'response_months': [12, None, -1, 'x']})
+    shapes, months = link_shapes(links)
+    assert shapes.tolist() == ['logistic', DEFAULT_SHAPE, DEFAULT_SHAPE, 'step']
+    np.testing.assert_array_equal(months, [12, DEFAULT_MONTHS, DEFAULT_MONTHS, DEFAULT_MONTHS])
+    shapes, months = link_shapes(pd.DataFrame(index=range(2)))
+    assert shapes.tolist() == [DEFAULT_SHAPE] * 2
+
+
+def test_unknown_shape_falls_back(caplog):
+    links = pd.DataFrame({'response_shape': ['sigmoid', 'step']})
+    with caplog.at_level(logging.WARNING, logger='fi'):
+        shapes, _ = link_shapes(links)
+    assert shapes.tolist() == [DEFAULT_SHAPE, 'step']
+    assert 'sigmoid' in caplog.text
+    t = np.array([[3.0]])
+    np.testing.assert_array_equal(evaluate(['sigmoid'], [6.0], t), evaluate([DEFAULT_SHAPE], [6.0], t))
+
+
+def test_response_on_timeline():
+    links = pd.DataFrame({'event_date': pd.to_datetime(['2020-01-01', '2020-01-01']),
+                          'lag_months': [0, 2], 'response_shape': ['step', 'step']})
+    timeline = pd.date_range('2019-12-31', periods=5, freq='ME')
+    np.testing.assert_array_equal(response(links, timeline), [[0, 1, 1, 1, 1], [0, 0, 0, 1, 1]])
+
+
+@pytest.mark.parametrize('name', sorted(SHAPES))
+def test_increments_sum_to_response(name):
+    links = pd.DataFrame({'lag_months': [2], 'response_shape': [name], 'response_months': [6]})
+    kernel = increments(links, 48)[0]
+    np.testing.assert_allclose(np.cumsum(kernel), evaluate([name], [6.0], np.arange(1, 49)[None, :] - 2)[0])
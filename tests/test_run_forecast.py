@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from src.panel import build_panel
+from src.run_forecast import panel_history, train_baseline_model
+
+
+def observation(date, value, gender=None, location=None, code='ACC_OWNERSHIP'):
+    return {'record_type': 'observation', 'indicator_code': code, 'observation_date': date,
+            'value_numeric': value, 'gender': gender, 'location': location}
+
+
+def test_baseline_fits_national_rows_one_per_month():
+    df = pd.DataFrame([
+        observation('2017-06-30', 35.0),
+        observation('2021-03-01', 44.0),
+        # a second national row in March 2021: the later one is the month's observation
+        observation('2021-03-20', 46.0),
+        observation('2024-11-15', 49.0),
+        # other slices and indicators play no part
+        observation('2019-01-01', 90.0, gender='female'),
+        observation('2022-01-01', 10.0, location='urban'),
+        observation('2023-01-01', 99.0, code='USG_DIGITAL_PAYMENT'),
+        {'record_type': 'target', 'indicator_code': 'ACC_OWNERSHIP', 'observation_date': '2025-12-31',
+         'value_numeric': 70.0, 'gender': None, 'location': None},
+    ])
+    history = panel_history(build_panel(df), 'ACC_OWNERSHIP')
+
+    expected = pd.to_datetime(['2017-06-30', '2021-03-20', '2024-11-15'])
+    np.testing.assert_array_equal(history['observation_date'], expected)
+    np.testing.assert_array_equal(history['value_numeric'], [35.0, 46.0, 49.0])
+    assert history['value_numeric'].dtype == np.float64
+
+    slope, intercept = train_baseline_model(history)
+    expected_slope, expected_intercept = np.polyfit([d.toordinal() for d in expected.to_pydatetime()],
+                                                    [35.0, 46.0, 49.0], 1)
+    np.testing.assert_allclose([slope, intercept], [expected_slope, expected_intercept])
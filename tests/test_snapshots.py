@@ -0,0 +1,68 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from src import snapshots
+from src.snapshots import adopt, current_version, publish, read_csv, resolve, snapshot_dir
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'matrix.csv')
+
+
+def listing(path):
+    return sorted(os.listdir(snapshot_dir(path)))
+
+
+def test_publish_and_pin(path):
+    first = publish(pd.DataFrame({'a': [1]}), path, index=False)
+    second = publish(pd.DataFrame({'a': [2]}), path, index=False)
+    assert current_version(path) == second
+    assert read_csv(path, first)['a'].tolist() == [1]
+    assert read_csv(path)['a'].tolist() == [2]
+    assert pd.read_csv(path)['a'].tolist() == [2]
+
+
+def test_hand_edit_is_read_only_until_adopted(path):
+    published = publish(pd.DataFrame({'a': [1]}), path, index=False)
+    before = listing(path)
+    pd.DataFrame({'a': [7]}).to_csv(path, index=False)
+
+    version = current_version(path)
+    assert version.startswith(snapshots.PLAIN_PREFIX)
+    assert resolve(path) == path
+    assert read_csv(path, version)['a'].tolist() == [7]
+    # reading never writes
+    assert listing(path) == before
+
+    adopted = adopt(path)
+    assert adopted not in (published, version)
+    assert current_version(path) == adopted
+    assert read_csv(path)['a'].tolist() == [7]
+    # the unpublished version is gone once the plain file changes again
+    pd.DataFrame({'a': [8]}).to_csv(path, index=False)
+    with pytest.raises(FileNotFoundError):
+        resolve(path, version)
+
+
+def test_touched_plain_file_keeps_its_version(path):
+    version = publish(pd.DataFrame({'a': [1]}), path, index=False)
+    os.utime(path, ns=(0, 0))
+    assert current_version(path) == version
+
+
+def _publish(args):
+    path, value = args
+    return publish(pd.DataFrame({'a': [value] * 1000}), path, index=False)
+
+
+def test_concurrent_publishers_leave_a_matching_pair(path):
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_publish, [(path, i) for i in range(16)]))
+    version = current_version(path)
+    assert not version.startswith(snapshots.PLAIN_PREFIX)
+    assert read_csv(path, version).equals(pd.read_csv(path))
+    assert snapshots.LOCK not in listing(path)
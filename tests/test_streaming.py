@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.delta_store import append_records, read_merged
+from src.panel import DEFAULT_GENDER, DEFAULT_LOCATION
+from src.schema import INDICATOR_ALIASES
+from src.streaming import baseline_stats, fit_baselines, validate_stream
+from src.synthetic import write_dataset
+from src.validate_data import REPORT_COLUMNS, summarize, validate
+
+TODAY = '2026-01-01'
+
+
+def planted(data_dir):
+    """Synthetic base snapshot with planted violations; returns (base path, reference path, rows)."""
+    write_dataset(data_dir, 3000, seed=1)
+    base = os.path.join(data_dir, 'raw', 'ethiopia_fi_unified_data.csv')
+    df = pd.read_csv(base, low_memory=False)
+    obs = np.flatnonzero(df['record_type'] == 'observation')
+    links = np.flatnonzero(df['record_type'] == 'impact_link')
+    df.loc[obs[:3], 'value_numeric'] = np.nan
+    df.loc[obs[3:5], 'observation_date'] = 'not a date'
+    df.loc[links[:2], 'parent_id'] = 'EVT_MISSING'
+    df.to_csv(base, index=False)
+    return base, os.path.join(data_dir, 'raw', 'reference_codes.csv'), df
+
+
+@pytest.fixture(scope='module', params=['duplicates', 'deltas'])
+def unified(request, tmp_path_factory):
+    """
+    The planted snapshot with either duplicate record_ids far apart (so they land in
+    different chunks) or a delta segment replacing some rows. read_merged collapses
+    duplicates once there are deltas, so the two are kept apart.
+    """
+    base, ref, df = planted(str(tmp_path_factory.mktemp(request.param)))
+    obs = np.flatnonzero(df['record_type'] == 'observation')
+    if request.param == 'duplicates':
+        pd.concat([df, df.iloc[[1, 2]]], ignore_index=True).to_csv(base, index=False)
+    else:
+        # fixes two of the missing values, breaks another row
+        delta = pd.concat([df.iloc[obs[:2]].assign(value_numeric=12.5), df.iloc[[obs[10]]].assign(pillar=np.nan)])
+        append_records(delta, base)
+    return base, ref
+
+
+def in_memory(base, ref):
+    return validate(read_merged(base), ref, today=TODAY)
+
+
+@pytest.mark.parametrize('chunksize', [250, 1000, 100_000])
+def test_counts_match_in_memory(unified, chunksize):
+    base, ref = unified
+    expected = summarize(in_memory(base, ref)).sort_values(['rule', 'severity'], ignore_index=True)
+    counts = validate_stream(base, ref, chunksize=chunksize, today=TODAY)
+    counts = counts.sort_values(['rule', 'severity'], ignore_index=True)
+    pd.testing.assert_frame_equal(counts, expected, check_dtype=False)
+    assert {'orphan_impact_link', 'unparseable_date', 'observation_missing_value'} <= set(counts['rule'])
+
+
+def test_report_rows_match_in_memory(unified, tmp_path):
+    base, ref = unified
+    out = str(tmp_path / 'violations.csv')
+    validate_stream(base, ref, chunksize=400, out=out, today=TODAY)
+    key = ['rule', 'row']
+    streamed = pd.read_csv(out).sort_values(key, ignore_index=True)
+    expected = in_memory(base, ref).sort_values(key, ignore_index=True)
+    assert list(streamed.columns) == REPORT_COLUMNS
+    np.testing.assert_array_equal(streamed[key].to_numpy(), expected[key].to_numpy())
+    np.testing.assert_array_equal(streamed['record_id'].astype(str), expected['record_id'].astype(str))
+
+
+def test_baselines_match_polyfit(unified):
+    base, _ = unified
+    fits = fit_baselines(baseline_stats(base, chunksize=500))
+    df = read_merged(base)
+    national = df[(df['record_type'] == 'observation') &
+                  (df['gender'].fillna(DEFAULT_GENDER) == DEFAULT_GENDER) &
+                  (df['location'].fillna(DEFAULT_LOCATION) == DEFAULT_LOCATION)]
+    national = national.assign(observation_date=pd.to_datetime(national['observation_date'], errors='coerce'),
+                               indicator_code=national['indicator_code'].replace(INDICATOR_ALIASES))
+    national = national.dropna(subset=['observation_date', 'value_numeric'])
+    checked = 0
+    for code, series in national.groupby('indicator_code'):
+        if series['observation_date'].nunique() < 2:
+            continue
+        checked += 1
+        x = (series['observation_date'] - pd.Timestamp('2000-01-01')).dt.days.to_numpy(dtype=float)
+        slope, _ = np.polyfit(x, series['value_numeric'].to_numpy(dtype=float), 1)
+        np.testing.assert_allclose(fits.loc[code, 'slope'], slope, rtol=1e-8)
+    assert checked